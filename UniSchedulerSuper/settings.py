@@ -73,6 +73,7 @@ CHANNEL_LAYERS = {
 
 MIDDLEWARE = [
     'core.middleware.request_logger.RequestLogMiddleware', # Custom Request Logger - 记录所有HTTP请求到统一日志
+    'core.middleware.planner_access.PlannerAccessScopeMiddleware',  # Planner 准入判定的请求级记忆作用域
     'caldav_service.middleware.CalDAVRoutingMiddleware',  # CalDAV WebDAV 方法路由（必须在 CSRF 之前）
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -154,6 +155,23 @@ PLANNER_STORAGE_MODE = os.getenv('PLANNER_STORAGE_MODE', 'normalized')
 PLANNER_DIFF_ASSERT = os.getenv('PLANNER_DIFF_ASSERT', 'false')
 PLANNER_LEGACY_FALLBACK = os.getenv('PLANNER_LEGACY_FALLBACK', 'false')
 PLANNER_CALDAV_NORMALIZED = os.getenv('PLANNER_CALDAV_NORMALIZED', 'true')
+# 物化 occurrence 索引只缩小实时展开的候选 entity；关闭时读路径与索引表完全无关。
+PLANNER_OCCURRENCE_INDEX = os.getenv('PLANNER_OCCURRENCE_INDEX', 'false')
+# 订阅 Feed 编码结果（含 gzip）的进程内缓存上限，按字节 LRU 淘汰。
+PLANNER_FEED_CACHE_MAX_BYTES = int(os.getenv('PLANNER_FEED_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+# multistatus 中 resource 数达到该值时改为逐个 response 流式输出；小响应仍整体返回并带 Content-Length。
+PLANNER_CALDAV_STREAMING_MIN_RESOURCES = int(os.getenv('PLANNER_CALDAV_STREAMING_MIN_RESOURCES', '200'))
+
+# MCP 工具执行池的 worker 数与单用户并发上限；MCP_TOOL_WORKERS=0 退回单线程串行执行。
+MCP_TOOL_WORKERS = int(os.getenv('MCP_TOOL_WORKERS', '8'))
+MCP_TOOL_PER_USER_CONCURRENCY = int(os.getenv('MCP_TOOL_PER_USER_CONCURRENCY', '2'))
+# MCP/Feed/CalDAV 共用的 Token 认证缓存；跨进程吊销只能靠 TTL 收敛，不宜调大。
+AUTH_TOKEN_CACHE_TTL_SECONDS = float(os.getenv('AUTH_TOKEN_CACHE_TTL_SECONDS', '60'))
+AUTH_TOKEN_CACHE_MAX_ENTRIES = int(os.getenv('AUTH_TOKEN_CACHE_MAX_ENTRIES', '10000'))
+# SecureKeyStorage 派生密钥（PBKDF2）与解密后模型配置的进程内缓存。
+SECURE_KEY_CACHE_TTL_SECONDS = float(os.getenv('SECURE_KEY_CACHE_TTL_SECONDS', '900'))
+SECURE_CONFIG_CACHE_TTL_SECONDS = float(os.getenv('SECURE_CONFIG_CACHE_TTL_SECONDS', '300'))
+SECURE_KEY_CACHE_MAX_ENTRIES = int(os.getenv('SECURE_KEY_CACHE_MAX_ENTRIES', '1024'))
 
 # FR-0：前端入口只决定模板/静态资源，绝不改变 Planner 的 V2-only 数据路径。
 # 默认保留成熟的原生界面，React 入口仅在完成各阶段验收后通过环境变量显式启用。
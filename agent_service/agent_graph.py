@@ -1200,11 +1200,6 @@ def agent_node(state: AgentState, config: RunnableConfig) -> dict:
             # 获取优化配置
             opt_config = get_optimization_config(user)
             
-            # Token 计算器
-            calculator = TokenCalculator(
-                method=opt_config.get('token_calculation_method', 'estimate')
-            )
-            
             # 获取会话和已有的总结
             session_id = config.get("configurable", {}).get("thread_id", "")
             session = None
@@ -1215,6 +1210,13 @@ def agent_node(state: AgentState, config: RunnableConfig) -> dict:
                     if summary_metadata:
                         logger.debug(f"[Agent] 加载历史总结: {summary_metadata.get('summary_tokens', 0)}t, 截止第 {summary_metadata.get('summarized_until', 0)} 条")
             
+            # Token 计算器（复用会话内已计算过的单条消息 token 数）
+            token_method = opt_config.get('token_calculation_method', 'estimate')
+            calculator = TokenCalculator(
+                method=token_method,
+                cache=session.load_message_token_cache(token_method) if session else None
+            )
+            
             if enable_optimization:
                 # 创建工具压缩器
                 # 【重要】以下工具的结果不应被压缩，因为它们的输出是 LLM 后续操作的关键信息：
@@ -1307,6 +1309,10 @@ def agent_node(state: AgentState, config: RunnableConfig) -> dict:
                 logger.debug(f"[Agent]   - 优化后消息: {len(optimized_messages)} 条, {optimized_tokens} tokens")
                 if original_tokens and original_tokens > 0:
                     logger.debug(f"[Agent]   - 削减率: {(1 - optimized_tokens/original_tokens)*100:.1f}%")
+            
+            if session and calculator.cache is not None:
+                logger.debug(f"[Agent] 消息 token 缓存: {calculator.cache.info()}")
+                session.save_message_token_cache(calculator.cache)
                 
         except Exception as e:
             logger.error(f"[Agent] 上下文优化失败: {e}", exc_info=True)
@@ -1874,11 +1880,12 @@ def clear_session_checkpoints(thread_id: str) -> bool:
         cursor.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
         deleted_checkpoints = cursor.rowcount
         
-        # 删除 checkpoint_writes 表中的记录（如果存在）
-        try:
-            cursor.execute("DELETE FROM checkpoint_writes WHERE thread_id = ?", (thread_id,))
-        except sqlite3.OperationalError:
-            pass  # 表可能不存在
+        # 删除 writes / checkpoint_writes 表中的记录（SqliteSaver 使用 writes，表可能不存在）
+        for writes_table in ("writes", "checkpoint_writes"):
+            try:
+                cursor.execute(f"DELETE FROM {writes_table} WHERE thread_id = ?", (thread_id,))
+            except sqlite3.OperationalError:
+                pass
         
         # 删除 checkpoint_blobs 表中的记录（如果存在）
         try:
@@ -0,0 +1,193 @@
+"""
+LangGraph checkpoint 库保留策略 (agent_checkpoints.sqlite)
+
+SqliteSaver 每个超级步都写一条携带完整 messages 的 checkpoint，文件随工具调用次数持续膨胀。
+压缩规则：
+- 每个 thread/namespace 保留最新 keep_latest 条 checkpoint；
+- 有效 AgentRollbackWindow 对应的会话，额外保留窗口打开之后的全部 checkpoint
+  以及打开前的最后一条（消息数等于 floor_message_index），供回滚定位 TODO 快照；
+- 删除不再对应任何 checkpoint 的 writes；
+- 以 WAL 模式运行，逐个 thread 短事务删除，最后 incremental_vacuum 归还空闲页；
+- 旧库 auto_vacuum 不是 INCREMENTAL 时，切换需要一次完整 VACUUM（长时间持有写锁），
+  只在维护窗口显式传 convert_auto_vacuum 时执行，定时任务默认跳过并告警。
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+from agent_service.models import AgentRollbackWindow
+
+from logger import logger
+
+
+# uuid6 时间戳以 1582-10-15 为纪元、100ns 为单位
+_UUID_EPOCH = datetime(1582, 10, 15, tzinfo=dt_timezone.utc)
+
+
+def checkpoint_time(checkpoint_id: str) -> Optional[datetime]:
+    """从 LangGraph 的 uuid6 checkpoint_id 解出写入时间；非 uuid6 返回 None。"""
+    hex_id = checkpoint_id.replace('-', '')
+    if len(hex_id) != 32 or hex_id[12] != '6':
+        return None
+    try:
+        timestamp = (int(hex_id[:12], 16) << 12) | int(hex_id[13:16], 16)
+    except ValueError:
+        return None
+    return _UUID_EPOCH + timedelta(microseconds=timestamp // 10)
+
+
+class CheckpointRetentionService:
+    """checkpoint 库的统计与压缩。"""
+
+    @classmethod
+    def pinned_since(cls) -> Dict[str, datetime]:
+        """有效回滚窗口：thread_id → 窗口打开时间。"""
+        return dict(
+            AgentRollbackWindow.objects.filter(status=AgentRollbackWindow.STATUS_ACTIVE)
+            .values_list('session__session_id', 'opened_at')
+        )
+
+    @classmethod
+    def metrics(cls, conn: sqlite3.Connection, db_path: str) -> Dict[str, Any]:
+        """文件大小（含 WAL）、页统计与各表行数。"""
+        size = sum(os.path.getsize(path) for path in (db_path, f'{db_path}-wal') if os.path.exists(path))
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        return {
+            'file_bytes': size,
+            'page_size': conn.execute('PRAGMA page_size').fetchone()[0],
+            'page_count': conn.execute('PRAGMA page_count').fetchone()[0],
+            'freelist_count': conn.execute('PRAGMA freelist_count').fetchone()[0],
+            'journal_mode': conn.execute('PRAGMA journal_mode').fetchone()[0],
+            'auto_vacuum': conn.execute('PRAGMA auto_vacuum').fetchone()[0],
+            'threads': conn.execute('SELECT COUNT(DISTINCT thread_id) FROM checkpoints').fetchone()[0]
+            if 'checkpoints' in tables else 0,
+            'rows': {
+                table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                for table in ('checkpoints', 'writes') if table in tables
+            },
+        }
+
+    @classmethod
+    def expired_ids(
+        cls, checkpoint_ids: Iterable[str], *, keep_latest: int, pinned_since: Optional[datetime] = None,
+    ) -> list[str]:
+        """
+        单个 thread/namespace 中可删除的 checkpoint_id
+
+        Args:
+            checkpoint_ids: 该 thread 的全部 checkpoint_id（任意顺序）
+            keep_latest: 无条件保留的最新条数
+            pinned_since: 有效回滚窗口的打开时间；其后的全部与其前的最后一条保留
+        """
+        ordered = sorted(checkpoint_ids, reverse=True)
+        candidates = ordered[keep_latest:]
+        if pinned_since is None:
+            return candidates
+        written = {checkpoint_id: checkpoint_time(checkpoint_id) for checkpoint_id in ordered}
+        floor = next((item for item in ordered if written[item] and written[item] < pinned_since), None)
+        return [
+            item for item in candidates
+            if item != floor and written[item] is not None and written[item] < pinned_since
+        ]
+
+    @classmethod
+    def compact(
+        cls,
+        db_path: str,
+        *,
+        keep_latest: int = 20,
+        pinned: Optional[Mapping[str, datetime]] = None,
+        vacuum_pages: int = 0,
+        dry_run: bool = False,
+        convert_auto_vacuum: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        按保留策略压缩 checkpoint 库
+
+        Args:
+            db_path: SQLite 文件路径
+            keep_latest: 每个 thread 保留的最新 checkpoint 数（至少 1）
+            pinned: thread_id → 回滚窗口打开时间，缺省读取有效 AgentRollbackWindow
+            vacuum_pages: incremental_vacuum 每次归还的页数，0 表示全部
+            dry_run: 只统计，不删除
+            convert_auto_vacuum: auto_vacuum 非 INCREMENTAL 时执行一次完整 VACUUM 切换（需停服维护）
+
+        Returns:
+            压缩前后指标与删除行数
+        """
+        if keep_latest < 1:
+            raise ValueError('keep_latest 必须为正整数')
+        if pinned is None:
+            pinned = cls.pinned_since()
+        conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            before = cls.metrics(conn, db_path)
+            deleted_checkpoints = 0
+            threads = conn.execute(
+                'SELECT DISTINCT thread_id, checkpoint_ns FROM checkpoints'
+            ).fetchall() if 'checkpoints' in before['rows'] else []
+            for thread_id, checkpoint_ns in threads:
+                ids = [row[0] for row in conn.execute(
+                    'SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?',
+                    (thread_id, checkpoint_ns),
+                )]
+                expired = cls.expired_ids(ids, keep_latest=keep_latest, pinned_since=pinned.get(thread_id))
+                deleted_checkpoints += len(expired)
+                if dry_run or not expired:
+                    continue
+                # 每个 thread 一个短事务，避免长时间阻塞正在对话的写入
+                conn.execute('BEGIN IMMEDIATE')
+                conn.executemany(
+                    'DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?',
+                    [(thread_id, checkpoint_ns, checkpoint_id) for checkpoint_id in expired],
+                )
+                conn.execute('COMMIT')
+
+            orphan_writes = (
+                'FROM writes WHERE NOT EXISTS (SELECT 1 FROM checkpoints c WHERE c.thread_id = writes.thread_id '
+                'AND c.checkpoint_ns = writes.checkpoint_ns AND c.checkpoint_id = writes.checkpoint_id)'
+            )
+            if 'writes' not in before['rows']:
+                deleted_writes = 0
+            elif dry_run:
+                deleted_writes = conn.execute(f'SELECT COUNT(*) {orphan_writes}').fetchone()[0]
+            else:
+                deleted_writes = conn.execute(f'DELETE {orphan_writes}').rowcount
+
+            converted = False
+            if not dry_run:
+                if before['auto_vacuum'] == 2:
+                    conn.execute(f'PRAGMA incremental_vacuum({max(0, int(vacuum_pages))})').fetchall()
+                elif convert_auto_vacuum:
+                    # 切换到 INCREMENTAL 需要一次完整 VACUUM，之后每次只归还空闲页
+                    conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+                    conn.execute('VACUUM')
+                    converted = True
+                else:
+                    # 完整 VACUUM 会超过写入方的 busy timeout，定时压缩只删除记录，空闲页留给后续写入复用
+                    logger.warning(
+                        f"[Checkpoint] auto_vacuum={before['auto_vacuum']}，跳过空闲页回收；"
+                        f"请在维护窗口使用 --convert-auto-vacuum 切换为 INCREMENTAL"
+                    )
+                conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            after = cls.metrics(conn, db_path)
+        finally:
+            conn.close()
+
+        logger.info(
+            f"[Checkpoint] 压缩完成: checkpoints -{deleted_checkpoints}, writes -{deleted_writes}, "
+            f"{before['file_bytes']} → {after['file_bytes']} bytes, dry_run={dry_run}"
+        )
+        return {
+            'before': before,
+            'after': after,
+            'deleted': {'checkpoints': deleted_checkpoints, 'writes': deleted_writes},
+            'pinned_threads': len(pinned),
+            'converted_auto_vacuum': converted,
+            'dry_run': dry_run,
+        }
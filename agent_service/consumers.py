@@ -22,6 +22,7 @@ from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from asgiref.sync import sync_to_async
 from langchain_core.messages import HumanMessage, AIMessage, AIMessageChunk, ToolMessage, BaseMessage
+from langgraph.graph.message import add_messages
 from django.contrib.auth.models import User
 
 from logger import logger
@@ -436,6 +437,7 @@ class AgentConsumer(AsyncWebsocketConsumer):
         """
         self.is_processing = True
         
+        config = None
         try:
             # 通知开始处理
             await self.send_json({"type": "processing", "message": "正在思考..."})
@@ -493,6 +495,7 @@ class AgentConsumer(AsyncWebsocketConsumer):
             # ========== 【关键】发送前检查并执行历史总结 ==========
             # 获取当前历史消息，检查是否需要总结
             current_message_count = 0
+            current_messages = []
             try:
                 current_state = await app.aget_state(config)
                 if current_state and current_state.values:
@@ -521,6 +524,9 @@ class AgentConsumer(AsyncWebsocketConsumer):
             # 流式输出状态
             stream_started = False
             
+            # 本轮 human 消息随 astream 的输入步写入 checkpoint，先同步进索引，回合进行中的历史读取才能看到
+            turn_messages = await self._record_turn_messages(current_messages, input_messages)
+            
             # 【重构】使用异步 astream 替代同步 stream + 后台线程
             # 这样 asyncio.CancelledError 可以传播到底层 HTTP 客户端并中断请求
             try:
@@ -589,6 +595,8 @@ class AgentConsumer(AsyncWebsocketConsumer):
                                         "refresh": refresh_types
                                     })
                     
+                    turn_messages = await self._record_turn_messages(turn_messages, self._output_messages(output))
+                    
                     # 每次迭代后让出控制权，允许处理取消信号
                     await asyncio.sleep(0)
                 
@@ -612,6 +620,7 @@ class AgentConsumer(AsyncWebsocketConsumer):
                         "type": "recursion_limit",
                         "message": "工具调用次数达到上限，是否继续执行？"
                     })
+                    await self._record_message_stats_from_state(config)
                     return  # 递归限制不算错误，直接返回
                 else:
                     raise  # 其他异常重新抛出
@@ -625,9 +634,11 @@ class AgentConsumer(AsyncWebsocketConsumer):
             final_messages = []
             try:
                 final_state = await app.aget_state(config)
+                final_messages = []
                 if final_state and final_state.values:
                     final_messages = final_state.values.get("messages", [])
                     final_message_count = len(final_messages)
+                await self._record_message_stats(final_messages)
             except Exception as e:
                 logger.warning(f"获取最终消息数量失败: {e}")
             
@@ -697,6 +708,9 @@ class AgentConsumer(AsyncWebsocketConsumer):
             await self.send_json({"type": "stopped", "message": "已停止生成"})
         except Exception as e:
             logger.exception(f"Agent 调用失败: {e}")
+            # 异常前已写入 checkpoint 的消息（至少本轮 human）也要进入索引，否则历史分页与回滚下限错位
+            if config is not None:
+                await self._record_message_stats_from_state(config)
             await self.send_json({
                 "type": "error",
                 "message": f"Agent 调用失败: {str(e)}"
@@ -714,6 +728,7 @@ class AgentConsumer(AsyncWebsocketConsumer):
         """
         self.is_processing = True
         
+        config = None
         try:
             await self.send_json({"type": "processing", "message": "继续执行..."})
             
@@ -741,6 +756,12 @@ class AgentConsumer(AsyncWebsocketConsumer):
             
             stream_started = False
             
+            current_state = await app.aget_state(config)
+            turn_messages = await self._record_turn_messages(
+                current_state.values.get("messages", []) if current_state and current_state.values else [],
+                [continue_message],
+            )
+            
             # 【重构】使用异步 astream
             try:
                 logger.info(f"[Continue] 开始异步继续执行")
@@ -805,6 +826,8 @@ class AgentConsumer(AsyncWebsocketConsumer):
                                         "refresh": refresh_types
                                     })
                     
+                    turn_messages = await self._record_turn_messages(turn_messages, self._output_messages(output))
+                    
                     # 让出控制权
                     await asyncio.sleep(0)
                 
@@ -827,6 +850,7 @@ class AgentConsumer(AsyncWebsocketConsumer):
                         "type": "recursion_limit",
                         "message": "工具调用次数再次达到上限，是否继续执行？"
                     })
+                    await self._record_message_stats_from_state(config)
                     return
                 else:
                     raise
@@ -839,9 +863,11 @@ class AgentConsumer(AsyncWebsocketConsumer):
             final_message_count = 0
             try:
                 final_state = await app.aget_state(config)
+                final_messages = []
                 if final_state and final_state.values:
                     final_messages = final_state.values.get("messages", [])
                     final_message_count = len(final_messages)
+                await self._record_message_stats(final_messages)
             except Exception as e:
                 logger.warning(f"获取最终消息数量失败: {e}")
             
@@ -885,6 +911,9 @@ class AgentConsumer(AsyncWebsocketConsumer):
             await self.send_json({"type": "stopped", "message": "已停止生成"})
         except Exception as e:
             logger.exception(f"继续处理失败: {e}")
+            # 异常前已写入 checkpoint 的消息（至少本轮 human）也要进入索引，否则历史分页与回滚下限错位
+            if config is not None:
+                await self._record_message_stats_from_state(config)
             await self.send_json({
                 "type": "error",
                 "message": f"继续处理失败: {str(e)}"
@@ -983,7 +1012,6 @@ class AgentConsumer(AsyncWebsocketConsumer):
             if not messages:
                 logger.info("[Cleanup] 无消息需要清理")
                 return
-            
             last_msg = messages[-1]
             logger.info(f"[Cleanup] 最后一条消息类型: {type(last_msg).__name__}")
             
@@ -1029,6 +1057,9 @@ class AgentConsumer(AsyncWebsocketConsumer):
             
             else:
                 logger.info("[Cleanup] 状态完整，无需清理")
+
+            # 占位消息写入后再同步，消息索引与 state 保持一致
+            await self._record_message_stats_from_state(config)
                     
         except Exception as e:
             logger.warning(f"[Cleanup] 停止后清理状态时出错: {e}")
@@ -1302,11 +1333,59 @@ class AgentConsumer(AsyncWebsocketConsumer):
                 # 截取预览（50个字符）
                 preview = user_message[:50] + ("..." if len(user_message) > 50 else "")
                 session.last_message_preview = preview
+                # 本条用户消息即将写入 state；即使本轮中途失败，会话也应出现在列表中
+                session.is_empty = False
                 await database_sync_to_async(session.save)()
                 
         except Exception as e:
             logger.warning(f"[预览] 更新失败: {e}")
 
+    async def _record_message_stats(self, messages, in_flight: bool = False):
+        """
+        按最新 state 写回会话列表统计（消息数、最后一条用户消息预览、是否为空）并增量同步消息索引
+        
+        Args:
+            messages: state 中的全部消息
+            in_flight: 回合仍在进行（见 AgentSession.record_message_stats）
+        """
+        try:
+            from agent_service.message_index import MessageIndexService
+            await database_sync_to_async(MessageIndexService.sync)(self.session_id, messages, in_flight=in_flight)
+        except Exception as e:
+            logger.warning(f"[会话统计] 更新失败: {e}")
+
+    @staticmethod
+    def _output_messages(output) -> list:
+        """astream 一步输出中各节点写入 messages 通道的消息"""
+        return [
+            msg
+            for node_output in output.values()
+            if isinstance(node_output, dict)
+            for msg in node_output.get('messages') or []
+        ]
+
+    async def _record_turn_messages(self, turn_messages, new_messages):
+        """
+        按 add_messages 规则把新消息并入本轮 state 并同步索引（回合进行中），返回合并后的消息
+        
+        与 checkpoint 使用同一 reducer，避免每步重新读取并反序列化整段 checkpoint；
+        回合结束时仍以 aget_state 的结果做最终同步。
+        """
+        if not new_messages:
+            return turn_messages
+        turn_messages = add_messages(turn_messages, new_messages)
+        await self._record_message_stats(turn_messages, in_flight=True)
+        return turn_messages
+
+    async def _record_message_stats_from_state(self, config):
+        """重新读取 state 后调用 _record_message_stats（递归上限、异常、停止清理等未走正常收尾的路径）"""
+        try:
+            app = await get_async_app()
+            state = await app.aget_state(config)
+            await self._record_message_stats(state.values.get("messages", []) if state and state.values else [])
+        except Exception as e:
+            logger.warning(f"[会话统计] 读取 state 失败: {e}")
+
     async def _check_and_summarize(self, messages, config):
         """
         检查是否需要执行历史总结，如果需要则执行
@@ -1358,9 +1437,11 @@ class AgentConsumer(AsyncWebsocketConsumer):
             # 获取现有总结
             summary_metadata = await database_sync_to_async(session.get_summary_metadata)()
             
-            # Token 计算器
+            # Token 计算器（复用会话内已计算过的单条消息 token 数）
+            token_method = opt_config.get('token_calculation_method', 'estimate')
             calculator = TokenCalculator(
-                method=opt_config.get('token_calculation_method', 'estimate')
+                method=token_method,
+                cache=session.load_message_token_cache(token_method)
             )
             
             # 获取模型上下文窗口和模型 ID
@@ -1385,7 +1466,9 @@ class AgentConsumer(AsyncWebsocketConsumer):
             logger.debug(f"[总结] 真实 token 参考值: {actual_tokens}t (source={session.last_input_tokens_source}), max_tokens={summarizer.max_tokens}")
 
             # 检查是否需要总结
-            if not summarizer.should_summarize(messages, summary_metadata, actual_total_tokens=actual_tokens):
+            should_summarize = summarizer.should_summarize(messages, summary_metadata, actual_total_tokens=actual_tokens)
+            await database_sync_to_async(session.save_message_token_cache)(calculator.cache)
+            if not should_summarize:
                 return
             
             logger.info(f"[总结] 触发历史总结: session={session_id}, messages={len(messages)}, actual_tokens={actual_tokens}t")
@@ -10,14 +10,112 @@ Author: Agent Service
 Created: 2026-01-02
 """
 
+import hashlib
 import json
 import logging
+import threading
+from collections import OrderedDict
 from typing import List, Optional, Dict, Any, Tuple
 from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage, AIMessage, ToolMessage
 
 from logger import logger
 
 
+# tiktoken encoder 按模型名进程内共享，避免每个 TokenCalculator 重新加载编码表
+_TIKTOKEN_ENCODERS: Dict[str, Any] = {}
+_TIKTOKEN_LOCK = threading.Lock()
+
+
+def get_shared_tiktoken_encoder(model: str):
+    """
+    获取进程内共享的 tiktoken encoder
+
+    Returns:
+        encoder；未安装 tiktoken 时返回 None
+    """
+    encoder = _TIKTOKEN_ENCODERS.get(model)
+    if encoder is not None:
+        return encoder
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    with _TIKTOKEN_LOCK:
+        encoder = _TIKTOKEN_ENCODERS.get(model)
+        if encoder is None:
+            try:
+                encoder = tiktoken.encoding_for_model(model)
+            except KeyError:
+                # 如果模型不支持，使用 cl100k_base (GPT-4 系列)
+                encoder = tiktoken.get_encoding("cl100k_base")
+            _TIKTOKEN_ENCODERS[model] = encoder
+    return encoder
+
+
+class MessageTokenCache:
+    """
+    单条消息 token 数缓存（随 AgentSession.message_token_cache 持久化）
+
+    键为 "消息 ID|内容哈希"：内容被编辑或压缩后哈希变化，自然重新计算；
+    计算方式或模型变化时整体失效。按最近使用淘汰，最多保留 max_entries 条。
+    """
+
+    def __init__(self, method: str, model: str, entries=None, max_entries: int = 4000):
+        self.method = method
+        self.model = model
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, int]" = OrderedDict(entries or ())
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_payload(cls, payload: Optional[Dict[str, Any]], method: str, model: str, **kwargs) -> 'MessageTokenCache':
+        """从持久化结构恢复；计算方式或模型不一致时返回空缓存。"""
+        payload = payload or {}
+        if payload.get('method') != method or payload.get('model') != model:
+            return cls(method, model, **kwargs)
+        return cls(method, model, entries=[tuple(item) for item in payload.get('entries', [])], **kwargs)
+
+    def to_payload(self) -> Dict[str, Any]:
+        return {
+            'method': self.method,
+            'model': self.model,
+            'entries': [[key, tokens] for key, tokens in self._entries.items()],
+        }
+
+    @staticmethod
+    def key_for(message: BaseMessage) -> str:
+        """消息 ID + 参与计数的内容（content / tool_calls / reasoning_content）的哈希"""
+        parts = [message.type, message.content]
+        if isinstance(message, AIMessage):
+            parts.append([[tc.get("name", ""), tc.get("args", {})] for tc in (message.tool_calls or [])])
+            parts.append((getattr(message, 'additional_kwargs', None) or {}).get('reasoning_content'))
+        digest = hashlib.blake2b(
+            json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str).encode('utf-8'), digest_size=12
+        ).hexdigest()
+        return f"{message.id or ''}|{digest}"
+
+    def get(self, key: str) -> Optional[int]:
+        tokens = self._entries.get(key)
+        if tokens is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return tokens
+
+    def put(self, key: str, tokens: int) -> None:
+        self._entries[key] = tokens
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self.dirty = True
+
+    def info(self) -> Dict[str, int]:
+        return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
 class TokenCalculator:
     """
     Token 计算器
@@ -26,35 +124,30 @@ class TokenCalculator:
     1. actual: 从 LangGraph response_metadata 读取实际值
     2. tiktoken: 使用 tiktoken 库精确计算
     3. estimate: 粗略估算 (1 token ≈ 2.5 字符)
+
+    传入 cache 时按消息 ID + 内容哈希复用已算过的单条消息 token 数，每轮只计算新增/变化的消息。
     """
 
-    def __init__(self, method: str = "actual", model: str = "gpt-3.5-turbo"):
+    def __init__(self, method: str = "actual", model: str = "gpt-3.5-turbo", cache: Optional[MessageTokenCache] = None):
         """
         初始化 Token 计算器
 
         Args:
             method: 计算方式 ("actual", "tiktoken", "estimate")
             model: 模型名称 (用于 tiktoken)
+            cache: 单条消息 token 缓存（可选）
         """
         self.method = method
         self.model = model
-        self._tiktoken_encoder = None
+        self.cache = cache
 
     def _get_tiktoken_encoder(self):
-        """懒加载 tiktoken encoder"""
-        if self._tiktoken_encoder is None:
-            try:
-                import tiktoken
-                try:
-                    self._tiktoken_encoder = tiktoken.encoding_for_model(self.model)
-                except KeyError:
-                    # 如果模型不支持，使用 cl100k_base (GPT-4 系列)
-                    self._tiktoken_encoder = tiktoken.get_encoding("cl100k_base")
-            except ImportError:
-                logger.warning("tiktoken not installed, falling back to estimate method")
-                self.method = "estimate"
-                return None
-        return self._tiktoken_encoder
+        """获取共享的 tiktoken encoder"""
+        encoder = get_shared_tiktoken_encoder(self.model)
+        if encoder is None:
+            logger.warning("tiktoken not installed, falling back to estimate method")
+            self.method = "estimate"
+        return encoder
 
     def calculate_text(self, text: str) -> int:
         """
@@ -88,6 +181,16 @@ class TokenCalculator:
         Returns:
             token 数量
         """
+        if self.cache is None:
+            return self._count_message(message)
+        key = MessageTokenCache.key_for(message)
+        tokens = self.cache.get(key)
+        if tokens is None:
+            tokens = self._count_message(message)
+            self.cache.put(key, tokens)
+        return tokens
+
+    def _count_message(self, message: BaseMessage) -> int:
         content = message.content
 
         if isinstance(content, str):
@@ -183,6 +286,48 @@ class TokenCalculator:
         }
 
 
+class CompressedToolContentCache:
+    """
+    工具输出压缩结果的有界 LRU（进程内共享）
+
+    压缩结果只取决于工具输出与压缩参数，key 含 tool_call_id、内容哈希、max_tokens、
+    排除规则与计算方式；值为 (压缩后内容或 None 表示无需压缩, 原始 token 数)。
+    """
+
+    def __init__(self, maxsize: int = 5000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple, Tuple[Optional[str], int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compress(self, key: Tuple, compress) -> Tuple[Optional[str], int]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        entry = compress()
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def info(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries), 'maxsize': self.maxsize}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
 class ToolMessageCompressor:
     """
     工具消息压缩器
@@ -191,8 +336,12 @@ class ToolMessageCompressor:
     1. 检测工具输出是否超过阈值
     2. 智能压缩 JSON 格式的输出
     3. 保留关键信息（成功/失败、数量、首尾项）
+
+    压缩结果按 compressed_outputs 在各轮之间复用，历史工具消息只在第一次越过保留窗口时解析。
     """
 
+    compressed_outputs = CompressedToolContentCache()
+
     def __init__(self, max_tokens: int = 200, exclude_tools: Optional[List[str]] = None, exclude_prefixes: Optional[List[str]] = None):
         """
         初始化压缩器
@@ -250,16 +399,24 @@ class ToolMessageCompressor:
         if not isinstance(content, str):
             content = json.dumps(content, ensure_ascii=False)
 
-        # 计算当前 token 数
-        current_tokens = calculator.calculate_text(content)
+        key = (
+            message.tool_call_id,
+            hashlib.blake2b(content.encode('utf-8'), digest_size=16).hexdigest(),
+            tool_name or "",
+            self.max_tokens,
+            tuple(self.exclude_tools),
+            tuple(self.exclude_prefixes),
+            calculator.method,
+            calculator.model,
+        )
+        compressed_content, current_tokens = self.compressed_outputs.get_or_compress(
+            key, lambda: self._compress_or_keep(content, tool_name or "", calculator)
+        )
 
         # 不需要压缩
-        if current_tokens <= self.max_tokens:
+        if compressed_content is None:
             return message
 
-        # 尝试压缩
-        compressed_content = self._compress_content(content, tool_name or "", self.max_tokens, calculator)
-
         # 创建新的压缩消息
         return ToolMessage(
             content=compressed_content,
@@ -272,6 +429,13 @@ class ToolMessageCompressor:
             }
         )
 
+    def _compress_or_keep(self, content: str, tool_name: str, calculator: TokenCalculator) -> Tuple[Optional[str], int]:
+        """计算原始 token 数；超过阈值时返回压缩后的内容，否则内容为 None"""
+        current_tokens = calculator.calculate_text(content)
+        if current_tokens <= self.max_tokens:
+            return None, current_tokens
+        return self._compress_content(content, tool_name, self.max_tokens, calculator), current_tokens
+
     def _compress_content(
         self,
         content: str,
@@ -493,9 +657,10 @@ def get_all_models(user) -> Dict[str, Dict]:
     try:
         agent_config_data = UserData.objects.filter(user=user, key='agent_config').first()
         if agent_config_data:
-            config = agent_config_data.get_value()
-            # 解密配置中的 API 密钥
-            config = SecureKeyStorage.decrypt_model_config(config, user.id)
+            # 解密配置中的 API 密钥（按原始值缓存，配置未变时不重复解析与解密）
+            config = SecureKeyStorage.decrypt_model_config_cached(
+                agent_config_data.value, user.id, agent_config_data.get_value
+            )
             custom_models = config.get('custom_models', {})
             for model_id, model_config in custom_models.items():
                 all_models[model_id] = {
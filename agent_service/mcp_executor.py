@@ -0,0 +1,151 @@
+"""
+MCP 工具执行池
+
+sync_to_async 默认 thread_sensitive=True，所有 MCP 工具调用共用同一个线程串行执行，
+一个慢查询会阻塞所有已连接的客户端。这里用固定数量的 worker 线程执行同步工具：
+- 按用户排队、轮转出队，并限制单用户同时占用的 worker 数，避免一个客户端占满池子；
+- 每个任务前后调用 close_old_connections，worker 线程的 DB 连接与请求线程一样按 CONN_MAX_AGE 回收；
+- 任务在提交时复制的 contextvars 中执行，工具仍能读取认证用户、请求 ID 等上下文。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Hashable
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+
+@dataclass(slots=True)
+class _Job:
+    user_key: Hashable
+    func: Callable[..., Any]
+    args: tuple
+    kwargs: dict
+    context: contextvars.Context
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class McpToolExecutor:
+    """有界 worker 池 + 按用户公平调度；max_workers <= 0 时退回 thread_sensitive 串行执行。"""
+
+    def __init__(self, max_workers: int, per_user_limit: int = 2):
+        self.max_workers = max_workers
+        self.per_user_limit = max(per_user_limit, 1)
+        self._queues: OrderedDict[Hashable, deque[_Job]] = OrderedDict()
+        self._running: dict[Hashable, int] = {}
+        self._condition = threading.Condition()
+        self._workers: list[threading.Thread] = []
+        self._queued = 0
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._cancelled = 0
+        self._max_queue_depth = 0
+        self._wait_seconds = 0.0
+
+    @classmethod
+    def from_settings(cls) -> 'McpToolExecutor':
+        return cls(
+            max_workers=int(getattr(settings, 'MCP_TOOL_WORKERS', 8)),
+            per_user_limit=int(getattr(settings, 'MCP_TOOL_PER_USER_CONCURRENCY', 2)),
+        )
+
+    async def run(self, user_key: Hashable, func: Callable[..., Any], /, *args, **kwargs) -> Any:
+        """在池中执行同步工具并等待结果；调用方被取消时，尚未开始的任务随之取消。"""
+        if self.max_workers <= 0:
+            return await sync_to_async(func)(*args, **kwargs)
+        return await asyncio.wrap_future(self.submit(user_key, func, *args, **kwargs))
+
+    def submit(self, user_key: Hashable, func: Callable[..., Any], /, *args, **kwargs) -> Future:
+        job = _Job(user_key, func, args, kwargs, contextvars.copy_context())
+        with self._condition:
+            self._ensure_workers()
+            self._queues.setdefault(user_key, deque()).append(job)
+            self._queued += 1
+            self._max_queue_depth = max(self._max_queue_depth, self._queued)
+            self._condition.notify()
+        return job.future
+
+    def info(self) -> dict[str, Any]:
+        with self._condition:
+            started = self._completed + self._failed + self._cancelled + self._in_flight
+            return {
+                'workers': self.max_workers,
+                'per_user_limit': self.per_user_limit,
+                'queued': self._queued,
+                'queued_users': len(self._queues),
+                'in_flight': self._in_flight,
+                'completed': self._completed,
+                'failed': self._failed,
+                'cancelled': self._cancelled,
+                'max_queue_depth': self._max_queue_depth,
+                'avg_wait_ms': round(self._wait_seconds * 1000 / started, 2) if started else 0.0,
+            }
+
+    def _ensure_workers(self) -> None:
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(
+                target=self._work, name=f'mcp-tool-{len(self._workers)}', daemon=True,
+            )
+            self._workers.append(worker)
+            worker.start()
+
+    def _next_job(self) -> _Job | None:
+        """按用户轮转：取第一个未达并发上限的用户，出队后把该用户移到队尾。"""
+        for user_key, queue in self._queues.items():
+            if self._running.get(user_key, 0) >= self.per_user_limit:
+                continue
+            job = queue.popleft()
+            if queue:
+                self._queues.move_to_end(user_key)
+            else:
+                del self._queues[user_key]
+            return job
+        return None
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                job = self._next_job()
+                while job is None:
+                    self._condition.wait()
+                    job = self._next_job()
+                self._queued -= 1
+                self._in_flight += 1
+                self._running[job.user_key] = self._running.get(job.user_key, 0) + 1
+                self._wait_seconds += time.monotonic() - job.enqueued_at
+            outcome = '_completed'
+            if not job.future.set_running_or_notify_cancel():
+                # 排队期间调用方已取消，任务没有执行，单独计数以免 completed 虚高。
+                outcome = '_cancelled'
+            else:
+                close_old_connections()
+                try:
+                    result = job.context.run(job.func, *job.args, **job.kwargs)
+                except BaseException as exc:
+                    outcome = '_failed'
+                    job.future.set_exception(exc)
+                else:
+                    job.future.set_result(result)
+                finally:
+                    close_old_connections()
+            with self._condition:
+                self._in_flight -= 1
+                setattr(self, outcome, getattr(self, outcome) + 1)
+                remaining = self._running[job.user_key] - 1
+                if remaining:
+                    self._running[job.user_key] = remaining
+                else:
+                    del self._running[job.user_key]
+                # 释放的用户名额可能让其他 worker 等待中的任务变为可执行。
+                self._condition.notify_all()
@@ -0,0 +1,188 @@
+"""
+会话消息侧索引 (AgentMessageIndex)
+
+LangGraph checkpoint 把整段 messages 作为一个 blob 保存，读取任意一条都要反序列化全部历史。
+这里在写入时维护按下标的消息索引（ID、类型、预览、估算 token、历史接口结构）：
+- consumer 在回合开始、每步节点输出后、回合结束、停止清理、回滚后调用 sync，只重写与 state 不一致的尾部；
+- 历史分页按 before_index/limit 读取一页，上下文估算直接求和 token_count；
+- 尚未同步过的历史会话在首次读取时从 checkpoint 回填一次。
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Sum
+
+from agent_service.models import AgentMessageIndex, AgentSession
+
+
+# 历史接口返回的消息类型（system 等其余类型只用于上下文可视化）
+HISTORY_ROLES = ('human', 'ai', 'tool')
+
+def estimate_tokens(content: Any) -> int:
+    """粗略估算 token 数；多模态 content 只计文本部分，图片按 low detail 约 85 计。"""
+    if not content:
+        return 0
+    if isinstance(content, list):
+        total = 0
+        for block in content:
+            if isinstance(block, dict):
+                if block.get('type') == 'text':
+                    total += estimate_tokens(block.get('text', ''))
+                elif block.get('type') == 'image_url':
+                    total += 85
+            elif isinstance(block, str):
+                total += estimate_tokens(block)
+        return total
+    if not isinstance(content, str):
+        content = str(content)
+    # 简单估算：中文字符多的情况
+    chinese_chars = sum(1 for c in content if '\u4e00' <= c <= '\u9fff')
+    other_chars = len(content) - chinese_chars
+    return int(chinese_chars * 0.7 + other_chars * 0.3) + 4  # +4 是消息开销
+
+
+def message_text(content: Any) -> str:
+    """提取 content 的文本部分。"""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return '\n'.join(
+            block.get('text', '') for block in content if isinstance(block, dict) and block.get('type') == 'text'
+        )
+    return str(content or '')
+
+
+def format_message(msg, index: int) -> Dict[str, Any]:
+    """
+    历史接口的消息结构（不含随回滚窗口变化的 can_rollback）
+
+    human 额外带 has_attachment_context、tool 额外带 status 供上下文可视化使用；
+    其余类型只保留 role/content/index，历史接口不返回。
+    """
+    msg_type = getattr(msg, 'type', None)
+    if msg_type == 'human':
+        additional_kwargs = getattr(msg, 'additional_kwargs', None) or {}
+        return {
+            "role": "user",
+            "content": msg.content,
+            "id": msg.id,
+            "index": index,
+            "attachments": additional_kwargs.get('attachments_metadata', []),
+            "has_attachment_context": bool(additional_kwargs.get('attachments_context', '')),
+        }
+    if msg_type == 'ai':
+        item = {
+            "role": "assistant",
+            "content": msg.content,
+            "id": msg.id,
+            "index": index,
+            "tool_calls": [
+                {"name": tc.get("name"), "args": tc.get("args")}
+                for tc in (msg.tool_calls or [])
+            ] if msg.tool_calls else None
+        }
+        reasoning_content = (getattr(msg, 'additional_kwargs', None) or {}).get('reasoning_content')
+        if reasoning_content:
+            item["reasoning_content"] = reasoning_content
+        return item
+    if msg_type == 'tool':
+        return {
+            "role": "tool",
+            "content": msg.content,
+            "tool_call_id": msg.tool_call_id,
+            "name": getattr(msg, 'name', None),
+            "status": getattr(msg, 'status', ''),
+            "index": index
+        }
+    return {"role": msg_type or "", "content": getattr(msg, 'content', ''), "index": index}
+
+
+def message_tokens(msg) -> int:
+    tokens = estimate_tokens(getattr(msg, 'content', '') or '')
+    for tc in getattr(msg, 'tool_calls', None) or []:
+        tokens += estimate_tokens(str(tc.get('args', {})))
+    return tokens
+
+
+def page_bounds(total: int, *, before_index: Optional[int] = None, limit: int = 0) -> Tuple[int, int]:
+    """历史分页的 [start, end) 下标范围；before_index 缺省为总数，limit<=0 表示取到开头。"""
+    end = total if before_index is None else max(0, min(before_index, total))
+    start = max(0, end - limit) if limit > 0 else 0
+    return start, end
+
+
+class MessageIndexService:
+    """AgentMessageIndex 的同步与分页读取。"""
+
+    @classmethod
+    def sync(cls, session_id: str, messages, *, in_flight: bool = False) -> Dict[str, Any]:
+        """
+        按最新 state 写回会话列表统计，并增量同步消息索引
+
+        从第一条 (下标, 消息 ID) 与已有索引不一致的位置开始重写；
+        正常追加只插入新消息，回滚截断只删除尾部。
+        in_flight 见 AgentSession.record_message_stats。
+
+        Returns:
+            会话列表统计，附带本次写入的索引行数 indexed
+        """
+        stats = AgentSession.record_message_stats(session_id, messages, in_flight=in_flight)
+        session_pk = AgentSession.objects.filter(session_id=session_id).values_list('pk', flat=True).first()
+        if session_pk is None:
+            return {**stats, "indexed": 0}
+        existing = dict(
+            AgentMessageIndex.objects.filter(session_id=session_pk).values_list('index', 'message_id')
+        )
+        keep = len(messages)
+        for index, msg in enumerate(messages):
+            if existing.get(index) != (getattr(msg, 'id', None) or ''):
+                keep = index
+                break
+        rows = [
+            AgentMessageIndex(
+                session_id=session_pk,
+                index=index,
+                message_id=getattr(msg, 'id', None) or '',
+                role=(getattr(msg, 'type', None) or '')[:16],
+                preview=message_text(getattr(msg, 'content', ''))[:200],
+                token_count=message_tokens(msg),
+                payload=format_message(msg, index),
+            )
+            for index, msg in enumerate(messages[keep:], start=keep)
+        ]
+        if rows or len(existing) > keep:
+            with transaction.atomic():
+                AgentMessageIndex.objects.filter(session_id=session_pk, index__gte=keep).delete()
+                AgentMessageIndex.objects.bulk_create(rows, batch_size=500)
+        return {**stats, "indexed": len(rows)}
+
+    @classmethod
+    def page(
+        cls, session: AgentSession, *, before_index: Optional[int] = None, limit: int = 0,
+    ) -> Tuple[List[AgentMessageIndex], int, int]:
+        """
+        读取下标位于 [before_index - limit, before_index) 的一页（升序）
+
+        Args:
+            before_index: 不含的上界，默认为消息总数
+            limit: 每页条数，0 表示不限制
+
+        Returns:
+            (该页索引行, 消息总数, 该页起始下标)
+        """
+        rows = AgentMessageIndex.objects.filter(session=session)
+        last = rows.order_by('-index').values_list('index', flat=True).first()
+        total = 0 if last is None else last + 1
+        start, end = page_bounds(total, before_index=before_index, limit=limit)
+        return list(rows.filter(index__gte=start, index__lt=end).order_by('index')), total, start
+
+    @classmethod
+    def total_tokens(cls, session: AgentSession) -> int:
+        return AgentMessageIndex.objects.filter(session=session).aggregate(total=Sum('token_count'))['total'] or 0
+
+    @classmethod
+    def last_human(cls, session: AgentSession) -> Optional[AgentMessageIndex]:
+        return AgentMessageIndex.objects.filter(session=session, role='human').order_by('-index').first()
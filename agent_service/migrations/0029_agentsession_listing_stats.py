@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('agent_service', '0028_agent_rollback_window'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agentsession',
+            name='is_empty',
+            field=models.BooleanField(default=True, help_text='LangGraph state 中是否没有任何消息'),
+        ),
+        migrations.AddField(
+            model_name='agentsession',
+            name='message_stats_synced_at',
+            field=models.DateTimeField(blank=True, help_text='message_count/last_message_preview/is_empty 最近一次与 state 同步的时间；为空表示尚未同步', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='agentsession',
+            index=models.Index(fields=['user', 'is_active', 'is_empty', '-updated_at', '-id'], name='agent_session_listing'),
+        ),
+    ]
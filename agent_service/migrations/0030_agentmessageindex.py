@@ -0,0 +1,37 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def reset_message_stats_sync(apps, schema_editor):
+    # 消息索引从 checkpoint 惰性回填：清空同步时间，让已有会话在下次读取时连同索引一起重新同步
+    AgentSession = apps.get_model('agent_service', 'AgentSession')
+    AgentSession.objects.update(message_stats_synced_at=None)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('agent_service', '0029_agentsession_listing_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgentMessageIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField(help_text='消息在 state.messages 中的下标')),
+                ('message_id', models.CharField(blank=True, default='', help_text='LangChain 消息 ID', max_length=200)),
+                ('role', models.CharField(help_text='消息类型：human/ai/tool/system', max_length=16)),
+                ('preview', models.CharField(blank=True, default='', help_text='文本预览', max_length=200)),
+                ('token_count', models.IntegerField(default=0, help_text='估算 token 数')),
+                ('payload', models.JSONField(blank=True, default=dict, encoder=DjangoJSONEncoder, help_text='历史接口返回的消息结构')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='message_index', to='agent_service.agentsession')),
+            ],
+            options={
+                'verbose_name': 'Agent 消息索引',
+                'verbose_name_plural': 'Agent 消息索引',
+                'constraints': [models.UniqueConstraint(fields=('session', 'index'), name='agent_message_index_uniq')],
+            },
+        ),
+        migrations.RunPython(reset_message_stats_sync, migrations.RunPython.noop),
+    ]
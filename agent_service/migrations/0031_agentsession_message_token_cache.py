@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('agent_service', '0030_agentmessageindex'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agentsession',
+            name='message_token_cache',
+            field=models.JSONField(blank=True, default=dict, help_text='单条消息 token 数缓存'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('agent_service', '0031_agentsession_message_token_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agentsession',
+            name='turn_heartbeat_at',
+            field=models.DateTimeField(
+                blank=True, null=True,
+                help_text='回合进行中最近一次同步消息索引的时间；回合结束时清空，过期表示进程在回合中途退出',
+            ),
+        ),
+    ]
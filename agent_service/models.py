@@ -1,3 +1,4 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
@@ -66,6 +67,9 @@ class AgentSession(models.Model):
     # 格式: {"0": {"input_tokens": 3949, "source": "actual", "timestamp": "2024-..."}, "1": {...}, ...}
     # 键为消息索引（字符串），值为该轮对话的 input_tokens 数据
     token_snapshots = models.JSONField(default=dict, blank=True, help_text="每轮对话的 Token 快照")
+    # 单条消息 token 数缓存（context_optimizer.MessageTokenCache），每轮只计算新增/变化的消息
+    # 格式: {"method": "tiktoken", "model": "gpt-3.5-turbo", "entries": [["<消息ID>|<内容哈希>", 128], ...]}
+    message_token_cache = models.JSONField(default=dict, blank=True, help_text="单条消息 token 数缓存")
 
     # ========== Agent 状态快照字段（[AGENT_STATE] 机制）==========
     # 格式: {
@@ -80,10 +84,24 @@ class AgentSession(models.Model):
         help_text="最近一次 LLM 请求的完整序列化快照（用于前端可视化调试）"
     )
 
+    # ========== 会话列表统计（写入时维护，列表页不读取 checkpoint）==========
+    is_empty = models.BooleanField(default=True, help_text="LangGraph state 中是否没有任何消息")
+    message_stats_synced_at = models.DateTimeField(
+        null=True, blank=True,
+        help_text="message_count/last_message_preview/is_empty 最近一次与 state 同步的时间；为空表示尚未同步"
+    )
+    turn_heartbeat_at = models.DateTimeField(
+        null=True, blank=True,
+        help_text="回合进行中最近一次同步消息索引的时间；回合结束时清空，过期表示进程在回合中途退出"
+    )
+
     class Meta:
         ordering = ['-updated_at']
         verbose_name = "Agent 会话"
         verbose_name_plural = "Agent 会话"
+        indexes = [
+            models.Index(fields=['user', 'is_active', 'is_empty', '-updated_at', '-id'], name='agent_session_listing'),
+        ]
 
     def __str__(self):
         return f"{self.user.username}: {self.name or self.session_id}"
@@ -122,6 +140,65 @@ class AgentSession(models.Model):
         )
         return session, True
     
+    @staticmethod
+    def compute_message_stats(messages) -> dict:
+        """
+        由 state 消息计算会话列表所需的统计
+        message_count 为用户消息数（更准确地反映对话轮数），没有用户消息时退回全部消息数；
+        预览取最后一条用户消息的文本部分，多模态消息中的图片不进入预览。
+        """
+        human_messages = [m for m in messages if getattr(m, 'type', None) == 'human']
+        preview = ""
+        if human_messages:
+            content = getattr(human_messages[-1], 'content', "")
+            if isinstance(content, list):
+                content = " ".join(
+                    part.get('text', '') if isinstance(part, dict) else str(part)
+                    for part in content
+                    if not isinstance(part, dict) or part.get('type') == 'text'
+                )
+            preview = str(content)[:100]
+        return {
+            "message_count": len(human_messages) or len(messages),
+            "last_message_preview": preview,
+            "is_empty": not messages,
+        }
+
+    @classmethod
+    def record_message_stats(cls, session_id: str, messages, *, in_flight: bool = False) -> dict:
+        """
+        按最新 state 写回列表统计；只做一次 UPDATE，不改变 updated_at（列表排序仍按最近活动）
+
+        in_flight=True 表示回合仍在进行：刷新 turn_heartbeat_at，回合结束的同步再清空。
+        """
+        stats = cls.compute_message_stats(messages)
+        now = timezone.now()
+        cls.objects.filter(session_id=session_id).update(
+            **stats, message_stats_synced_at=now, turn_heartbeat_at=now if in_flight else None
+        )
+        return stats
+
+    @staticmethod
+    def _turn_stale_before():
+        from django.conf import settings
+        return timezone.now() - timedelta(seconds=getattr(settings, 'AGENT_TURN_HEARTBEAT_STALE_SECONDS', 600))
+
+    @classmethod
+    def message_stats_stale_q(cls) -> models.Q:
+        """
+        需要从 checkpoint 自愈的会话：从未同步，或回合心跳已过期（进程在回合中途退出）
+
+        回合进行中且心跳新鲜的会话由 consumer 自己同步，读取方不读 checkpoint。
+        """
+        return models.Q(message_stats_synced_at__isnull=True) | models.Q(turn_heartbeat_at__lt=cls._turn_stale_before())
+
+    @property
+    def message_stats_stale(self) -> bool:
+        """message_stats_stale_q 的单条判断"""
+        if self.message_stats_synced_at is None:
+            return True
+        return self.turn_heartbeat_at is not None and self.turn_heartbeat_at < self._turn_stale_before()
+
     def get_summary_metadata(self):
         """
         获取总结元数据（如果有）
@@ -203,6 +280,24 @@ class AgentSession(models.Model):
         self.last_input_tokens_updated_at = timezone.now()
         self.save(update_fields=['last_input_tokens', 'last_input_tokens_source', 'last_input_tokens_updated_at'])
     
+    def load_message_token_cache(self, method: str, model: str = "gpt-3.5-turbo"):
+        """
+        按当前计算方式恢复单条消息 token 缓存
+        只有 tiktoken 需要缓存；estimate 按字符数计算，比算内容哈希更便宜，返回 None
+        """
+        if method != "tiktoken":
+            return None
+        from agent_service.context_optimizer import MessageTokenCache
+        return MessageTokenCache.from_payload(self.message_token_cache, method, model)
+
+    def save_message_token_cache(self, cache) -> None:
+        """缓存有新增条目时写回；只更新该字段"""
+        if cache is None or not cache.dirty:
+            return
+        self.message_token_cache = cache.to_payload()
+        type(self).objects.filter(pk=self.pk).update(message_token_cache=self.message_token_cache)
+        cache.dirty = False
+
     def save_token_snapshot(self, message_index: int, input_tokens: int, tokens_source: str = 'actual', cache_stats: dict = None):
         """
         保存某轮对话的 Token 快照（用于回滚时恢复显示）
@@ -424,6 +519,28 @@ class AgentUsageRecord(models.Model):
         return f"{self.user.username}: {self.model_id} ¥{self.cost_total:.6f}"
 
 
+class AgentMessageIndex(models.Model):
+    """
+    会话消息侧索引
+    与 LangGraph state.messages 按下标一一对应，每轮结束后增量同步；
+    历史分页、上下文可视化与 token 估算只读本表，不反序列化 checkpoint。
+    """
+    session = models.ForeignKey(AgentSession, on_delete=models.CASCADE, related_name='message_index')
+    index = models.PositiveIntegerField(help_text="消息在 state.messages 中的下标")
+    message_id = models.CharField(max_length=200, blank=True, default="", help_text="LangChain 消息 ID")
+    role = models.CharField(max_length=16, help_text="消息类型：human/ai/tool/system")
+    preview = models.CharField(max_length=200, blank=True, default="", help_text="文本预览")
+    token_count = models.IntegerField(default=0, help_text="估算 token 数")
+    payload = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder, help_text="历史接口返回的消息结构")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['session', 'index'], name='agent_message_index_uniq'),
+        ]
+        verbose_name = "Agent 消息索引"
+        verbose_name_plural = "Agent 消息索引"
+
+
 class UserMemory(models.Model):
     """
     用户核心画像 (Core Profile)
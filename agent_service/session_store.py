@@ -246,3 +246,28 @@ def load_state_snapshot(session: AgentSession) -> Optional[Dict[str, Any]]:
     except Exception as e:
         logger.warning(f"[SessionStore] load_state_snapshot 失败: {e}")
         return None
+
+
+def sync_message_stats_from_checkpoint(session: AgentSession) -> Dict[str, Any]:
+    """
+    从 LangGraph checkpoint 读取一次消息并写回会话列表统计与消息索引。
+    仅用于历史会话回填与尚未同步会话的自愈；正常对话由 consumer 在写入时维护。
+
+    Args:
+        session: AgentSession 实例（原地更新统计字段）
+
+    Returns:
+        写回的统计字典
+    """
+    from django.utils import timezone
+    from agent_service.agent_graph import app
+    from agent_service.message_index import MessageIndexService
+
+    state = app.get_state({"configurable": {"thread_id": session.session_id}})
+    messages = state.values.get("messages", []) if state and state.values else []
+    stats = MessageIndexService.sync(session.session_id, messages)
+    for field in ('message_count', 'last_message_preview', 'is_empty'):
+        setattr(session, field, stats[field])
+    session.message_stats_synced_at = timezone.now()
+    session.turn_heartbeat_at = None
+    return stats
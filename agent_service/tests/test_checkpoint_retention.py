@@ -0,0 +1,83 @@
+import os
+import sqlite3
+import tempfile
+import time
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.base.id import uuid6
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from agent_service.agent_graph import workflow
+from agent_service.checkpoint_retention import CheckpointRetentionService, checkpoint_time
+from agent_service.models import AgentRollbackWindow, AgentSession
+from agent_service.rollback_windows import AgentRollbackWindowService
+
+
+class CheckpointRetentionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='checkpoint-retention-user', password='test-password')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.db_path = os.path.join(directory.name, 'checkpoints.sqlite')
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.addCleanup(self.conn.close)
+        self.graph = workflow.compile(checkpointer=SqliteSaver(self.conn))
+
+    def _append(self, thread_id: str, turns: int):
+        config = {'configurable': {'thread_id': thread_id}}
+        for turn in range(turns):
+            self.graph.update_state(config, {'messages': [
+                HumanMessage(content=f'{thread_id} 问{turn}'), AIMessage(content=f'答{turn}'),
+            ]}, as_node='agent')
+        return config
+
+    def _checkpoint_count(self, thread_id: str) -> int:
+        return self.conn.execute('SELECT COUNT(*) FROM checkpoints WHERE thread_id = ?', (thread_id,)).fetchone()[0]
+
+    def test_checkpoint_time_decodes_uuid6_and_expiry_keeps_window_floor(self):
+        before = timezone.now()
+        ids = [str(uuid6(clock_seq=step)) for step in range(6)]
+        self.assertLessEqual(abs((checkpoint_time(ids[0]) - before).total_seconds()), 1)
+        self.assertIsNone(checkpoint_time('not-a-uuid'))
+
+        self.assertEqual(CheckpointRetentionService.expired_ids(ids, keep_latest=2), ids[:4][::-1])
+        opened = checkpoint_time(ids[3])
+        # 窗口打开后的 ids[3:] 与打开前最后一条 ids[2] 都保留
+        self.assertEqual(
+            CheckpointRetentionService.expired_ids(ids, keep_latest=1, pinned_since=opened), [ids[1], ids[0]]
+        )
+
+    def test_compact_keeps_latest_and_rollback_window_checkpoints(self):
+        plain = self._append('user_1_plain', 8)
+        pinned_thread = f'user_{self.user.id}_pinned'
+        session = AgentSession.objects.create(user=self.user, session_id=pinned_thread, name='pinned')
+        pinned = self._append(pinned_thread, 4)
+        time.sleep(0.01)
+        window = AgentRollbackWindowService.ensure_active(user=self.user, session_id=pinned_thread, floor_message_index=8)
+        AgentRollbackWindow.objects.filter(pk=window.pk).update(opened_at=timezone.now())
+        self._append(pinned_thread, 3)
+        self.assertEqual(session.rollback_windows.count(), 1)
+
+        report = CheckpointRetentionService.compact(self.db_path, keep_latest=2)
+
+        self.assertEqual(self._checkpoint_count('user_1_plain'), 2)
+        self.assertEqual(self._checkpoint_count(pinned_thread), 4)
+        self.assertEqual(report['deleted']['checkpoints'], 6 + 3)
+        self.assertEqual(report['after']['journal_mode'], 'wal')
+        # 定时压缩不对旧库做完整 VACUUM
+        self.assertEqual(report['after']['auto_vacuum'], 0)
+        self.assertFalse(report['converted_auto_vacuum'])
+        self.assertEqual(len(self.graph.get_state(plain).values['messages']), 16)
+        history = [len(item.values['messages']) for item in self.graph.get_state_history(pinned)]
+        self.assertEqual(history, [14, 12, 10, 8])
+
+        # 维护窗口显式切换一次，之后只做增量回收，不再删除
+        converted = CheckpointRetentionService.compact(self.db_path, keep_latest=2, convert_auto_vacuum=True)
+        self.assertTrue(converted['converted_auto_vacuum'])
+        self.assertEqual(converted['after']['auto_vacuum'], 2)
+        again = CheckpointRetentionService.compact(self.db_path, keep_latest=2, convert_auto_vacuum=True)
+        self.assertEqual(again['deleted'], {'checkpoints': 0, 'writes': 0})
+        self.assertFalse(again['converted_auto_vacuum'])
@@ -0,0 +1,76 @@
+import contextvars
+import threading
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase
+
+from agent_service.mcp_executor import McpToolExecutor
+
+
+_request_var: contextvars.ContextVar[str] = contextvars.ContextVar('test_mcp_request', default='')
+
+
+class McpToolExecutorTests(SimpleTestCase):
+    def test_slow_tool_does_not_block_other_clients(self):
+        executor = McpToolExecutor(max_workers=2)
+        release = threading.Event()
+        slow = executor.submit('user-a', release.wait, 5)
+        fast = executor.submit('user-b', lambda: 'done')
+        self.assertEqual(fast.result(timeout=2), 'done')
+        self.assertFalse(slow.done())
+        release.set()
+        self.assertTrue(slow.result(timeout=2))
+
+    def test_one_user_cannot_occupy_every_worker(self):
+        executor = McpToolExecutor(max_workers=3, per_user_limit=2)
+        release = threading.Event()
+        started = []
+
+        def job(name):
+            started.append(name)
+            release.wait(5)
+            return name
+
+        busy = [executor.submit('user-a', job, f'a{index}') for index in range(4)]
+        other = executor.submit('user-b', job, 'b0')
+        for _ in range(50):
+            if len(started) == 3:
+                break
+            threading.Event().wait(0.02)
+        self.assertCountEqual(started, ['a0', 'a1', 'b0'])
+        self.assertEqual(executor.info()['queued'], 2)
+        self.assertGreaterEqual(executor.info()['max_queue_depth'], 2)
+        release.set()
+        self.assertEqual([item.result(timeout=2) for item in busy], ['a0', 'a1', 'a2', 'a3'])
+        self.assertEqual(other.result(timeout=2), 'b0')
+        info = executor.info()
+        self.assertEqual((info['queued'], info['in_flight'], info['completed']), (0, 0, 5))
+
+    def test_cancelled_queued_job_is_not_counted_as_completed(self):
+        executor = McpToolExecutor(max_workers=1)
+        release = threading.Event()
+        busy = executor.submit('user-a', release.wait, 5)
+        queued = executor.submit('user-a', lambda: 'never')
+        self.assertTrue(queued.cancel())
+        release.set()
+        self.assertTrue(busy.result(timeout=2))
+        for _ in range(50):
+            if executor.info()['queued'] == 0 and executor.info()['in_flight'] == 0:
+                break
+            threading.Event().wait(0.02)
+        info = executor.info()
+        self.assertEqual((info['completed'], info['failed'], info['cancelled']), (1, 0, 1))
+
+    def test_run_propagates_context_result_and_errors(self):
+        executor = McpToolExecutor(max_workers=1)
+
+        async def call(func):
+            _request_var.set('request-1')
+            return await executor.run('user-a', func)
+
+        self.assertEqual(async_to_sync(call)(lambda: (_request_var.get(), threading.current_thread().name)), (
+            'request-1', 'mcp-tool-0',
+        ))
+        with self.assertRaisesRegex(ValueError, 'boom'):
+            async_to_sync(call)(lambda: (_ for _ in ()).throw(ValueError('boom')))
+        self.assertEqual(executor.info()['failed'], 1)
@@ -0,0 +1,254 @@
+from contextlib import ExitStack
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import User
+from django.test import TestCase, TransactionTestCase
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from rest_framework.test import APIClient
+
+from agent_service.consumers import AgentConsumer
+from agent_service.message_index import MessageIndexService
+from agent_service.models import AgentMessageIndex, AgentSession
+
+
+def _conversation(turns: int):
+    messages = []
+    for turn in range(turns):
+        messages.append(HumanMessage(content=f'问题{turn}', id=f'h{turn}'))
+        messages.append(AIMessage(content=f'回答{turn}', id=f'a{turn}'))
+    return messages
+
+
+class MessageIndexTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='message-index-user', password='test-password')
+        self.session = AgentSession.objects.create(
+            user=self.user, session_id=f'user_{self.user.id}_indexed', name='indexed'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _indexed(self):
+        return list(AgentMessageIndex.objects.filter(session=self.session).order_by('index').values_list('index', 'message_id'))
+
+    def test_sync_only_writes_changed_tail(self):
+        messages = _conversation(2)
+        self.assertEqual(MessageIndexService.sync(self.session.session_id, messages)['indexed'], 4)
+
+        appended = messages + [
+            AIMessage(content='', id='a-tool', tool_calls=[{'name': 'search', 'args': {'q': '会议'}, 'id': 'c1'}]),
+            ToolMessage(content='结果', tool_call_id='c1', name='search', id='t1', status='success'),
+        ]
+        self.assertEqual(MessageIndexService.sync(self.session.session_id, appended)['indexed'], 2)
+        self.assertEqual(MessageIndexService.sync(self.session.session_id, appended)['indexed'], 0)
+        tool_row = AgentMessageIndex.objects.get(session=self.session, index=5)
+        self.assertEqual((tool_row.role, tool_row.payload['name'], tool_row.payload['status']), ('tool', 'search', 'success'))
+        self.assertGreater(AgentMessageIndex.objects.get(session=self.session, index=4).token_count, 0)
+
+        # 回滚截断后换了一条新消息
+        rewritten = messages[:2] + [HumanMessage(content='重新提问', id='h-new')]
+        self.assertEqual(MessageIndexService.sync(self.session.session_id, rewritten)['indexed'], 1)
+        self.assertEqual(self._indexed(), [(0, 'h0'), (1, 'a0'), (2, 'h-new')])
+        self.session.refresh_from_db()
+        self.assertEqual((self.session.message_count, self.session.last_message_preview), (2, '重新提问'))
+
+    def test_history_pages_backwards_from_index_without_reading_checkpoint(self):
+        messages = [SystemMessage(content='系统', id='s0')] + _conversation(5)
+        MessageIndexService.sync(self.session.session_id, messages)
+        AgentSession.objects.filter(pk=self.session.pk).update(message_stats_synced_at='2026-01-01T00:00:00Z')
+
+        with patch('agent_service.agent_graph.app') as mocked_app:
+            latest = self.client.get('/api/agent/history/', {'session_id': self.session.session_id, 'limit': 4})
+            older = self.client.get('/api/agent/history/', {
+                'session_id': self.session.session_id, 'limit': 4,
+                'before_index': latest.data['next_before_index'],
+            })
+            oldest = self.client.get('/api/agent/history/', {
+                'session_id': self.session.session_id, 'limit': 4,
+                'before_index': older.data['next_before_index'],
+            })
+        mocked_app.get_state.assert_not_called()
+
+        self.assertEqual(latest.status_code, 200, latest.content)
+        self.assertEqual(latest.data['total_messages'], 11)
+        self.assertEqual([item['index'] for item in latest.data['messages']], [7, 8, 9, 10])
+        self.assertEqual([item['index'] for item in older.data['messages']], [3, 4, 5, 6])
+        # 系统消息只进入索引，不在历史接口返回
+        self.assertEqual([item['index'] for item in oldest.data['messages']], [1, 2])
+        self.assertEqual(oldest.data['next_before_index'], None)
+        self.assertFalse(oldest.data['has_more'])
+        self.assertEqual(oldest.data['messages'][0]['content'], '问题0')
+        self.assertEqual(
+            self.client.get('/api/agent/history/', {'session_id': self.session.session_id, 'before_index': 'x'}).status_code,
+            400,
+        )
+
+    def test_stale_turn_heartbeat_self_heals_from_checkpoint(self):
+        MessageIndexService.sync(self.session.session_id, _conversation(1), in_flight=True)
+        with patch('agent_service.session_store.sync_message_stats_from_checkpoint') as fresh:
+            self.client.get('/api/agent/history/', {'session_id': self.session.session_id})
+        fresh.assert_not_called()
+
+        # 进程在回合中途退出：心跳过期后下一次读取从 checkpoint 补齐
+        AgentSession.objects.filter(pk=self.session.pk).update(turn_heartbeat_at='2026-01-01T00:00:00Z')
+        with patch('agent_service.session_store.sync_message_stats_from_checkpoint', side_effect=lambda session: (
+            MessageIndexService.sync(session.session_id, _conversation(2))
+        )) as stale:
+            response = self.client.get('/api/agent/history/', {'session_id': self.session.session_id})
+        stale.assert_called_once()
+        self.assertEqual(response.data['total_messages'], 4)
+        self.session.refresh_from_db()
+        self.assertIsNone(self.session.turn_heartbeat_at)
+
+    def test_unsynced_session_backfills_index_from_checkpoint_once(self):
+        def sync(session):
+            return MessageIndexService.sync(session.session_id, _conversation(3))
+
+        with patch('agent_service.session_store.sync_message_stats_from_checkpoint', side_effect=sync) as patched:
+            response = self.client.get('/api/agent/history/', {'session_id': self.session.session_id, 'limit': 2})
+            self.client.get('/api/agent/history/', {'session_id': self.session.session_id, 'limit': 2})
+
+        self.assertEqual(patched.call_count, 1)
+        self.assertEqual([item['id'] for item in response.data['messages']], ['h2', 'a2'])
+        self.assertEqual(MessageIndexService.total_tokens(self.session), sum(
+            row.token_count for row in AgentMessageIndex.objects.filter(session=self.session)
+        ))
+
+
+class _FailingGraph:
+    """写入本轮 human 消息后抛错的 LangGraph app 替身。"""
+
+    def __init__(self, messages):
+        self.messages = list(messages)
+
+    async def aget_state(self, config):
+        return SimpleNamespace(values={'messages': list(self.messages)})
+
+    async def astream(self, input_state, config):
+        self.messages.extend(input_state['messages'])
+        raise RuntimeError('模型连接中断')
+        yield
+
+
+class _SteppingGraph:
+    """逐步写入 checkpoint 的 LangGraph app 替身；每次写入后、产出前调用 on_step。"""
+
+    def __init__(self, messages, on_step):
+        self.messages = list(messages)
+        self.on_step = on_step
+
+    async def aget_state(self, config):
+        return SimpleNamespace(values={'messages': list(self.messages)})
+
+    async def astream(self, input_state, config):
+        self.messages.extend(input_state['messages'])
+        await self.on_step()
+        for msg in (
+            AIMessage(content='', id='a-call', tool_calls=[{'name': 'search', 'args': {'q': '会议'}, 'id': 'c1'}]),
+            ToolMessage(content='结果', tool_call_id='c1', name='search', id='t1'),
+        ):
+            self.messages.append(msg)
+            yield {'agent' if msg.type == 'ai' else 'tools': {'messages': [msg]}}
+            await self.on_step()
+        self.messages.append(AIMessage(content='找到了', id='a-reply'))
+        yield {'agent': {'messages': [self.messages[-1]]}}
+
+
+class ConsumerMessageIndexTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='consumer-index-user', password='test-password')
+        self.session = AgentSession.objects.create(
+            user=self.user, session_id=f'user_{self.user.id}_failing', name='failing'
+        )
+        MessageIndexService.sync(self.session.session_id, _conversation(1))
+
+    def _consumer(self):
+        consumer = AgentConsumer()
+        consumer.user = self.user
+        consumer.session_id = self.session.session_id
+        consumer.send_json = AsyncMock()
+        return consumer
+
+    def _turn_patches(self, graph, sync_app):
+        return (
+            patch('agent_service.consumers.get_async_app', new=AsyncMock(return_value=graph)),
+            patch('agent_service.agent_graph.app', new=sync_app),
+            patch('agent_service.context_optimizer.get_optimization_config', return_value={}),
+            patch('agent_service.context_optimizer.get_current_model_config', return_value=('test-model', {})),
+            patch('agent_service.context_optimizer.check_quota_available', return_value={'available': True}),
+            patch.object(AgentConsumer, '_check_and_summarize', new_callable=AsyncMock),
+            patch.object(AgentConsumer, '_build_input_messages', new=AsyncMock(
+                return_value=[HumanMessage(content='新问题', id='h-new')]
+            )),
+            patch('agent_service.consumers.logger'),
+        )
+
+    def test_history_during_a_turn_sees_checkpointed_messages(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        seen = []
+
+        def read_history():
+            heartbeat = AgentSession.objects.get(pk=self.session.pk).turn_heartbeat_at
+            indexed = AgentMessageIndex.objects.filter(session=self.session).count()
+            history = client.get('/api/agent/history/', {'session_id': self.session.session_id})
+            seen.append((heartbeat, indexed, history.data['total_messages'], [item.get('id') for item in history.data['messages']]))
+
+        graph = _SteppingGraph(_conversation(1), sync_to_async(read_history))
+        sync_app = Mock()
+        consumer = self._consumer()
+        with ExitStack() as stack:
+            for item in self._turn_patches(graph, sync_app):
+                stack.enter_context(item)
+            async_to_sync(consumer._process_message)('新问题')
+
+        self.assertEqual(consumer.send_json.await_args.args[0]['type'], 'finished')
+        # 回合进行中只读消息索引：consumer 刷新心跳，读取方不反序列化 checkpoint
+        sync_app.get_state.assert_not_called()
+        self.assertTrue(all(heartbeat is not None for heartbeat, _, _, _ in seen))
+        self.assertEqual([indexed for _, indexed, _, _ in seen], [3, 4, 5])
+        self.assertEqual([(total, ids[-1]) for _, _, total, ids in seen], [(3, 'h-new'), (4, 'a-call'), (5, None)])
+        self.assertEqual(seen[0][3], ['h0', 'a0', 'h-new'])
+        self.session.refresh_from_db()
+        self.assertIsNotNone(self.session.message_stats_synced_at)
+        self.assertIsNone(self.session.turn_heartbeat_at)
+        self.assertEqual(
+            list(AgentMessageIndex.objects.filter(session=self.session).order_by('index').values_list('message_id', flat=True)),
+            ['h0', 'a0', 'h-new', 'a-call', 't1', 'a-reply'],
+        )
+
+    def test_failed_turns_still_index_messages_written_to_checkpoint(self):
+        graph = _FailingGraph(_conversation(1))
+        consumer = self._consumer()
+        with (
+            patch('agent_service.consumers.get_async_app', new=AsyncMock(return_value=graph)),
+            patch('agent_service.context_optimizer.get_optimization_config', return_value={}),
+            patch('agent_service.context_optimizer.get_current_model_config', return_value=('test-model', {})),
+            patch('agent_service.context_optimizer.check_quota_available', return_value={'available': True}),
+            patch.object(AgentConsumer, '_check_and_summarize', new_callable=AsyncMock),
+            patch.object(AgentConsumer, '_build_input_messages', new=AsyncMock(
+                return_value=[HumanMessage(content='新问题', id='h-failed')]
+            )),
+            patch.object(AgentConsumer, '_cleanup_incomplete_tool_calls', new_callable=AsyncMock),
+            patch.object(AgentConsumer, '_build_runtime_context_message', return_value=''),
+            patch('agent_service.consumers.logger'),
+        ):
+            async_to_sync(consumer._process_message)('新问题')
+            self.assertEqual(consumer.send_json.await_args.args[0]['type'], 'error')
+            self.assertEqual(
+                list(AgentMessageIndex.objects.filter(session=self.session).order_by('index').values_list('message_id', flat=True)),
+                ['h0', 'a0', 'h-failed'],
+            )
+
+            async_to_sync(consumer._continue_processing)()
+            self.assertEqual(consumer.send_json.await_args.args[0]['type'], 'error')
+
+        self.session.refresh_from_db()
+        self.assertEqual(AgentMessageIndex.objects.filter(session=self.session).count(), 4)
+        self.assertEqual(self.session.message_count, AgentSession.compute_message_stats(graph.messages)['message_count'])
+        response = APIClient()
+        response.force_authenticate(self.user)
+        history = response.get('/api/agent/history/', {'session_id': self.session.session_id})
+        self.assertEqual(history.data['total_messages'], 4)
@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from agent_service import context_optimizer
+from agent_service.context_optimizer import MessageTokenCache, TokenCalculator
+from agent_service.models import AgentSession
+
+
+class MessageTokenCacheTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='token-cache-user', password='test-password')
+        self.session = AgentSession.objects.create(user=self.user, session_id=f'user_{self.user.id}_tokens')
+
+    def _messages(self, turns: int):
+        messages = []
+        for turn in range(turns):
+            messages.append(HumanMessage(content=f'第 {turn} 个问题', id=f'h{turn}'))
+            messages.append(AIMessage(
+                content='', id=f'a{turn}',
+                tool_calls=[{'name': 'search_items', 'args': {'keyword': f'会议{turn}'}, 'id': f'c{turn}'}],
+            ))
+            messages.append(ToolMessage(content='结果' * 20, tool_call_id=f'c{turn}', id=f't{turn}'))
+        return messages
+
+    def _use_fake_encoder(self):
+        context_optimizer._TIKTOKEN_ENCODERS.clear()
+        self.addCleanup(context_optimizer._TIKTOKEN_ENCODERS.clear)
+        context_optimizer._TIKTOKEN_ENCODERS['gpt-3.5-turbo'] = SimpleNamespace(encode=list)
+
+    def test_persisted_cache_only_counts_new_or_edited_messages(self):
+        self._use_fake_encoder()
+        messages = self._messages(3)
+        first = TokenCalculator(method='tiktoken', cache=self.session.load_message_token_cache('tiktoken'))
+        expected = [TokenCalculator(method='tiktoken').calculate_message(m) for m in messages]
+        self.assertEqual([first.calculate_message(m) for m in messages], expected)
+        self.session.save_message_token_cache(first.cache)
+
+        self.session.refresh_from_db()
+        messages[1] = AIMessage(content='改过的回复', id='a0')
+        messages.append(HumanMessage(content='新问题', id='h-new'))
+        second = TokenCalculator(method='tiktoken', cache=self.session.load_message_token_cache('tiktoken'))
+        with patch.object(TokenCalculator, '_count_message', autospec=True, side_effect=TokenCalculator._count_message) as counted:
+            total = sum(second.calculate_message(m) for m in messages)
+
+        self.assertEqual([call.args[1].id for call in counted.call_args_list], ['a0', 'h-new'])
+        self.assertEqual(total, sum(TokenCalculator(method='tiktoken').calculate_message(m) for m in messages))
+        self.assertEqual(second.cache.info()['hits'], 8)
+        # 模型变化时整体失效；estimate 不使用缓存
+        self.assertEqual(self.session.load_message_token_cache('tiktoken', model='gpt-4o').info()['size'], 0)
+        self.assertIsNone(self.session.load_message_token_cache('estimate'))
+
+    def test_cache_evicts_least_recently_used_entries(self):
+        cache = MessageTokenCache('estimate', 'gpt-3.5-turbo', max_entries=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+        self.assertEqual(MessageTokenCache.from_payload(cache.to_payload(), 'estimate', 'gpt-3.5-turbo').to_payload()['entries'], [['a', 1], ['c', 3]])
+
+    def test_tiktoken_encoder_is_shared_across_calculators(self):
+        encoder = SimpleNamespace(encode=lambda text: text.split())
+        context_optimizer._TIKTOKEN_ENCODERS.clear()
+        self.addCleanup(context_optimizer._TIKTOKEN_ENCODERS.clear)
+        with patch('tiktoken.encoding_for_model', return_value=encoder) as loaded:
+            counts = [TokenCalculator(method='tiktoken').calculate_text('a b c') for _ in range(3)]
+        self.assertEqual(counts, [3, 3, 3])
+        self.assertEqual(loaded.call_count, 1)
@@ -2,7 +2,9 @@ import hashlib
 from datetime import datetime, timedelta
 
 from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 from agent_service.models import AgentRollbackWindow, AgentSession, AgentTransaction
@@ -15,7 +17,7 @@ from core.models import (
 from core.planner.application import PlannerApplicationService
 from core.planner.context import PlannerExecutionContext
 from core.planner.rollout import PlannerRolloutPolicy
-from core.planner.snapshots import PlannerRollbackConflict, PlannerRollbackCoordinator
+from core.planner.snapshots import PlannerRollbackConflict, PlannerRollbackCoordinator, PlannerSnapshotRecorder
 
 
 @override_settings(PLANNER_STORAGE_MODE='normalized')
@@ -86,6 +88,27 @@ class PlannerSnapshotRestoreTests(TestCase):
         self.assertTrue(transaction.is_rolled_back)
         self.assertEqual(transaction.state, 'rolled_back')
 
+    def test_created_row_detection_does_not_scan_the_account(self):
+        self.create_event('create-warmup')
+        with CaptureQueriesContext(connection) as baseline:
+            self.create_event('create-small')
+        other = User.objects.create_user(username='snapshot-other', password='test-password')
+        for owner in (self.user, other):
+            CalendarEvent.objects.bulk_create([
+                CalendarEvent(
+                    user=owner, event_id=f'bulk-{owner.pk}-{index}', title='批量', ical_uid=f'bulk-{owner.pk}-{index}',
+                    caldav_resource_name=f'bulk-{owner.pk}-{index}', start_at=self.start, end_at=self.end,
+                )
+                for index in range(50)
+            ])
+        with self.assertNumQueries(len(baseline.captured_queries)):
+            result = self.create_event('create-large')
+        event = CalendarEvent.objects.get(event_id=result['event']['event_id'])
+        payload = PlannerSnapshotRecorder.decode(
+            PlannerRollbackSnapshot.objects.get(change_set__tool_call_id='create-large')
+        )
+        self.assertEqual(payload['created_keys'], [f'core.CalendarEvent:{event.pk}'])
+
     def test_all_patch_and_single_override_restore_business_projection(self):
         result = self.create_event('seed', recurrence='FREQ=DAILY;COUNT=5', reversible=False)
         event_id = result['event']['event_id']
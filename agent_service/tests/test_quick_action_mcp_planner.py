@@ -11,14 +11,22 @@ from rest_framework.test import APIClient
 from reversion.models import Revision
 
 import mcp_server
+from agent_service.mcp_executor import McpToolExecutor
 from agent_service.models import AgentTransaction, QuickActionTask
 from agent_service.quick_action_agent import clear_task_cancellation, is_task_cancelled, tool_node_wrapper
 from core.models import CalendarEvent, PlannerCohortAssignment, PlannerMigrationState, PlannerRollbackSnapshot, UserData
 from core.planner.rollout import PlannerRolloutPolicy
+from core.token_cache import token_users
 
 
 @override_settings(PLANNER_STORAGE_MODE='normalized')
 class QuickActionMcpPlannerTests(TestCase):
+    def setUp(self):
+        # TestCase 的事务只对当前线程的连接可见，工具须在调用线程内执行才能读到测试数据。
+        executor = patch.object(mcp_server, 'tool_executor', McpToolExecutor(max_workers=0))
+        executor.start()
+        self.addCleanup(executor.stop)
+
     def verified_user(self, username: str, entrypoint: str):
         user = User.objects.create_user(username=username, password='test-password')
         source = UserData.objects.create(user=user, key='events', value='[]')
@@ -97,7 +105,7 @@ class QuickActionMcpPlannerTests(TestCase):
     def test_mcp_token_resolution_rejects_invalid_and_binds_valid_user(self):
         user, _ = self.verified_user('mcp-token-user', PlannerRolloutPolicy.ENTRYPOINT_MCP)
         token = Token.objects.create(user=user)
-        mcp_server._token_user_cache.clear()
+        token_users.clear()
         self.assertIsNone(mcp_server._resolve_user_from_token('invalid-token'))
         self.assertEqual(mcp_server._resolve_user_from_token(token.key), user)
 
@@ -0,0 +1,57 @@
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from agent_service.context_optimizer import get_all_models, get_current_model_config
+from agent_service.views_config_api import set_agent_config_encrypted
+from config.encryption import DerivedKeyCache, SecureKeyStorage
+from core.models import UserData
+
+
+class SecureKeyCacheTests(TestCase):
+    def setUp(self):
+        SecureKeyStorage._key_cache.clear()
+        SecureKeyStorage.decrypted_configs.clear()
+        self.user = User.objects.create_user(username='secure-key-user', password='password')
+        set_agent_config_encrypted(self.user, {
+            'current_model_id': 'my_model',
+            'custom_models': {'my_model': {'name': '自定义', 'api_key': 'sk-first-secret', 'context_window': 8000}},
+        })
+
+    def test_agent_turn_reads_derive_and_decrypt_once(self):
+        first_id, first = get_current_model_config(self.user)
+        self.assertEqual((first_id, first['api_key']), ('my_model', 'sk-first-secret'))
+        first['api_key'] = 'mutated-by-caller'
+        with patch.object(SecureKeyStorage, 'decrypt_model_config', side_effect=AssertionError('decrypted again')):
+            _model_id, second = get_current_model_config(self.user)
+        self.assertEqual(second['api_key'], 'sk-first-secret')
+        self.assertEqual(SecureKeyStorage._key_cache.info()['misses'], 1)
+        self.assertGreaterEqual(SecureKeyStorage.decrypted_configs.info()['hits'], 1)
+
+    def test_saving_config_or_bypassing_the_api_is_never_served_stale(self):
+        get_all_models(self.user)
+        set_agent_config_encrypted(self.user, {
+            'current_model_id': 'my_model',
+            'custom_models': {'my_model': {'name': '自定义', 'api_key': 'sk-rotated', 'context_window': 8000}},
+        })
+        self.assertEqual(get_all_models(self.user)['my_model']['api_key'], 'sk-rotated')
+
+        row = UserData.objects.get(user=self.user, key='agent_config')
+        value = row.get_value()
+        value['custom_models']['other'] = {'name': '旁路写入', 'api_key': ''}
+        row.set_value(value)
+        self.assertIn('other', get_all_models(self.user))
+
+    def test_derived_keys_expire_and_are_zeroed_on_eviction(self):
+        cache = DerivedKeyCache(maxsize=1, ttl_seconds=60)
+        with patch('config.encryption.time.monotonic', return_value=100.0):
+            self.assertEqual(cache.get_or_derive('a', lambda: b'\x01' * 32), b'\x01' * 32)
+            stored = cache._entries['a'][1]
+            cache.get_or_derive('b', lambda: b'\x02' * 32)
+        self.assertEqual(stored, bytearray(32))
+        self.assertEqual(cache.info()['size'], 1)
+
+        with patch('config.encryption.time.monotonic', return_value=161.0):
+            self.assertEqual(cache.get_or_derive('b', lambda: b'\x03' * 32), b'\x03' * 32)
+        self.assertEqual(cache.info()['misses'], 3)
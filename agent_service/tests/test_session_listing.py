@@ -0,0 +1,105 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from langchain_core.messages import AIMessage, HumanMessage
+from rest_framework.test import APIClient
+
+from agent_service.models import AgentSession
+
+
+class AgentSessionListingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='session-listing-user', password='test-password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _session(self, suffix: str, messages, *, minutes_ago: int) -> AgentSession:
+        session = AgentSession.objects.create(user=self.user, session_id=f'user_{self.user.id}_{suffix}', name=suffix)
+        AgentSession.record_message_stats(session.session_id, messages)
+        AgentSession.objects.filter(pk=session.pk).update(updated_at=timezone.now() - timedelta(minutes=minutes_ago))
+        return session
+
+    def test_message_stats_count_human_turns_and_keep_images_out_of_preview(self):
+        stats = AgentSession.compute_message_stats([
+            HumanMessage(content='第一问'),
+            AIMessage(content='答'),
+            HumanMessage(content=[
+                {'type': 'text', 'text': '看看这张图'},
+                {'type': 'image_url', 'image_url': {'url': 'data:image/png;base64,' + 'A' * 5000}},
+            ]),
+        ])
+
+        self.assertEqual(stats, {'message_count': 2, 'last_message_preview': '看看这张图', 'is_empty': False})
+        self.assertTrue(AgentSession.compute_message_stats([])['is_empty'])
+
+    def test_listing_reads_only_session_rows_and_pages_by_keyset(self):
+        self._session('newest', [HumanMessage(content='最新'), AIMessage(content='好')], minutes_ago=1)
+        self._session('empty', [], minutes_ago=2)
+        self._session('older', [HumanMessage(content='一'), AIMessage(content='二'), HumanMessage(content='三')], minutes_ago=3)
+        self._session('oldest', [HumanMessage(content='最早')], minutes_ago=4)
+
+        with patch('agent_service.session_store.sync_message_stats_from_checkpoint') as sync:
+            first = self.client.get('/api/agent/sessions/', {'limit': 2})
+            second = self.client.get('/api/agent/sessions/', {'limit': 2, 'cursor': first.json()['next_cursor']})
+            everything = self.client.get('/api/agent/sessions/')
+        sync.assert_not_called()
+
+        self.assertEqual(first.status_code, 200, first.content)
+        self.assertEqual([item['name'] for item in first.json()['sessions']], ['newest', 'older'])
+        self.assertEqual(first.json()['sessions'][1]['message_count'], 2)
+        self.assertEqual(first.json()['sessions'][1]['last_message_preview'], '三')
+        self.assertEqual([item['name'] for item in second.json()['sessions']], ['oldest'])
+        self.assertIsNone(second.json()['next_cursor'])
+        self.assertEqual([item['name'] for item in everything.json()['sessions']], ['newest', 'older', 'oldest'])
+        self.assertEqual(self.client.get('/api/agent/sessions/', {'cursor': 'bad'}).status_code, 400)
+
+    def test_cursor_survives_an_unencoded_query_string(self):
+        self._session('newest', [HumanMessage(content='新')], minutes_ago=1)
+        self._session('middle', [HumanMessage(content='中')], minutes_ago=2)
+        self._session('oldest', [HumanMessage(content='旧')], minutes_ago=3)
+        AgentSession.objects.filter(session_id__endswith='_middle').update(
+            updated_at=timezone.now().replace(microsecond=123456) - timedelta(minutes=2)
+        )
+
+        first = self.client.get('/api/agent/sessions/', {'limit': 1})
+        cursor = first.json()['next_cursor']
+        second = self.client.get(f'/api/agent/sessions/?limit=1&cursor={cursor}')
+        third = self.client.get(f"/api/agent/sessions/?limit=1&cursor={second.json()['next_cursor']}")
+
+        self.assertRegex(cursor, r'^\d+_\d+$')
+        self.assertEqual(second.status_code, 200, second.content)
+        self.assertEqual([item['name'] for item in second.json()['sessions']], ['middle'])
+        self.assertEqual([item['name'] for item in third.json()['sessions']], ['oldest'])
+
+    def test_unsynced_legacy_session_is_synced_from_checkpoint_once(self):
+        legacy = AgentSession.objects.create(user=self.user, session_id=f'user_{self.user.id}_legacy', name='legacy')
+
+        def sync(session):
+            return AgentSession.record_message_stats(session.session_id, [HumanMessage(content='历史会话')])
+
+        with patch('agent_service.session_store.sync_message_stats_from_checkpoint', side_effect=sync) as patched:
+            self.client.get('/api/agent/sessions/')
+            response = self.client.get('/api/agent/sessions/')
+
+        self.assertEqual(patched.call_count, 1)
+        self.assertEqual([item['session_id'] for item in response.json()['sessions']], [legacy.session_id])
+        self.assertEqual(response.json()['sessions'][0]['last_message_preview'], '历史会话')
+
+    def test_unsynced_empty_session_does_not_leave_a_short_page(self):
+        AgentSession.objects.create(user=self.user, session_id=f'user_{self.user.id}_blank', name='blank')
+        self._session('newer', [HumanMessage(content='新')], minutes_ago=5)
+        self._session('older', [HumanMessage(content='旧')], minutes_ago=6)
+
+        def sync(session):
+            return AgentSession.record_message_stats(session.session_id, [])
+
+        with patch('agent_service.session_store.sync_message_stats_from_checkpoint', side_effect=sync):
+            first = self.client.get('/api/agent/sessions/', {'limit': 1})
+            second = self.client.get('/api/agent/sessions/', {'limit': 1, 'cursor': first.json()['next_cursor']})
+
+        self.assertEqual([item['name'] for item in first.json()['sessions']], ['newer'])
+        self.assertEqual([item['name'] for item in second.json()['sessions']], ['older'])
+        self.assertIsNone(second.json()['next_cursor'])
@@ -0,0 +1,44 @@
+import json
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from langchain_core.messages import ToolMessage
+
+from agent_service.context_optimizer import TokenCalculator, ToolMessageCompressor
+
+
+class ToolCompressorCacheTests(SimpleTestCase):
+    def setUp(self):
+        ToolMessageCompressor.compressed_outputs.clear()
+        self.addCleanup(ToolMessageCompressor.compressed_outputs.clear)
+        self.calculator = TokenCalculator(method='estimate')
+        self.message = ToolMessage(
+            content=json.dumps({'events': [{'title': f'会议 {index}', 'notes': '备注' * 40} for index in range(30)]}, ensure_ascii=False),
+            tool_call_id='call-1', name='get_events', id='tool-1',
+        )
+
+    def test_old_tool_output_is_compressed_once_across_turns(self):
+        with patch.object(ToolMessageCompressor, '_compress_content', autospec=True,
+                          side_effect=ToolMessageCompressor._compress_content) as compressed:
+            turns = [ToolMessageCompressor(max_tokens=100).compress(self.message, self.calculator) for _ in range(3)]
+            ToolMessageCompressor(max_tokens=50).compress(self.message, self.calculator)
+            ToolMessageCompressor(max_tokens=100, exclude_prefixes=['mcp_']).compress(self.message, self.calculator)
+
+        self.assertEqual(compressed.call_count, 3)
+        self.assertEqual({turn.content for turn in turns}, {turns[0].content})
+        self.assertTrue(turns[2].additional_kwargs['compressed'])
+        self.assertLess(len(turns[0].content), len(self.message.content))
+        self.assertEqual(ToolMessageCompressor.compressed_outputs.info()['hits'], 2)
+
+    def test_short_or_edited_output_is_keyed_by_content(self):
+        short = ToolMessage(content='{"success": true}', tool_call_id='call-2', name='get_events')
+        compressor = ToolMessageCompressor(max_tokens=100)
+        self.assertIs(compressor.compress(short, self.calculator), short)
+        self.assertIs(compressor.compress(short, self.calculator), short)
+
+        edited = ToolMessage(content=self.message.content.replace('会议 0', '评审 0'), tool_call_id='call-1', name='get_events')
+        self.assertNotEqual(
+            compressor.compress(edited, self.calculator).content,
+            compressor.compress(self.message, self.calculator).content,
+        )
+        self.assertEqual(ToolMessageCompressor.compressed_outputs.info()['misses'], 3)
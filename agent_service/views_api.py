@@ -25,7 +25,12 @@ from logger import logger
 def list_sessions(request):
     """
     获取用户的所有会话列表
-    GET /api/agent/sessions/
+    GET /api/agent/sessions/?limit=50&cursor=...
+    
+    消息数、预览与是否为空由 consumer 在写入时维护在 AgentSession 上，
+    列表只做一次按 (updated_at, id) 倒序的索引查询，不读取 LangGraph checkpoint。
+    未传 limit 时返回全部会话；传 limit 时用返回的 next_cursor 取下一页。
+    cursor 为 "<updated_at 的 epoch 微秒>_<id>"，只含数字与下划线，可直接拼进查询串。
     
     返回:
     {
@@ -33,63 +38,60 @@ def list_sessions(request):
             {"session_id": "user_1_xxx", "name": "对话 1", "message_count": 10, ...},
             ...
         ],
-        "current_session_id": "user_1_xxx"
+        "current_session_id": "user_1_xxx",
+        "next_cursor": "1772352000000000_42"
     }
     """
+    from datetime import datetime, timedelta, timezone as dt_timezone
+    from django.db.models import Q
     from agent_service.models import AgentSession
-    from langchain_core.messages import HumanMessage
+    from agent_service.session_store import sync_message_stats_from_checkpoint
     
     user = request.user
     
-    # 获取用户的所有会话
-    sessions = AgentSession.objects.filter(
-        user=user, 
-        is_active=True
-    ).order_by('-updated_at')
+    # 尚未同步统计（或回合中途退出）的会话先从 checkpoint 自愈一次，再分页；
+    # 否则分页后才发现为空的会话会被丢弃，导致一页不满却仍返回 next_cursor
+    stale_sessions = AgentSession.objects.filter(user=user, is_active=True).filter(
+        AgentSession.message_stats_stale_q()
+    ).only('id', 'session_id', 'user_id', 'message_stats_synced_at', 'turn_heartbeat_at')
+    for session in stale_sessions:
+        try:
+            sync_message_stats_from_checkpoint(session)
+        except Exception as e:
+            logger.warning(f"同步会话 {session.session_id} 消息统计失败: {e}")
     
-    # 从 LangGraph 检查点获取实际消息数量，过滤掉空会话
-    from agent_service.agent_graph import app
+    # 空会话不进入列表
+    sessions = AgentSession.objects.filter(user=user, is_active=True, is_empty=False).order_by('-updated_at', '-id').only(
+        'id', 'session_id', 'name', 'message_count', 'last_message_preview', 'is_naming',
+        'is_auto_named', 'created_at', 'updated_at',
+    )
+    
+    epoch = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+    try:
+        limit = int(request.query_params.get("limit") or 0)
+        cursor = request.query_params.get("cursor")
+        if cursor:
+            cursor_micros, cursor_id = cursor.split("_", 1)
+            cursor_updated_at = epoch + timedelta(microseconds=int(cursor_micros))
+            sessions = sessions.filter(
+                Q(updated_at__lt=cursor_updated_at) | Q(updated_at=cursor_updated_at, id__lt=int(cursor_id))
+            )
+    except (ValueError, OverflowError):
+        return Response({"error": "limit 或 cursor 参数无效"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    page = list(sessions[:limit + 1]) if limit > 0 else list(sessions)
+    next_cursor = None
+    if limit > 0 and len(page) > limit:
+        page = page[:limit]
+        next_cursor = f"{(page[-1].updated_at - epoch) // timedelta(microseconds=1)}_{page[-1].id}"
     
     session_list = []
-    for session in sessions:
-        # 检查 LangGraph 中是否有消息
-        try:
-            config = {"configurable": {"thread_id": session.session_id}}
-            state = app.get_state(config)
-            actual_message_count = 0
-            last_user_message = ""
-            
-            if state and state.values:
-                messages = state.values.get("messages", [])
-                # 只计算用户消息数量（更准确地反映对话轮数）
-                human_messages = [m for m in messages if hasattr(m, 'type') and m.type == 'human']
-                actual_message_count = len(human_messages)
-                
-                # 获取用户发的最后一条消息作为预览
-                if human_messages:
-                    last_human = human_messages[-1]
-                    last_user_message = last_human.content[:100] if hasattr(last_human, 'content') else ""
-                
-                if actual_message_count == 0:
-                    # 备选：计算所有消息
-                    actual_message_count = len(messages)
-        except Exception as e:
-            logger.warning(f"获取会话 {session.session_id} 消息数量失败: {e}")
-            actual_message_count = session.message_count
-            last_user_message = session.last_message_preview
-        
-        # 跳过空会话
-        if actual_message_count == 0:
-            continue
-        
-        # 预览使用用户发的最后一条消息
-        preview = last_user_message or session.last_message_preview or "新对话"
-            
+    for session in page:
         session_list.append({
             "session_id": session.session_id,
             "name": session.name,
-            "message_count": actual_message_count,
-            "last_message_preview": preview,
+            "message_count": session.message_count,
+            "last_message_preview": session.last_message_preview or "新对话",
             "is_naming": session.is_naming,
             "is_auto_named": session.is_auto_named,
             "created_at": session.created_at.isoformat(),
@@ -102,6 +104,7 @@ def list_sessions(request):
     return Response({
         "sessions": session_list,
         "current_session_id": current_session_id,
+        "next_cursor": next_cursor,
         "user": user.username
     })
 
@@ -271,7 +274,7 @@ def rename_session(request, session_id):
 def get_history(request):
     """
     获取会话历史
-    GET /api/agent/history/?session_id=xxx&limit=20
+    GET /api/agent/history/?session_id=xxx&limit=20&before_index=40
     
     返回:
     {
@@ -281,6 +284,9 @@ def get_history(request):
             {"role": "assistant", "content": "...", "index": 1},
             ...
         ],
+        "total_messages": 60,
+        "next_before_index": 20,  // 更早一页的 before_index，没有更早消息时为 null
+        "has_more": true,
         "summary": {  // 如果有总结
             "text": "总结内容...",
             "summarized_until": 20,
@@ -290,13 +296,23 @@ def get_history(request):
     }
     """
     from agent_service.agent_graph import app
+    from agent_service.message_index import HISTORY_ROLES, MessageIndexService, format_message, page_bounds
     from agent_service.models import AgentRollbackWindow, AgentSession
-    from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
+    from agent_service.session_store import sync_message_stats_from_checkpoint
     
     user = request.user
     session_id = request.query_params.get("session_id", f"user_{user.id}_default")
     # 默认返回所有消息（0 表示不限制），如果需要分页可以传 limit 参数
-    limit = int(request.query_params.get("limit", 0))
+    # before_index 为上一页返回的 next_before_index，向更早的消息翻页
+    try:
+        limit = int(request.query_params.get("limit", 0))
+        before_index = request.query_params.get("before_index")
+        before_index = int(before_index) if before_index not in (None, "") else None
+    except ValueError:
+        return Response(
+            {"error": "limit 和 before_index 必须是整数"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
     # 验证 session_id 归属
     if not session_id.startswith(f"user_{user.id}_"):
@@ -306,9 +322,6 @@ def get_history(request):
         )
     
     try:
-        config = {"configurable": {"thread_id": session_id}}
-        state = app.get_state(config)
-        
         # 获取会话的总结信息
         session = AgentSession.objects.filter(session_id=session_id).first()
         summary_info = None
@@ -323,116 +336,52 @@ def get_history(request):
                     "tokens": session.summary_tokens
                 }
         
+        if session:
+            # 从消息索引读取本页，不反序列化整段 checkpoint；尚未同步的历史会话先回填一次
+            if session.message_stats_stale:
+                sync_message_stats_from_checkpoint(session)
+            rows, total_messages, start_idx = MessageIndexService.page(
+                session, before_index=before_index, limit=limit
+            )
+            formatted_messages = [dict(row.payload) for row in rows if row.role in HISTORY_ROLES]
+        else:
+            config = {"configurable": {"thread_id": session_id}}
+            state = app.get_state(config)
+            messages = state.values.get("messages", []) if state and state.values else []
+            total_messages = len(messages)
+            start_idx, end_idx = page_bounds(total_messages, before_index=before_index, limit=limit)
+            formatted_messages = [
+                format_message(msg, idx)
+                for idx, msg in enumerate(messages[start_idx:end_idx], start=start_idx)
+                if msg.type in HISTORY_ROLES
+            ]
+        
         active_window = AgentRollbackWindow.objects.filter(
             user=user, session__session_id=session_id,
             status=AgentRollbackWindow.STATUS_ACTIVE,
         ).first()
-        rollback_window = ({
-            'window_id': str(active_window.window_id),
-            'floor_message_index': active_window.floor_message_index,
-            'generation': active_window.generation,
-            'status': active_window.status,
-        } if active_window else None)
-
-        if not state or not state.values:
-            if active_window is None:
-                from agent_service.rollback_windows import AgentRollbackWindowService
-                active_window = AgentRollbackWindowService.ensure_active(
-                    user=user, session_id=session_id, floor_message_index=0
-                )
-                rollback_window = {
-                    'window_id': str(active_window.window_id),
-                    'floor_message_index': active_window.floor_message_index,
-                    'generation': active_window.generation,
-                    'status': active_window.status,
-                }
-            return Response({
-                "session_id": session_id,
-                "messages": [],
-                "total_messages": 0,
-                "rollback_window": rollback_window,
-                "summary": summary_info,
-                "is_summarizing": is_summarizing
-            })
-        
-        messages = state.values.get("messages", [])
-
         if active_window is None:
             from agent_service.rollback_windows import AgentRollbackWindowService
             active_window = AgentRollbackWindowService.ensure_active(
-                user=user, session_id=session_id, floor_message_index=len(messages)
+                user=user, session_id=session_id, floor_message_index=total_messages
             )
-            rollback_window = {
-                'window_id': str(active_window.window_id),
-                'floor_message_index': active_window.floor_message_index,
-                'generation': active_window.generation,
-                'status': active_window.status,
-            }
-        
-        # 格式化消息，添加索引
-        formatted_messages = []
-        user_message_indices = []  # 记录用户消息的索引
-        
-        # 计算起始索引（用于正确返回消息的实际索引）
-        total_messages = len(messages)
-        
-        # limit=0 表示返回所有消息
-        if limit > 0:
-            start_idx = max(0, total_messages - limit)
-            messages_to_format = messages[-limit:]
-        else:
-            start_idx = 0
-            messages_to_format = messages
+        rollback_window = {
+            'window_id': str(active_window.window_id),
+            'floor_message_index': active_window.floor_message_index,
+            'generation': active_window.generation,
+            'status': active_window.status,
+        }
         
-        for idx, msg in enumerate(messages_to_format, start=start_idx):
-            if isinstance(msg, HumanMessage):
-                user_message_indices.append(idx)
-                
-                # 提取附件元数据（供前端渲染磁贴）
-                attachments = []
-                if hasattr(msg, 'additional_kwargs') and msg.additional_kwargs:
-                    attachments_metadata = msg.additional_kwargs.get('attachments_metadata', [])
-                    attachments = attachments_metadata
-                
-                formatted_messages.append({
-                    "role": "user",
-                    "content": msg.content,
-                    "id": msg.id,
-                    "index": idx,
-                    "can_rollback": bool(
-                        active_window and idx >= active_window.floor_message_index
-                    ),
-                    "attachments": attachments  # 附件列表（供前端渲染磁贴）
-                })
-            elif isinstance(msg, AIMessage):
-                _ai_item = {
-                    "role": "assistant",
-                    "content": msg.content,
-                    "id": msg.id,
-                    "index": idx,
-                    "tool_calls": [
-                        {"name": tc.get("name"), "args": tc.get("args")}
-                        for tc in (msg.tool_calls or [])
-                    ] if msg.tool_calls else None
-                }
-                _ai_ak = getattr(msg, 'additional_kwargs', None) or {}
-                _ai_rc = _ai_ak.get('reasoning_content')
-                if _ai_rc:
-                    _ai_item["reasoning_content"] = _ai_rc
-                formatted_messages.append(_ai_item)
-            elif isinstance(msg, ToolMessage):
-                formatted_messages.append({
-                    "role": "tool",
-                    "content": msg.content,
-                    "tool_call_id": msg.tool_call_id,
-                    "name": getattr(msg, 'name', None),  # 工具名称
-                    "index": idx
-                })
+        for item in formatted_messages:
+            if item["role"] == "user":
+                item["can_rollback"] = item["index"] >= active_window.floor_message_index
         
         return Response({
             "session_id": session_id,
             "messages": formatted_messages,
-            "total_messages": len(messages),
+            "total_messages": total_messages,
+            "next_before_index": start_idx if start_idx > 0 else None,
+            "has_more": start_idx > 0,
             "rollback_window": rollback_window,
             "summary": summary_info,
             "is_summarizing": is_summarizing
@@ -738,6 +687,7 @@ def rollback_to_message(request):
         
         # 验证删除结果
         new_messages = []
+        new_messages_loaded = True
         if message_index == 0:
             # 清空 checkpoint 后，会话状态为空，这是预期行为
             pass
@@ -746,7 +696,14 @@ def rollback_to_message(request):
                 new_state = app.get_state(config)
                 new_messages = new_state.values.get("messages", []) if new_state and new_state.values else []
             except Exception as e:
+                new_messages_loaded = False
                 logger.warning(f"获取删除后状态失败: {e}")
+        if new_messages_loaded:
+            try:
+                from agent_service.message_index import MessageIndexService
+                MessageIndexService.sync(session_id, new_messages)
+            except Exception as e:
+                logger.warning(f"回滚后更新会话列表统计失败: {e}")
         
         rolled_back_transactions = len(reverted_change_sets)
         rolled_back_details = [
@@ -1959,7 +1916,8 @@ def get_context_usage(request):
     from agent_service.agent_graph import app
     from agent_service.models import AgentSession
     from agent_service.context_optimizer import get_current_model_config, get_optimization_config
-    from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
+    from agent_service.message_index import MessageIndexService, message_tokens
+    from agent_service.session_store import sync_message_stats_from_checkpoint
     
     user = request.user
     session_id = request.query_params.get("session_id", f"user_{user.id}_default")
@@ -2026,49 +1984,19 @@ def get_context_usage(request):
                 f"可能原因：1) 新会话尚未请求LLM  2) 数据库未迁移"
             )
             
-            # 降级：使用旧的估算方式
-            config = {"configurable": {"thread_id": session_id}}
-            state = app.get_state(config)
+            # 降级：对消息索引中逐条估算的 token 求和；无会话记录时才读取 checkpoint
+            if session:
+                if session.message_stats_stale:
+                    sync_message_stats_from_checkpoint(session)
+                total_tokens = MessageIndexService.total_tokens(session)
+            else:
+                config = {"configurable": {"thread_id": session_id}}
+                state = app.get_state(config)
+                messages = state.values.get("messages", []) if state and state.values else []
+                total_tokens = sum(message_tokens(msg) for msg in messages)
             
-            if state and state.values:
-                messages = state.values.get("messages", [])
-                
-                # 使用简单的 token 估算
-                def estimate_tokens(text):
-                    if not text:
-                        return 0
-                    # 多模态消息的 content 是 list[dict]，需要提取文本部分
-                    if isinstance(text, list):
-                        total = 0
-                        for block in text:
-                            if isinstance(block, dict):
-                                if block.get('type') == 'text':
-                                    total += estimate_tokens(block.get('text', ''))
-                                elif block.get('type') == 'image_url':
-                                    total += 85  # 图片 token 估算（low detail ~85）
-                            elif isinstance(block, str):
-                                total += estimate_tokens(block)
-                        return total
-                    if not isinstance(text, str):
-                        text = str(text)
-                    # 简单估算：中文字符多的情况
-                    chinese_chars = sum(1 for c in text if '\u4e00' <= c <= '\u9fff')
-                    other_chars = len(text) - chinese_chars
-                    return int(chinese_chars * 0.7 + other_chars * 0.3) + 4  # +4 是消息开销
-                
-                for idx, msg in enumerate(messages):
-                    content = getattr(msg, 'content', '') or ''
-                    msg_tokens = estimate_tokens(content)
-                    
-                    # 如果有工具调用，也计算
-                    if hasattr(msg, 'tool_calls') and msg.tool_calls:
-                        for tc in msg.tool_calls:
-                            msg_tokens += estimate_tokens(str(tc.get('args', {})))
-                    
-                    total_tokens += msg_tokens
-                
-                total_tokens_source = 'estimated'
-                logger.debug(f"[上下文显示-降级] 估算total_tokens={total_tokens}")
+            total_tokens_source = 'estimated'
+            logger.debug(f"[上下文显示-降级] 估算total_tokens={total_tokens}")
         
         # ========== 计算 recent_tokens ==========
         # recent_tokens = 最近一次请求的 input_tokens - 总结时的 input_tokens
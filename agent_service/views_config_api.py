@@ -75,7 +75,9 @@ def set_agent_config_encrypted(user, config: dict):
     保存用户的 agent_config，并加密其中的 API 密钥
     """
     encrypted_config = SecureKeyStorage.encrypt_model_config(config, user.id)
-    return set_user_data_value(user, 'agent_config', encrypted_config)
+    user_data = set_user_data_value(user, 'agent_config', encrypted_config)
+    SecureKeyStorage.decrypted_configs.invalidate(user.id)
+    return user_data
 
 
 # ==========================================
@@ -23,7 +23,7 @@ from rest_framework import status
 
 from agent_service.models import AgentSession
 from agent_service.agent_graph import get_default_tools
-from langchain_core.messages import HumanMessage, AIMessage, ToolMessage, SystemMessage
+from agent_service.message_index import MessageIndexService, message_text
 
 from logger import logger
 
@@ -96,7 +96,7 @@ def get_context_visualization(request):
         history_info = _get_history_info(session, session_id)
 
         # ========== 3. 当前消息信息 ==========
-        current_message_info = _get_current_message_info(session_id)
+        current_message_info = _get_current_message_info(session)
 
         # ========== 4. Token 使用情况 ==========
         token_info = _get_token_info(session, session_id)
@@ -108,7 +108,7 @@ def get_context_visualization(request):
         llm_request_info = _get_llm_request_info(session)
 
         # ========== 7. 消息列表 ==========
-        messages_info = _get_messages_list(session_id)
+        messages_info = _get_messages_list(session)
 
         logger.info(
             f"[可视化] 返回上下文可视化: session={session_id}, "
@@ -170,15 +170,8 @@ def _get_system_prompt_info(session: AgentSession, user: User) -> Dict[str, Any]
 def _get_history_info(session: AgentSession, session_id: str) -> Dict[str, Any]:
     """获取历史消息信息"""
     try:
-        # 尝试从 checkpointer 获取消息
-        from agent_service.agent_graph import app
-        config = {"configurable": {"thread_id": session_id}}
-        state = app.get_state(config)
-
-        message_count = 0
-        if state and state.values:
-            messages = state.values.get("messages", [])
-            message_count = len(messages)
+        _ensure_message_index(session)
+        message_count = session.message_index.count()
 
         return {
             "summary": session.summary_text[:500] if session.summary_text else "",
@@ -191,50 +184,26 @@ def _get_history_info(session: AgentSession, session_id: str) -> Dict[str, Any]:
         return {"error": str(e)}
 
 
-def _get_current_message_info(session_id: str) -> Dict[str, Any]:
+def _get_current_message_info(session: AgentSession) -> Dict[str, Any]:
     """获取当前消息信息"""
     try:
-        from agent_service.agent_graph import app
-        config = {"configurable": {"thread_id": session_id}}
-        state = app.get_state(config)
-
-        if not state or not state.values:
-            return {"content": "", "attachments": [], "has_attachment_context": False}
-
-        messages = state.values.get("messages", [])
-        if not messages:
-            return {"content": "", "attachments": [], "has_attachment_context": False}
-
+        _ensure_message_index(session)
         # 获取最后一条人类消息
-        last_human_msg = None
-        for msg in reversed(messages):
-            if isinstance(msg, HumanMessage):
-                last_human_msg = msg
-                break
-
-        if not last_human_msg:
+        last_human = MessageIndexService.last_human(session)
+        if not last_human:
             return {"content": "", "attachments": [], "has_attachment_context": False}
 
-        # 提取内容
-        content = ""
-        if isinstance(last_human_msg.content, str):
-            content = last_human_msg.content
-        elif isinstance(last_human_msg.content, list):
-            text_parts = [b.get('text', '') for b in last_human_msg.content if isinstance(b, dict) and b.get('type') == 'text']
-            content = ' '.join(text_parts)
-
-        # 提取附件
-        attachments = []
-        has_attachment_context = False
-        if hasattr(last_human_msg, 'additional_kwargs') and last_human_msg.additional_kwargs:
-            attachments_metadata = last_human_msg.additional_kwargs.get('attachments_metadata', [])
-            attachments = attachments_metadata
-            has_attachment_context = bool(last_human_msg.additional_kwargs.get('attachments_context', ''))
+        payload = last_human.payload or {}
+        content = payload.get("content", "")
+        if isinstance(content, list):
+            content = ' '.join(
+                b.get('text', '') for b in content if isinstance(b, dict) and b.get('type') == 'text'
+            )
 
         return {
-            "content": content[:500],  # 限制长度
-            "attachments": attachments,
-            "has_attachment_context": has_attachment_context
+            "content": (content or "")[:500],  # 限制长度
+            "attachments": payload.get("attachments", []),
+            "has_attachment_context": bool(payload.get("has_attachment_context"))
         }
     except Exception as e:
         logger.warning(f"[可视化] 获取当前消息信息失败: {e}")
@@ -289,73 +258,39 @@ def _get_tools_info(session: AgentSession, session_id: str) -> Dict[str, Any]:
         return {"error": str(e)}
 
 
-def _get_messages_list(session_id: str) -> List[Dict[str, Any]]:
+def _get_messages_list(session: AgentSession) -> List[Dict[str, Any]]:
     """获取消息列表"""
     try:
-        from agent_service.agent_graph import app
-
-        config = {"configurable": {"thread_id": session_id}}
-        state = app.get_state(config)
-
-        if not state or not state.values:
-            return []
-
-        messages = state.values.get("messages", [])
+        _ensure_message_index(session)
         result = []
 
-        for i, msg in enumerate(messages):
+        for row in session.message_index.order_by('index'):
+            payload = row.payload or {}
             msg_dict = {
-                "index": i,
-                "role": "",
-                "content": "",
-                "tool_calls": [],
+                "index": row.index,
+                "role": row.role,
+                "content": message_text(payload.get("content", "")),
+                "tool_calls": [
+                    {
+                        "name": tc.get('name') or '',
+                        "args": tc.get('args') or {}
+                    }
+                    for tc in payload.get("tool_calls") or []
+                ],
                 "tool_name": "",
                 "tool_output": "",
                 "tool_status": ""
             }
 
-            # 根据消息类型提取信息
-            if hasattr(msg, 'type'):
-                msg_dict["role"] = msg.type
-
-            # 提取 content
-            if hasattr(msg, 'content'):
-                if isinstance(msg.content, str):
-                    msg_dict["content"] = msg.content
-                elif isinstance(msg.content, list):
-                    # 处理多模态内容
-                    text_parts = []
-                    for block in msg.content:
-                        if isinstance(block, dict):
-                            if block.get('type') == 'text':
-                                text_parts.append(block.get('text', ''))
-                    msg_dict["content"] = '\n'.join(text_parts)
-
-            # 提取 tool_calls
-            if hasattr(msg, 'tool_calls') and msg.tool_calls:
-                msg_dict["tool_calls"] = [
-                    {
-                        "name": tc.get('name', ''),
-                        "args": tc.get('args', {})
-                    }
-                    for tc in msg.tool_calls
-                ]
-
             # 提取 tool 信息 (ToolMessage)
-            if hasattr(msg, 'name') and msg.name:
-                msg_dict["tool_name"] = msg.name
-            if hasattr(msg, 'tool_call_id'):
-                msg_dict["tool_call_id"] = msg.tool_call_id
-
-            # tool_status
-            if hasattr(msg, 'status'):
-                msg_dict["tool_status"] = msg.status
+            if row.role == "tool":
+                msg_dict["tool_name"] = payload.get("name") or ""
+                msg_dict["tool_call_id"] = payload.get("tool_call_id")
+                msg_dict["tool_status"] = payload.get("status") or ""
 
-            # additional_kwargs (attachments)
-            if hasattr(msg, 'additional_kwargs') and msg.additional_kwargs:
-                attachments_metadata = msg.additional_kwargs.get('attachments_metadata', [])
-                if attachments_metadata:
-                    msg_dict["attachments"] = attachments_metadata
+            # 附件元数据
+            if payload.get("attachments"):
+                msg_dict["attachments"] = payload["attachments"]
 
             result.append(msg_dict)
 
@@ -365,6 +300,13 @@ def _get_messages_list(session_id: str) -> List[Dict[str, Any]]:
         return []
 
 
+def _ensure_message_index(session: AgentSession) -> None:
+    """尚未同步过的历史会话（或回合中途退出的会话）先从 checkpoint 回填消息索引"""
+    if session.message_stats_stale:
+        from agent_service.session_store import sync_message_stats_from_checkpoint
+        sync_message_stats_from_checkpoint(session)
+
+
 def _get_llm_request_info(session: AgentSession) -> Dict[str, Any]:
     """
     获取最近一次 LLM 请求的真实数据（从 last_llm_request_snapshot 字段读取）
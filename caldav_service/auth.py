@@ -13,8 +13,7 @@ import base64
 
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
-from rest_framework.authtoken.models import Token
-
+from core.token_cache import resolve_token_user
 from logger import logger
 
 
@@ -53,14 +52,13 @@ def get_user_from_request(request):
         logger.debug(f"[CalDAV Auth] Basic auth attempt for user: {username}")
 
         # 尝试把 password 当作 API Token
-        try:
-            token_obj = Token.objects.select_related('user').get(key=password)
-            if token_obj.user.username == username:
+        token_user = resolve_token_user(password)
+        if token_user is not None:
+            if token_user.username == username:
                 logger.debug(f"[CalDAV Auth] Token auth succeeded for: {username}")
-                return token_obj.user
-            else:
-                logger.debug(f"[CalDAV Auth] Token found but username mismatch: expected={token_obj.user.username}, got={username}")
-        except Token.DoesNotExist:
+                return token_user
+            logger.debug(f"[CalDAV Auth] Token found but username mismatch: expected={token_user.username}, got={username}")
+        else:
             logger.debug(f"[CalDAV Auth] Password is not a valid API token")
 
         # 尝试普通密码认证
@@ -81,13 +79,12 @@ def get_user_from_request(request):
     # Token xxx 或 Bearer xxx
     if auth_header.startswith('Token ') or auth_header.startswith('Bearer '):
         token_value = auth_header.split(' ', 1)[1].strip()
-        try:
-            user = Token.objects.select_related('user').get(key=token_value).user
-            logger.debug(f"[CalDAV Auth] Token/Bearer auth succeeded for: {user.username}")
-            return user
-        except Token.DoesNotExist:
+        user = resolve_token_user(token_value)
+        if user is None:
             logger.warning(f"[CalDAV Auth] Invalid token/bearer value")
             return None
+        logger.debug(f"[CalDAV Auth] Token/Bearer auth succeeded for: {user.username}")
+        return user
 
     logger.warning(f"[CalDAV Auth] Unrecognized Authorization scheme: {auth_header[:20]}...")
     return None
@@ -3,17 +3,21 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
+from itertools import islice
+from typing import Iterable
 import xml.etree.ElementTree as ET
 
-from django.http import HttpResponse
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
 
 from caldav_service.xml_utils import (
-    add_propstat, add_response, caldav, cs, dav, get_local_name, get_prop, ical,
-    make_multistatus, parse_xml_body, set_text_prop, serialize_xml,
+    add_propstat, add_response, caldav, cs, dav, get_local_name, get_prop, ical, iter_multistatus,
+    make_multistatus, make_response, parse_xml_body, set_text_prop, serialize_xml,
 )
 from core.planner.application import PlannerApplicationService
 from core.planner.caldav import (
-    CalDAVCollectionNotFound, CalDAVIdentityConflict, CalDAVPreconditionFailed,
+    CalDAVCollectionNotFound, CalDAVIdentityConflict, CalDAVInvalidSyncToken, CalDAVPreconditionFailed,
     CalDAVResourceNotFound,
 )
 from core.planner.commands import PlannerCommandError
@@ -71,15 +75,19 @@ def collection_propfind(context, username: str, collection_id: str, depth: str)
     try:
         collections = PlannerApplicationService.list_calendar_collections(context)
         collection = next(item for item in collections if item.collection_id == collection_id)
-        resources = PlannerApplicationService.list_calendar_resources(context, collection_id=collection_id)
+        # Depth:0 是客户端轮询 CTag 的路径，只需要 collection 属性，不构建 resource 列表。
+        resources = (
+            PlannerApplicationService.list_calendar_resources(context, collection_id=collection_id)
+            if depth != '0' else []
+        )
     except (StopIteration, CalDAVCollectionNotFound):
         return HttpResponse(status=404)
-    root = make_multistatus()
-    _add_collection(root, context, username, collection)
-    if depth != '0':
-        for resource in resources:
-            _add_resource(root, username, collection_id, resource, include_data=False)
-    return _xml(root)
+    responses = (
+        _resource_response(username, collection_id, resource, include_data=False) for resource in resources
+    )
+    return _multistatus(
+        [_collection_response(context, username, collection)], responses, count=len(resources),
+    )
 
 
 def collection_report(context, username: str, collection_id: str, body: bytes) -> HttpResponse:
@@ -90,35 +98,58 @@ def collection_report(context, username: str, collection_id: str, body: bytes) -
     except ET.ParseError:
         return HttpResponse('Malformed XML.', status=400)
     report_type = get_local_name(root.tag)
+    if report_type == 'sync-collection':
+        return _sync_collection(context, username, collection_id, root)
     if report_type not in {'calendar-multiget', 'calendar-query'}:
         return HttpResponse(status=501)
     try:
         if report_type == 'calendar-multiget':
             all_resources = PlannerApplicationService.list_calendar_resources(context, collection_id=collection_id)
             by_name = {item.resource_name: item for item in all_resources}
-            response_root = make_multistatus()
-            for href_node in root.iter(dav('href')):
-                href = (href_node.text or '').strip()
-                resource_name = href.rstrip('/').rsplit('/', 1)[-1].removesuffix('.ics')
-                resource = by_name.get(resource_name)
-                if resource is None:
-                    response = add_response(response_root, href)
-                    add_propstat(response, status='HTTP/1.1 404 Not Found')
-                else:
-                    _add_resource(response_root, username, collection_id, resource, include_data=True, href=href)
-            return _xml(response_root)
+            hrefs = [(href_node.text or '').strip() for href_node in root.iter(dav('href'))]
+            return _multistatus(
+                (_multiget_response(username, collection_id, by_name, href) for href in hrefs), count=len(hrefs),
+            )
         range_start, range_end = _time_range(root)
         resources = PlannerApplicationService.list_calendar_resources(
             context, collection_id=collection_id, range_start=range_start, range_end=range_end
         ) if range_start and range_end else PlannerApplicationService.list_calendar_resources(
             context, collection_id=collection_id
         )
-        response_root = make_multistatus()
-        for resource in resources:
-            _add_resource(response_root, username, collection_id, resource, include_data=True)
-        return _xml(response_root)
+        return _multistatus(
+            (_resource_response(username, collection_id, resource, include_data=True) for resource in resources),
+            count=len(resources),
+        )
+    except CalDAVCollectionNotFound:
+        return HttpResponse(status=404)
+
+
+def _sync_collection(context, username: str, collection_id: str, root) -> HttpResponse:
+    """RFC 6578 sync-collection：只返回 token 之后变化的 resource 与删除 tombstone。"""
+    sync_level = (root.findtext(dav('sync-level')) or '1').strip()
+    if sync_level != '1':
+        return _precondition_failed('sync-traversal-supported')
+    token = (root.findtext(dav('sync-token')) or '').strip()
+    include_data = root.find(f".//{caldav('calendar-data')}") is not None
+    try:
+        delta = PlannerApplicationService.list_calendar_changes(
+            context, collection_id=collection_id, sync_token=token
+        )
     except CalDAVCollectionNotFound:
         return HttpResponse(status=404)
+    except CalDAVInvalidSyncToken:
+        return _precondition_failed('valid-sync-token')
+    changed = (
+        _resource_response(username, collection_id, resource, include_data=include_data)
+        for resource in delta.changed
+    )
+    token = ET.Element(dav('sync-token'))
+    token.text = delta.sync_token
+    # 空 token 的初始同步等于整个 collection，是 sync-collection 中最大的响应。
+    return _multistatus(
+        changed, (_tombstone_response(username, collection_id, name) for name in delta.removed),
+        count=len(delta.changed) + len(delta.removed), trailer=[token],
+    )
 
 
 def event_get(context, collection_id: str, resource_name: str, *, if_none_match: str = '') -> HttpResponse:
@@ -182,7 +213,11 @@ def event_delete(context, collection_id: str, resource_name: str, *, if_match: s
 
 
 def _add_collection(root, context, username, collection) -> None:
-    response = add_response(root, f'/caldav/{username}/{collection.collection_id}/')
+    root.append(_collection_response(context, username, collection))
+
+
+def _collection_response(context, username, collection) -> ET.Element:
+    response = make_response(f'/caldav/{username}/{collection.collection_id}/')
     prop = get_prop(add_propstat(response))
     resource_type = ET.SubElement(prop, dav('resourcetype'))
     ET.SubElement(resource_type, dav('collection'))
@@ -195,24 +230,46 @@ def _add_collection(root, context, username, collection) -> None:
             context, collection_id=collection.collection_id
         ),
     )
+    set_text_prop(
+        prop, dav('sync-token'),
+        PlannerApplicationService.get_calendar_sync_token(context, collection_id=collection.collection_id),
+    )
     supported = ET.SubElement(prop, caldav('supported-calendar-component-set'))
     ET.SubElement(supported, caldav('comp'), {'name': 'VEVENT'})
     report_set = ET.SubElement(prop, dav('supported-report-set'))
-    for report_name in ('calendar-multiget', 'calendar-query'):
+    for report_tag in (caldav('calendar-multiget'), caldav('calendar-query'), dav('sync-collection')):
         supported_report = ET.SubElement(report_set, dav('supported-report'))
         report = ET.SubElement(supported_report, dav('report'))
-        ET.SubElement(report, caldav(report_name))
+        ET.SubElement(report, report_tag)
+    return response
 
 
-def _add_resource(root, username, collection_id, resource, *, include_data: bool, href: str | None = None) -> None:
+def _resource_response(username, collection_id, resource, *, include_data: bool, href: str | None = None) -> ET.Element:
     canonical_href = href or f'/caldav/{username}/{collection_id}/{resource.resource_name}.ics'
-    response = add_response(root, canonical_href)
+    response = make_response(canonical_href)
     prop = get_prop(add_propstat(response))
     set_text_prop(prop, dav('getetag'), resource.etag)
     set_text_prop(prop, dav('getcontenttype'), 'text/calendar; charset=utf-8')
     ET.SubElement(prop, dav('resourcetype'))
     if include_data:
         set_text_prop(prop, caldav('calendar-data'), resource.calendar_data.decode('utf-8'))
+    return response
+
+
+def _multiget_response(username, collection_id, by_name, href: str) -> ET.Element:
+    resource_name = href.rstrip('/').rsplit('/', 1)[-1].removesuffix('.ics')
+    resource = by_name.get(resource_name)
+    if resource is None:
+        response = make_response(href)
+        add_propstat(response, status='HTTP/1.1 404 Not Found')
+        return response
+    return _resource_response(username, collection_id, resource, include_data=True, href=href)
+
+
+def _tombstone_response(username, collection_id, resource_name: str) -> ET.Element:
+    response = make_response(f'/caldav/{username}/{collection_id}/{resource_name}.ics')
+    set_text_prop(response, dav('status'), 'HTTP/1.1 404 Not Found')
+    return response
 
 
 def _time_range(root):
@@ -234,5 +291,47 @@ def _caldav_datetime(value: str) -> datetime:
     return datetime.strptime(value, '%Y%m%dT%H%M%S').replace(tzinfo=timezone.utc)
 
 
+def _precondition_failed(condition: str) -> HttpResponse:
+    error = ET.Element(dav('error'))
+    ET.SubElement(error, dav(condition))
+    return HttpResponse(serialize_xml(error), content_type='application/xml; charset=utf-8', status=403)
+
+
 def _xml(root) -> HttpResponse:
     return HttpResponse(serialize_xml(root), content_type='application/xml; charset=utf-8', status=207)
+
+
+class BatchedStreamingHttpResponse(StreamingHttpResponse):
+    """
+    同步 chunk 生成器的流式响应，WSGI 与 ASGI 下都边编码边发送。
+
+    StreamingHttpResponse 在 ASGI 下会先用 sync_to_async(list) 缓冲整个同步迭代器；
+    这里改为每次在 thread_sensitive 线程中取一批 chunk（生成器可能访问 ORM），
+    峰值只含一批已编码的 response。WSGI 仍直接迭代同步生成器。
+    """
+
+    batch_size = 64
+
+    async def __aiter__(self):
+        chunks = iter(self.streaming_content)
+        next_batch = sync_to_async(lambda: list(islice(chunks, self.batch_size)), thread_sensitive=True)
+        while batch := await next_batch():
+            for chunk in batch:
+                yield chunk
+
+
+def _multistatus(*groups: Iterable[ET.Element], count: int, trailer: Iterable[ET.Element] = ()) -> HttpResponse:
+    """
+    大 collection 逐个 response 编码并输出，编码后的 XML 不随 resource 数累积；
+    resource DTO 列表仍由查询服务一次批量构建（count 与批量预取都依赖它）。
+    小响应仍构建整棵树，保留 Content-Length。groups 为惰性生成器，两条路径都只消费一次。
+    """
+    responses = (element for group in groups for element in group)
+    if count >= int(getattr(settings, 'PLANNER_CALDAV_STREAMING_MIN_RESOURCES', 200)):
+        return BatchedStreamingHttpResponse(
+            iter_multistatus(responses, trailer), content_type='application/xml; charset=utf-8', status=207,
+        )
+    root = make_multistatus()
+    root.extend(responses)
+    root.extend(trailer)
+    return _xml(root)
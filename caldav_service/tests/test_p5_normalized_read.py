@@ -1,16 +1,28 @@
 import base64
 import hashlib
+import warnings
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
+from asgiref.sync import async_to_sync
 from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework.authtoken.models import Token
 
 from core.models import (
-    CalendarEvent, EventGroup, EventRecurrenceSeries, PlannerCohortAssignment,
+    CalendarChange, CalendarEvent, EventGroup, EventRecurrenceSeries, PlannerCohortAssignment,
     PlannerMigrationState, Reminder, Todo, UserData,
 )
+from core.planner.calendar_changes import CalendarCollectionChangeWriter
+from core.planner.caldav import CalDAVResourceNotFound, PlannerCalDAVQueryService
 from core.planner.commands import PlannerCommandService
-from core.planner.entities import PlannerEntityCommandService
+from core.planner.entities import PlannerEntityCommandService, PlannerEntityQueryService
+from core.planner.recurrence import RecurrenceExpander
+from core.planner.repository import PlannerRepository
 
 
 def _basic(username, password):
@@ -65,7 +77,8 @@ class CalDAVNormalizedReadTests(TestCase):
         self.assertIn(f'/{self.group.group_id}/', text)
         self.assertIn('/reminders/', text)
         self.assertNotIn('LEGACY-NOT-VISIBLE', text)
-        self.assertNotIn('sync-collection', text)
+        self.assertIn('sync-collection', text)
+        self.assertIn('sync-token', text)
 
         default = self.request('PROPFIND', f'/caldav/{self.user.username}/default/', HTTP_DEPTH='1')
         self.assertEqual(default.status_code, 207)
@@ -123,12 +136,225 @@ class CalDAVNormalizedReadTests(TestCase):
             self.request('REPORT', f'/caldav/{self.user.username}/default/', b'<broken').status_code,
             400,
         )
-        unsupported = b'<D:sync-collection xmlns:D="DAV:"/>'
+        unsupported = b'<C:free-busy-query xmlns:C="urn:ietf:params:xml:ns:caldav"/>'
         self.assertEqual(
             self.request('REPORT', f'/caldav/{self.user.username}/default/', unsupported).status_code,
             501,
         )
 
+    def test_single_resource_lookup_matches_collection_listing_without_full_rebuild(self):
+        collections = ('default', self.group.group_id, 'reminders')
+        for collection_id in collections:
+            for listed in PlannerCalDAVQueryService.list_resources(self.user, collection_id):
+                for name in (f'{listed.resource_name}.ics', listed.resource.ical_uid):
+                    with self.subTest(collection=collection_id, name=name):
+                        found = PlannerCalDAVQueryService.get_resource(self.user, collection_id, name)
+                        self.assertEqual((found.resource_name, found.etag), (listed.resource_name, listed.etag))
+        with self.assertRaises(CalDAVResourceNotFound):
+            PlannerCalDAVQueryService.get_resource(
+                self.user, 'default', f'{self.recurring.recurrence_series.caldav_resource_name}.ics'
+            )
+
+        with CaptureQueriesContext(connection) as baseline:
+            PlannerCalDAVQueryService.get_resource(self.user, 'default', f'{self.default_event.caldav_resource_name}.ics')
+        for index in range(5):
+            PlannerCommandService.create_event(self.user, {
+                'title': f'无关事件{index}', 'start': '2026-07-14T10:00:00+08:00',
+                'end': '2026-07-14T11:00:00+08:00', 'recurrence': {'rrule': 'FREQ=DAILY;COUNT=3'},
+            })
+        with self.assertNumQueries(len(baseline.captured_queries)):
+            PlannerCalDAVQueryService.get_resource(self.user, 'default', f'{self.default_event.caldav_resource_name}.ics')
+
+    def test_time_range_listing_is_scoped_to_collection_and_window(self):
+        for index in range(3):
+            PlannerCommandService.create_event(self.user, {
+                'title': f'远期重复{index}', 'start': '2027-03-01T09:00:00+08:00',
+                'end': '2027-03-01T10:00:00+08:00', 'recurrence': {'rrule': 'FREQ=DAILY;COUNT=5'},
+            })
+        PlannerCommandService.create_event(self.user, {
+            'title': '其他分组重复', 'group_id': self.group.group_id,
+            'start': '2026-07-13T09:00:00+08:00', 'end': '2026-07-13T10:00:00+08:00',
+            'recurrence': {'rrule': 'FREQ=DAILY;COUNT=5'},
+        })
+        windows = (
+            (datetime(2026, 7, 13, tzinfo=dt_timezone.utc), datetime(2026, 7, 14, tzinfo=dt_timezone.utc)),
+            (datetime(2026, 7, 1, tzinfo=dt_timezone.utc), datetime(2026, 8, 1, tzinfo=dt_timezone.utc)),
+            (datetime(2027, 3, 2, tzinfo=dt_timezone.utc), datetime(2027, 3, 3, tzinfo=dt_timezone.utc)),
+        )
+        for collection_id in ('default', self.group.group_id, 'reminders'):
+            listed = PlannerCalDAVQueryService.list_resources(self.user, collection_id)
+            for range_start, range_end in windows:
+                occurrences = (
+                    PlannerEntityQueryService.list_reminder_occurrences(
+                        self.user, range_start=range_start, range_end=range_end
+                    ) if collection_id == 'reminders' else PlannerRepository.list_event_occurrences(
+                        self.user, range_start=range_start, range_end=range_end
+                    )
+                )
+                ids = {item.ref.entity_id for item in occurrences}
+                with self.subTest(collection=collection_id, start=range_start):
+                    ranged = PlannerCalDAVQueryService.list_resources(
+                        self.user, collection_id, range_start=range_start, range_end=range_end
+                    )
+                    self.assertEqual(
+                        [(item.resource_name, item.etag) for item in ranged],
+                        [(item.resource_name, item.etag) for item in listed if item.resource.entity_id in ids],
+                    )
+
+        with mock.patch.object(RecurrenceExpander, 'expand', wraps=RecurrenceExpander.expand) as expand:
+            ranged = PlannerCalDAVQueryService.list_resources(
+                self.user, 'default', range_start=windows[0][0], range_end=windows[0][1]
+            )
+        self.assertEqual([item.resource_name for item in ranged], [self.default_event.caldav_resource_name])
+        self.assertEqual(expand.call_count, 0)
+
+    def test_collection_depth_zero_propfind_does_not_grow_with_collection(self):
+        path = f'/caldav/{self.user.username}/default/'
+        # 预热 Token 认证缓存，两次计数都只包含 collection 查询。
+        self.request('PROPFIND', path, HTTP_DEPTH='0')
+        with CaptureQueriesContext(connection) as baseline:
+            first = self.request('PROPFIND', path, HTTP_DEPTH='0')
+        self.assertEqual(first.status_code, 207)
+        for index in range(5):
+            PlannerCommandService.create_event(self.user, {
+                'title': f'轮询事件{index}', 'start': '2026-07-15T10:00:00+08:00',
+                'end': '2026-07-15T11:00:00+08:00', 'recurrence': {'rrule': 'FREQ=DAILY;COUNT=3'},
+            })
+        with self.assertNumQueries(len(baseline.captured_queries)):
+            second = self.request('PROPFIND', path, HTTP_DEPTH='0')
+        self.assertNotEqual(first.content, second.content)
+        self.assertNotIn('.ics', second.content.decode())
+
+    def test_large_multistatus_streams_the_same_responses(self):
+        resource_name = self.recurring.recurrence_series.caldav_resource_name
+        multiget = (
+            '<C:calendar-multiget xmlns:C="urn:ietf:params:xml:ns:caldav" xmlns:D="DAV:">'
+            f'<D:href>/caldav/{self.user.username}/{self.group.group_id}/{resource_name}.ics</D:href>'
+            f'<D:href>/caldav/{self.user.username}/{self.group.group_id}/missing.ics</D:href>'
+            '</C:calendar-multiget>'
+        ).encode()
+        query = b'<C:calendar-query xmlns:C="urn:ietf:params:xml:ns:caldav"/>'
+        requests = (
+            ('PROPFIND', f'/caldav/{self.user.username}/{self.group.group_id}/', b'', {'HTTP_DEPTH': '1'}),
+            ('REPORT', f'/caldav/{self.user.username}/{self.group.group_id}/', multiget, {}),
+            ('REPORT', f'/caldav/{self.user.username}/reminders/', query, {}),
+        )
+
+        def entries(body):
+            root = ET.fromstring(body)
+            return [
+                (node.findtext('{DAV:}href'), [item.text for item in node.iter() if item.text and item.text.strip()])
+                for node in root.findall('{DAV:}response')
+            ], root.findtext('{DAV:}sync-token')
+
+        for method, path, body, headers in requests:
+            with self.subTest(method=method, path=path):
+                buffered = self.request(method, path, body, **headers)
+                with self.settings(PLANNER_CALDAV_STREAMING_MIN_RESOURCES=1):
+                    streamed = self.request(method, path, body, **headers)
+                self.assertFalse(buffered.streaming)
+                self.assertTrue(streamed.streaming)
+                self.assertEqual(streamed.status_code, 207)
+                self.assertEqual(entries(b''.join(streamed.streaming_content)), entries(buffered.content))
+
+        buffered = self.sync_collection('default')
+        with self.settings(PLANNER_CALDAV_STREAMING_MIN_RESOURCES=1):
+            streamed = self.sync_collection('default')
+            served = self.sync_collection('default')
+        self.assertTrue(streamed.streaming)
+        streamed_entries, token = entries(b''.join(streamed.streaming_content))
+        self.assertEqual((streamed_entries, token), entries(buffered.content))
+        self.assertEqual(token, self.response_token(buffered))
+
+        # ASGIHandler 经 __aiter__ 消费：按批取 chunk，不触发 Django 对同步迭代器的整体缓冲
+        async def consume(response):
+            return [chunk async for chunk in response]
+
+        served.batch_size = 1
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            chunks = async_to_sync(consume)(served)
+        self.assertGreater(len(chunks), 3)
+        self.assertEqual(entries(b''.join(chunks)), (streamed_entries, token))
+
+    def sync_collection(self, collection_id, token=''):
+        body = (
+            '<D:sync-collection xmlns:D="DAV:"><D:sync-token>'
+            f'{token}</D:sync-token><D:sync-level>1</D:sync-level>'
+            '<D:prop><D:getetag/></D:prop></D:sync-collection>'
+        ).encode()
+        return self.request('REPORT', f'/caldav/{self.user.username}/{collection_id}/', body)
+
+    @staticmethod
+    def response_token(response):
+        return ET.fromstring(response.content).findtext('{DAV:}sync-token')
+
+    @staticmethod
+    def sync_entries(response):
+        """href 名 -> 'changed' 或 tombstone 状态行。"""
+        entries = {}
+        for node in ET.fromstring(response.content).findall('{DAV:}response'):
+            name = node.findtext('{DAV:}href').rsplit('/', 1)[-1]
+            entries[name] = node.findtext('{DAV:}status') or 'changed'
+        return entries
+
+    def test_sync_collection_returns_changes_and_tombstones_since_token(self):
+        initial = self.sync_collection('default')
+        self.assertEqual(initial.status_code, 207)
+        self.assertIn(f'{self.default_event.caldav_resource_name}.ics', initial.content.decode())
+        token = self.response_token(initial)
+        unchanged = self.sync_collection('default', token)
+        self.assertEqual(unchanged.status_code, 207)
+        self.assertNotIn('.ics', unchanged.content.decode())
+        self.assertEqual(self.response_token(unchanged), token)
+
+        old_name = self.default_event.caldav_resource_name
+        added = PlannerCommandService.create_event(self.user, {
+            'title': '新增事件', 'start': '2026-07-16T10:00:00+08:00', 'end': '2026-07-16T11:00:00+08:00',
+        })
+        PlannerCommandService.patch_event(
+            self.user, self.default_event.event_id, {'recurrence': {'rrule': 'FREQ=DAILY;COUNT=2'}},
+            scope='all', occurrence_ref=None, expected_version=self.default_event.version,
+        )
+        series_name = EventRecurrenceSeries.objects.get(master_event=self.default_event).caldav_resource_name
+        delta = self.sync_collection('default', token)
+        self.assertEqual(delta.status_code, 207)
+        self.assertEqual(self.sync_entries(delta), {
+            f'{added.caldav_resource_name}.ics': 'changed',
+            f'{series_name}.ics': 'changed',
+            f'{old_name}.ics': 'HTTP/1.1 404 Not Found',
+        })
+        self.assertNotEqual(self.response_token(delta), token)
+
+        reminder_token = self.response_token(self.sync_collection('reminders'))
+        PlannerEntityCommandService.delete_reminder(self.user, self.reminder.reminder_id, self.reminder.version)
+        removed = self.sync_entries(self.sync_collection('reminders', reminder_token))
+        self.assertEqual(removed, {
+            f'rem-series-{self.reminder.recurrence_series.series_id}.ics': 'HTTP/1.1 404 Not Found',
+            f'rem-{self.reminder.reminder_id}.ics': 'HTTP/1.1 404 Not Found',
+        })
+
+        for invalid in ('bogus', token.replace(':default:', ':reminders:'), f'{token}999'):
+            with self.subTest(token=invalid):
+                response = self.sync_collection('default', invalid)
+                self.assertEqual(response.status_code, 403)
+                self.assertIn('valid-sync-token', response.content.decode())
+
+    def test_compacted_change_log_forces_full_resync(self):
+        token = self.response_token(self.sync_collection('default'))
+        for index in range(2):
+            PlannerCommandService.create_event(self.user, {
+                'title': f'压缩后事件{index}', 'start': '2026-07-16T10:00:00+08:00',
+                'end': '2026-07-16T11:00:00+08:00',
+            })
+        latest = self.response_token(self.sync_collection('default'))
+        CalendarChange.objects.update(occurred_at=timezone.now() - timedelta(days=200))
+        report = CalendarCollectionChangeWriter.compact(timezone.now() - timedelta(days=90), user=self.user)
+        self.assertGreater(report['deleted'], 0)
+        self.assertEqual(self.sync_collection('default', token).status_code, 403)
+        self.assertEqual(self.sync_collection('default', latest).status_code, 207)
+        self.assertEqual(self.sync_collection('default').status_code, 207)
+
     def test_all_read_methods_are_side_effect_free(self):
         models = [CalendarEvent, EventRecurrenceSeries, Todo, Reminder, UserData]
         before = [model.objects.count() for model in models]
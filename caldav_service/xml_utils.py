@@ -5,6 +5,7 @@ CalDAV XML 工具模块
 """
 
 import xml.etree.ElementTree as ET
+from typing import Iterable, Iterator
 
 # =====================================================
 # XML 命名空间
@@ -57,14 +58,21 @@ def make_multistatus() -> ET.Element:
     return root
 
 
-def add_response(parent: ET.Element, href: str) -> ET.Element:
-    """在 multistatus 下添加一个 <D:response>。"""
-    resp = ET.SubElement(parent, dav("response"))
+def make_response(href: str) -> ET.Element:
+    """创建一个未挂到 multistatus 的 <D:response>，供流式输出逐个序列化。"""
+    resp = ET.Element(dav("response"))
     href_el = ET.SubElement(resp, dav("href"))
     href_el.text = href
     return resp
 
 
+def add_response(parent: ET.Element, href: str) -> ET.Element:
+    """在 multistatus 下添加一个 <D:response>。"""
+    resp = make_response(href)
+    parent.append(resp)
+    return resp
+
+
 def add_propstat(response: ET.Element, status: str = "HTTP/1.1 200 OK") -> ET.Element:
     """在 response 下添加 <D:propstat>，包含 <D:prop> 和 <D:status>。"""
     propstat = ET.SubElement(response, dav("propstat"))
@@ -97,6 +105,25 @@ def serialize_xml(root: ET.Element) -> bytes:
     return b'<?xml version="1.0" encoding="utf-8"?>\n' + ET.tostring(root, encoding="unicode").encode("utf-8")
 
 
+def iter_multistatus(
+    responses: Iterable[ET.Element], trailer: Iterable[ET.Element] = (),
+) -> Iterator[bytes]:
+    """
+    逐个序列化 <D:response> 的 multistatus 生成器。
+
+    任一时刻只有一个 response 子树在内存中；每个子树自带命名空间声明，
+    与 serialize_xml 的输出在 XML 语义上等价。
+    """
+    yield b'<?xml version="1.0" encoding="utf-8"?>\n'
+    attributes = "".join(f' xmlns:{prefix}="{uri}"' for prefix, uri in NSMAP.items())
+    yield f"<D:multistatus{attributes}>".encode("utf-8")
+    for element in responses:
+        yield ET.tostring(element, encoding="unicode").encode("utf-8")
+    for element in trailer:
+        yield ET.tostring(element, encoding="unicode").encode("utf-8")
+    yield b"</D:multistatus>"
+
+
 # =====================================================
 # XML 解析辅助
 # =====================================================
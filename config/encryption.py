@@ -25,9 +25,13 @@ API 密钥加密存储模块
 
 import os
 import base64
+import copy
 import hashlib
+import threading
+import time
+from collections import OrderedDict
 from logger import logger
-from typing import Optional, Tuple
+from typing import Callable, Hashable, Optional, Tuple
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
@@ -40,11 +44,121 @@ ENCRYPTION_VERSION = "v1"
 ENCRYPTED_PREFIX = "$ENCRYPTED$"
 
 
+class DerivedKeyCache:
+    """
+    进程内派生密钥缓存：有界 LRU + TTL。
+
+    密钥以 bytearray 保存，淘汰、过期或 clear 时原地清零（尽力而为：
+    get 返回的 bytes 副本仅在单次加解密期间存活）。
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl_seconds: float = 900):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[float, bytearray]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_derive(self, key: Hashable, derive: Callable[[], bytes]) -> bytes:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return bytes(entry[1])
+            if entry is not None:
+                self._zero(self._entries.pop(key)[1])
+            self.misses += 1
+        derived = derive()
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._zero(previous[1])
+            self._entries[key] = (now + self.ttl_seconds, bytearray(derived))
+            while len(self._entries) > self.maxsize:
+                self._zero(self._entries.popitem(last=False)[1][1])
+        return derived
+
+    def info(self) -> dict:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries), 'maxsize': self.maxsize}
+
+    def clear(self) -> None:
+        with self._lock:
+            for _expires_at, value in self._entries.values():
+                self._zero(value)
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    @staticmethod
+    def _zero(value: bytearray) -> None:
+        value[:] = bytes(len(value))
+
+
+class DecryptedConfigCache:
+    """
+    解密后的模型配置缓存，按用户保存 (原始密文 JSON, 解密结果)。
+
+    命中时校验原始 JSON 与当前行一致，绕过 views_config_api 的写入也不会读到旧配置；
+    返回深拷贝，调用方修改结果不会污染缓存。
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl_seconds: float = 300):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[int, tuple[float, str, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_decrypt(self, user_id: int, raw_value: str, decrypt: Callable[[], dict]) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now and entry[1] == raw_value:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return copy.deepcopy(entry[2])
+            self.misses += 1
+        decrypted = decrypt()
+        with self._lock:
+            self._entries[user_id] = (now + self.ttl_seconds, raw_value, copy.deepcopy(decrypted))
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return decrypted
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def info(self) -> dict:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries), 'maxsize': self.maxsize}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
 class SecureKeyStorage:
     """安全密钥存储类"""
     
-    # 缓存派生的密钥，避免重复计算
-    _key_cache = {}
+    # 缓存派生的密钥，避免每次解密都执行 10 万轮 PBKDF2
+    _key_cache = DerivedKeyCache(
+        maxsize=int(getattr(settings, 'SECURE_KEY_CACHE_MAX_ENTRIES', 1024)),
+        ttl_seconds=float(getattr(settings, 'SECURE_KEY_CACHE_TTL_SECONDS', 900)),
+    )
+    # 缓存解密后的模型配置，agent 每轮读取模型配置时不再逐个解密
+    decrypted_configs = DecryptedConfigCache(
+        maxsize=int(getattr(settings, 'SECURE_KEY_CACHE_MAX_ENTRIES', 1024)),
+        ttl_seconds=float(getattr(settings, 'SECURE_CONFIG_CACHE_TTL_SECONDS', 300)),
+    )
     
     @classmethod
     def _get_master_key(cls) -> bytes:
@@ -67,27 +181,24 @@ class SecureKeyStorage:
         使用 PBKDF2 从主密钥 + 用户ID 派生 256 位密钥
         这样即使数据库泄露，没有主密钥也无法解密
         """
-        cache_key = f"user_{user_id}"
-        if cache_key in cls._key_cache:
-            return cls._key_cache[cache_key]
-        
         master_key = cls._get_master_key()
         
-        # 使用用户 ID 作为盐值的一部分
-        salt = f"unischeduler_user_{user_id}_salt".encode()
-        
-        # PBKDF2 密钥派生
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,  # 256 bits for AES-256
-            salt=salt,
-            iterations=100000,  # 推荐迭代次数
-        )
-        
-        derived_key = kdf.derive(master_key)
-        cls._key_cache[cache_key] = derived_key
+        def derive() -> bytes:
+            # 使用用户 ID 作为盐值的一部分
+            salt = f"unischeduler_user_{user_id}_salt".encode()
+            
+            # PBKDF2 密钥派生
+            kdf = PBKDF2HMAC(
+                algorithm=hashes.SHA256(),
+                length=32,  # 256 bits for AES-256
+                salt=salt,
+                iterations=100000,  # 推荐迭代次数
+            )
+            return kdf.derive(master_key)
         
-        return derived_key
+        # 主密钥摘要进入 key：SECRET_KEY 轮换后不会复用旧密钥
+        cache_key = (user_id, hashlib.sha256(master_key).hexdigest()[:16])
+        return cls._key_cache.get_or_derive(cache_key, derive)
     
     @classmethod
     def encrypt_api_key(cls, api_key: str, user_id: int) -> str:
@@ -251,6 +362,20 @@ class SecureKeyStorage:
         
         return result
     
+    @classmethod
+    def decrypt_model_config_cached(cls, raw_value: str, user_id: int, load: Callable[[], dict]) -> dict:
+        """
+        按 UserData 原始值缓存 decrypt_model_config 的结果
+        
+        Args:
+            raw_value: agent_config 行的原始 JSON（作为缓存签名）
+            user_id: 用户 ID
+            load: 解析原始 JSON 的回调，仅在未命中时调用
+        """
+        return cls.decrypted_configs.get_or_decrypt(
+            user_id, raw_value, lambda: cls.decrypt_model_config(load(), user_id)
+        )
+    
     @classmethod
     def mask_api_key(cls, api_key: str) -> str:
         """
@@ -16,3 +16,22 @@ class MyappConfig(AppConfig):
                 cursor.execute('PRAGMA busy_timeout=30000;')  # 30秒超时
         
         connection_created.connect(enable_wal_mode)
+
+        # cohort/迁移状态变化时递增准入版本，使请求内记忆的 Planner 准入判定立即失效
+        from django.db.models.signals import post_delete, post_save
+        from core.models import PlannerCohortAssignment, PlannerMigrationIssue, PlannerMigrationState
+        from core.planner.rollout import bump_admission_version
+
+        for model in (PlannerCohortAssignment, PlannerMigrationState, PlannerMigrationIssue):
+            post_save.connect(bump_admission_version, sender=model, dispatch_uid=f'planner_admission_{model.__name__}')
+            post_delete.connect(bump_admission_version, sender=model, dispatch_uid=f'planner_admission_{model.__name__}_delete')
+
+        # Token 删除/轮换与 User 变更立即失效本进程的 Token 认证缓存
+        from django.contrib.auth.models import User
+        from rest_framework.authtoken.models import Token
+        from core.token_cache import invalidate_token, invalidate_token_user
+
+        post_save.connect(invalidate_token, sender=Token, dispatch_uid='token_cache_token')
+        post_delete.connect(invalidate_token, sender=Token, dispatch_uid='token_cache_token_delete')
+        post_save.connect(invalidate_token_user, sender=User, dispatch_uid='token_cache_user')
+        post_delete.connect(invalidate_token_user, sender=User, dispatch_uid='token_cache_user_delete')
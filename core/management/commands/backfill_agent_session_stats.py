@@ -0,0 +1,37 @@
+"""从 LangGraph checkpoint 回填 AgentSession 的会话列表统计（消息数、预览、是否为空）。"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from agent_service.models import AgentSession
+from agent_service.session_store import sync_message_stats_from_checkpoint
+
+
+class Command(BaseCommand):
+    help = '逐个读取尚未同步统计的会话的最新 checkpoint 并写回 AgentSession；可重复执行。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user-id', type=int, help='只回填指定用户的会话。')
+        parser.add_argument('--force', action='store_true', help='重新同步已同步过的会话。')
+
+    def handle(self, *args, **options):
+        sessions = AgentSession.objects.order_by('id')
+        if options.get('user_id') is not None:
+            sessions = sessions.filter(user_id=options['user_id'])
+            if not sessions.exists():
+                raise CommandError(f'用户没有会话: {options["user_id"]}')
+        if not options['force']:
+            sessions = sessions.filter(AgentSession.message_stats_stale_q())
+        synced, empty, failed = 0, 0, []
+        for session in sessions.only('id', 'session_id').iterator(chunk_size=100):
+            try:
+                stats = sync_message_stats_from_checkpoint(session)
+            except Exception as exc:
+                failed.append({'session_id': session.session_id, 'error': str(exc)})
+                continue
+            synced += 1
+            empty += stats['is_empty']
+        self.stdout.write(json.dumps(
+            {'synced': synced, 'empty': empty, 'failed': failed}, ensure_ascii=False, indent=2
+        ))
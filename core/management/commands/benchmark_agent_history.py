@@ -0,0 +1,109 @@
+"""比较历史分页从 checkpoint 反序列化整段 messages 与读取消息索引一页的耗时；数据库写入全部回滚。"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from agent_service.agent_graph import workflow
+from agent_service.message_index import HISTORY_ROLES, MessageIndexService, format_message, message_tokens
+from agent_service.models import AgentSession
+
+
+def _messages(count: int):
+    messages = []
+    for index in range(count):
+        kind = index % 4
+        if kind == 0:
+            messages.append(HumanMessage(content=f'第 {index} 条：帮我安排下周的会议和复习计划。' * 4, id=f'h{index}'))
+        elif kind == 1:
+            messages.append(AIMessage(
+                content='', id=f'a{index}',
+                tool_calls=[{'name': 'search_items', 'args': {'keyword': f'会议 {index}'}, 'id': f'c{index}'}],
+            ))
+        elif kind == 2:
+            messages.append(ToolMessage(
+                content=json.dumps([{'title': f'会议 {index}', 'start': '2026-03-02T09:00'}] * 5, ensure_ascii=False),
+                tool_call_id=f'c{index - 1}', name='search_items', id=f't{index}',
+            ))
+        else:
+            messages.append(AIMessage(content=f'已为你整理好第 {index} 条的安排。' * 6, id=f'a{index}'))
+    return messages
+
+
+class Command(BaseCommand):
+    help = '在临时 checkpoint 库中写入一个长会话，输出 get_state 后格式化一页与消息索引分页、token 求和的毫秒数。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=2000, help='会话消息数。')
+        parser.add_argument('--limit', type=int, default=20, help='每页条数。')
+        parser.add_argument('--batch', type=int, default=100, help='每次 update_state 追加的消息数（对应 checkpoint 数）。')
+
+    def handle(self, *args, **options):
+        count, limit, batch = options['messages'], options['limit'], options['batch']
+        if count <= 0 or limit <= 0 or batch <= 0:
+            raise CommandError('--messages、--limit、--batch 必须为正整数')
+        messages = _messages(count)
+        thread_id = 'user_0_benchmark_history'
+        config = {'configurable': {'thread_id': thread_id}}
+        with tempfile.TemporaryDirectory() as directory:
+            conn = sqlite3.connect(os.path.join(directory, 'checkpoints.sqlite'), check_same_thread=False)
+            try:
+                graph = workflow.compile(checkpointer=SqliteSaver(conn))
+                for start in range(0, count, batch):
+                    graph.update_state(config, {'messages': messages[start:start + batch]}, as_node='agent')
+
+                started = time.perf_counter()
+                state = graph.get_state(config)
+                stored = state.values.get('messages', [])
+                legacy_page = [
+                    format_message(msg, idx)
+                    for idx, msg in enumerate(stored[-limit:], start=len(stored) - limit)
+                    if msg.type in HISTORY_ROLES
+                ]
+                checkpoint_page = time.perf_counter() - started
+                started = time.perf_counter()
+                legacy_tokens = sum(message_tokens(msg) for msg in graph.get_state(config).values['messages'])
+                checkpoint_tokens = time.perf_counter() - started
+            finally:
+                conn.close()
+
+        with transaction.atomic():
+            user = User.objects.create_user(username='benchmark-agent-history')
+            session = AgentSession.objects.create(user=user, session_id=f'user_{user.id}_benchmark', name='benchmark')
+            started = time.perf_counter()
+            MessageIndexService.sync(session.session_id, stored)
+            full_sync = time.perf_counter() - started
+            started = time.perf_counter()
+            MessageIndexService.sync(session.session_id, stored + [HumanMessage(content='追加一条', id='tail')])
+            append_sync = time.perf_counter() - started
+            started = time.perf_counter()
+            rows, total, _ = MessageIndexService.page(session, limit=limit)
+            index_page = time.perf_counter() - started
+            started = time.perf_counter()
+            index_tokens = MessageIndexService.total_tokens(session)
+            index_sum = time.perf_counter() - started
+            if [row.payload for row in rows[:-1] if row.role in HISTORY_ROLES] != legacy_page[1:]:
+                raise CommandError('消息索引分页与 checkpoint 格式化结果不一致')
+            if index_tokens - rows[-1].token_count != legacy_tokens:
+                raise CommandError(f'token 求和不一致: {index_tokens - rows[-1].token_count} != {legacy_tokens}')
+            transaction.set_rollback(True)
+
+        self.stdout.write(json.dumps({
+            'messages': count,
+            'page_size': limit,
+            'checkpoint_get_state_page_ms': round(checkpoint_page * 1000, 3),
+            'index_page_ms': round(index_page * 1000, 3),
+            'checkpoint_token_estimate_ms': round(checkpoint_tokens * 1000, 3),
+            'index_token_sum_ms': round(index_sum * 1000, 3),
+            'index_full_sync_ms': round(full_sync * 1000, 3),
+            'index_append_sync_ms': round(append_sync * 1000, 3),
+            'indexed_total': total,
+        }, ensure_ascii=False, indent=2))
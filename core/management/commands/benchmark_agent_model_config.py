@@ -0,0 +1,63 @@
+"""测量 agent 每轮读取模型配置（get_current_model_config）在有无密钥/配置缓存时的耗时；结束时回滚。"""
+
+import json
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from agent_service.context_optimizer import get_current_model_config
+from agent_service.views_config_api import set_agent_config_encrypted
+from config.encryption import SecureKeyStorage
+
+
+class Command(BaseCommand):
+    help = '为临时用户写入加密的自定义模型配置，比较每次清空缓存（逐次 PBKDF2 + 解密）与缓存命中时的每轮开销。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--models', type=int, default=5, help='自定义模型数量（每个含一个加密 API Key）。')
+        parser.add_argument('--turns', type=int, default=50, help='模拟的 agent 轮数。')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = User.objects.create_user(username=f'bench-model-config-{time.time_ns()}')
+            set_agent_config_encrypted(user, {
+                'current_model_id': 'bench_0',
+                'custom_models': {
+                    f'bench_{index}': {'name': f'bench {index}', 'api_key': f'sk-bench-{index:04d}' * 3}
+                    for index in range(options['models'])
+                },
+            })
+            key_cache, config_cache = SecureKeyStorage._key_cache, SecureKeyStorage.decrypted_configs
+            uncached = self._per_turn(user, options['turns'], clear=(key_cache, config_cache))
+            # 旧实现的稳态：派生密钥常驻无界字典，但每轮仍解析并逐个解密配置。
+            keys_only = self._per_turn(user, options['turns'], clear=(config_cache,))
+            key_cache.clear()
+            config_cache.clear()
+            started = time.perf_counter()
+            get_current_model_config(user)
+            cold = time.perf_counter() - started
+            cached = self._per_turn(user, options['turns'], clear=())
+            transaction.set_rollback(True)
+        self.stdout.write(json.dumps({
+            'custom_models': options['models'],
+            'turns': options['turns'],
+            'uncached_ms_per_turn': round(uncached * 1000, 3),
+            'derived_key_only_ms_per_turn': round(keys_only * 1000, 3),
+            'first_turn_ms': round(cold * 1000, 3),
+            'cached_ms_per_turn': round(cached * 1000, 3),
+            'key_cache': SecureKeyStorage._key_cache.info(),
+            'config_cache': SecureKeyStorage.decrypted_configs.info(),
+        }, ensure_ascii=False, indent=2))
+
+    @staticmethod
+    def _per_turn(user, turns: int, *, clear: tuple) -> float:
+        elapsed = 0.0
+        for _ in range(max(turns, 1)):
+            for cache in clear:
+                cache.clear()
+            started = time.perf_counter()
+            get_current_model_config(user)
+            elapsed += time.perf_counter() - started
+        return elapsed / max(turns, 1)
@@ -0,0 +1,52 @@
+"""测量 CalDAV PROPFIND Depth:0 所需的 collection/CTag 读取随 collection 规模的耗时；结束后回滚。"""
+
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import CalendarEvent
+from core.planner.caldav import PlannerCalDAVQueryService
+
+
+class Command(BaseCommand):
+    help = '在回滚事务中为临时用户批量生成 event，输出各规模下 Depth:0 collection 读取耗时。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='100,1000,10000', help='逗号分隔的 collection 规模。')
+        parser.add_argument('--repeat', type=int, default=20, help='每个规模重复次数，取中位数。')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted(int(item) for item in options['sizes'].split(',') if item.strip())
+        except ValueError as exc:
+            raise CommandError(f'--sizes 必须是逗号分隔的整数: {exc}') from exc
+        results = []
+        with transaction.atomic():
+            user = User.objects.create_user(username=f'caldav-ctag-bench-{uuid4().hex[:8]}')
+            created = 0
+            base = datetime(2026, 3, 2, 1, tzinfo=timezone.utc)
+            for size in sizes:
+                CalendarEvent.objects.bulk_create([
+                    CalendarEvent(
+                        user=user, event_id=f'bench-{index}', title=f'bench-{index}',
+                        ical_uid=f'evt-bench-{index}@unischeduler', caldav_resource_name=f'bench-{index}',
+                        start_at=base + timedelta(hours=index), end_at=base + timedelta(hours=index, minutes=30),
+                    )
+                    for index in range(created, size)
+                ], batch_size=1000)
+                created = size
+                elapsed = []
+                for _ in range(max(options['repeat'], 1)):
+                    started = time.perf_counter()
+                    PlannerCalDAVQueryService.list_collections(user)
+                    PlannerCalDAVQueryService.collection_ctag(user, 'default')
+                    elapsed.append(time.perf_counter() - started)
+                elapsed.sort()
+                results.append({'resources': size, 'median_ms': round(elapsed[len(elapsed) // 2] * 1000, 3)})
+            transaction.set_rollback(True)
+        self.stdout.write(json.dumps({'results': results}, ensure_ascii=False, indent=2))
@@ -0,0 +1,111 @@
+"""用 tracemalloc 经 ASGIHandler.send_response 比较 multistatus 三种响应写法的峰值内存；不读写数据库。"""
+
+import asyncio
+import json
+import tracemalloc
+import warnings
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.http import StreamingHttpResponse
+from django.test import override_settings
+
+from caldav_service.normalized import _multistatus, _resource_response
+from caldav_service.xml_utils import iter_multistatus
+from core.planner.caldav import CalendarResourceProjection
+from core.planner.ical import IcalEventResource, encoded_components
+
+
+class Command(BaseCommand):
+    help = (
+        '生成含 calendar-data 的 calendar-query 响应并经 ASGI handler 发送，'
+        '输出整树、Django 默认流式（ASGI 下整体缓冲）与分批流式三种写法的峰值内存。'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,5000,20000', help='逗号分隔的 resource 数量。')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(item) for item in options['sizes'].split(',') if item.strip()]
+        except ValueError as exc:
+            raise CommandError(f'--sizes 必须是逗号分隔的整数: {exc}') from exc
+        # 已编码 VEVENT 缓存本身随 resource 数增长，这里只测量响应路径，测量期间关闭缓存。
+        maxsize = encoded_components.maxsize
+        encoded_components.maxsize = 0
+        handler = ASGIHandler()
+        try:
+            results = [self._measure(handler, size) for size in sizes]
+        finally:
+            encoded_components.maxsize = maxsize
+            encoded_components.clear()
+        self.stdout.write(json.dumps({'results': results}, ensure_ascii=False, indent=2))
+
+    def _measure(self, handler, size: int) -> dict:
+        # resource DTO 在测量区间内构建，与视图中查询服务返回列表后再编码的顺序一致
+        def responses():
+            resources = [self._resource(index) for index in range(size)]
+            return (
+                _resource_response('bench', 'default', resource, include_data=True) for resource in resources
+            )
+
+        def buffered():
+            with override_settings(PLANNER_CALDAV_STREAMING_MIN_RESOURCES=size + 1):
+                return _multistatus(responses(), count=size)
+
+        def django_streaming():
+            return StreamingHttpResponse(iter_multistatus(responses()), content_type='application/xml; charset=utf-8')
+
+        def batched():
+            with override_settings(PLANNER_CALDAV_STREAMING_MIN_RESOURCES=1):
+                return _multistatus(responses(), count=size)
+
+        measured = {name: self._peak(handler, build) for name, build in (
+            ('buffered', buffered), ('django_streaming', django_streaming), ('batched_streaming', batched),
+        )}
+        return {
+            'resources': size,
+            'response_kib': round(measured['buffered'][0] / 1024, 1),
+            **{f'{name}_peak_kib': round(peak / 1024, 1) for name, (_sent, peak) in measured.items()},
+        }
+
+    @staticmethod
+    def _peak(handler, build) -> tuple[int, int]:
+        sent = 0
+
+        async def send(message):
+            nonlocal sent
+            sent += len(message.get('body', b''))
+
+        tracemalloc.start()
+        try:
+            with warnings.catch_warnings():
+                # Django 对 ASGI 下同步迭代器的缓冲警告正是被测行为本身
+                warnings.simplefilter('ignore')
+                asyncio.run(handler.send_response(build(), send))
+            _current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return sent, peak
+
+    @staticmethod
+    def _resource(index: int) -> CalendarResourceProjection:
+        start = datetime(2026, 3, 2, 8, tzinfo=ZoneInfo('Asia/Shanghai')) + timedelta(hours=index % 12, days=index // 12)
+        resource = IcalEventResource(
+            entity_id=f'bench-{index}',
+            ical_uid=f'bench-{index}@unischeduler',
+            resource_name=f'bench-{index}',
+            title=f'bench-{index}',
+            description='合成基准事件',
+            location='博文 402',
+            start=start,
+            end=start + timedelta(minutes=45),
+            updated_at=datetime(2026, 3, 1, tzinfo=timezone.utc),
+            version=1,
+            revision_token='e1',
+            owner_id=1,
+            rrule='FREQ=WEEKLY;COUNT=16' if index % 10 < 2 else '',
+        )
+        return CalendarResourceProjection(collection_id='default', resource=resource, etag=f'"bench-{index}-1"')
@@ -0,0 +1,67 @@
+"""在临时 checkpoint 库上比较压缩前后的文件大小与 get_state 延迟；不读写业务数据库。"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from agent_service.agent_graph import workflow
+from agent_service.checkpoint_retention import CheckpointRetentionService
+
+
+class Command(BaseCommand):
+    help = '写入若干会话、每会话若干超级步的 checkpoint，输出压缩前后的文件大小、行数与 get_state 平均毫秒数。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=20, help='会话数。')
+        parser.add_argument('--steps', type=int, default=150, help='每个会话的 update_state 次数（每次追加一问一答）。')
+        parser.add_argument('--keep', type=int, default=20, help='压缩时每会话保留的 checkpoint 数。')
+        parser.add_argument('--repeat', type=int, default=5, help='每个会话 get_state 的重复次数。')
+
+    def handle(self, *args, **options):
+        threads, steps, keep, repeat = options['threads'], options['steps'], options['keep'], options['repeat']
+        if min(threads, steps, keep, repeat) < 1:
+            raise CommandError('--threads、--steps、--keep、--repeat 必须为正整数')
+        with tempfile.TemporaryDirectory() as directory:
+            db_path = os.path.join(directory, 'checkpoints.sqlite')
+            conn = sqlite3.connect(db_path, check_same_thread=False)
+            graph = workflow.compile(checkpointer=SqliteSaver(conn))
+            configs = [{'configurable': {'thread_id': f'user_0_bench_{index}'}} for index in range(threads)]
+            for config in configs:
+                for step in range(steps):
+                    graph.update_state(config, {'messages': [
+                        HumanMessage(content=f'第 {step} 轮：帮我整理本周的日程。' * 3),
+                        AIMessage(content=f'第 {step} 轮的安排如下。' * 8),
+                    ]}, as_node='agent')
+            expected = [len(graph.get_state(config).values['messages']) for config in configs]
+
+            def measure():
+                started = time.perf_counter()
+                for _ in range(repeat):
+                    for config in configs:
+                        graph.get_state(config)
+                return (time.perf_counter() - started) * 1000 / (repeat * threads)
+
+            before_ms = measure()
+            report = CheckpointRetentionService.compact(db_path, keep_latest=keep, pinned={}, convert_auto_vacuum=True)
+            after_ms = measure()
+            if [len(graph.get_state(config).values['messages']) for config in configs] != expected:
+                raise CommandError('压缩后最新状态的消息数发生变化')
+            conn.close()
+
+        self.stdout.write(json.dumps({
+            'threads': threads,
+            'steps_per_thread': steps,
+            'keep_latest': keep,
+            'file_bytes_before': report['before']['file_bytes'],
+            'file_bytes_after': report['after']['file_bytes'],
+            'rows_before': report['before']['rows'],
+            'rows_after': report['after']['rows'],
+            'get_state_ms_before': round(before_ms, 3),
+            'get_state_ms_after': round(after_ms, 3),
+        }, ensure_ascii=False, indent=2))
@@ -0,0 +1,130 @@
+"""用 N 个并发客户端压测 MCP stateless HTTP 传输，比较串行执行与 worker 池的吞吐。"""
+
+import asyncio
+import json
+import socket
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from agent_service.mcp_executor import McpToolExecutor
+
+
+class Command(BaseCommand):
+    help = (
+        '默认在本进程启动带合成慢工具的 FastMCP HTTP 服务，分别以串行与 worker 池执行；'
+        '指定 --url/--token 时改为对运行中的 mcp_server.py 调用 search_items。'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=16, help='并发客户端数。')
+        parser.add_argument('--calls', type=int, default=4, help='每个客户端顺序发起的工具调用数。')
+        parser.add_argument('--delay', type=float, default=0.1, help='合成工具每次调用阻塞的秒数。')
+        parser.add_argument('--workers', default='0,8', help='逗号分隔的 worker 数；0 表示 thread_sensitive 串行。')
+        parser.add_argument('--per-user', type=int, default=2, help='单用户并发上限。')
+        parser.add_argument('--url', default='', help='运行中的 MCP HTTP 端点，例如 http://127.0.0.1:8100/mcp。')
+        parser.add_argument('--token', default='', help='--url 模式使用的用户 Token。')
+
+    def handle(self, *args, **options):
+        if options['clients'] < 1 or options['calls'] < 1:
+            raise CommandError('--clients 与 --calls 必须为正整数')
+        if options['url']:
+            if not options['token']:
+                raise CommandError('--url 模式需要 --token')
+            report = asyncio.run(self._drive(
+                options['url'], options['clients'], options['calls'],
+                tool='search_items', arguments={'item_type': 'all', 'limit': 20},
+                headers={'Authorization': f"Bearer {options['token']}"},
+            ))
+            self.stdout.write(json.dumps({'url': options['url'], **report}, ensure_ascii=False, indent=2))
+            return
+        try:
+            workers = [int(item) for item in options['workers'].split(',') if item.strip()]
+        except ValueError as exc:
+            raise CommandError(f'--workers 必须是逗号分隔的整数: {exc}') from exc
+        results = []
+        for count in workers:
+            executor = McpToolExecutor(max_workers=count, per_user_limit=options['per_user'])
+            with _LocalServer(executor) as url:
+                report = asyncio.run(self._drive(
+                    url, options['clients'], options['calls'],
+                    tool='probe', arguments={'delay': options['delay']},
+                ))
+            results.append({'workers': count, **report, 'executor': executor.info()})
+        self.stdout.write(json.dumps({
+            'clients': options['clients'], 'calls_per_client': options['calls'],
+            'tool_delay_seconds': options['delay'], 'results': results,
+        }, ensure_ascii=False, indent=2))
+
+    @staticmethod
+    async def _drive(url, clients, calls, *, tool, arguments, headers=None) -> dict:
+        import httpx
+
+        latencies, errors = [], 0
+        request_headers = {'Accept': 'application/json, text/event-stream', **(headers or {})}
+
+        async def client(index, session):
+            nonlocal errors
+            # 合成工具按 client 区分用户；真实服务的用户由 Token 决定。
+            call_arguments = {**arguments, 'client': f'c{index}'} if tool == 'probe' else arguments
+            for call in range(calls):
+                payload = {
+                    'jsonrpc': '2.0', 'id': f'{index}-{call}', 'method': 'tools/call',
+                    'params': {'name': tool, 'arguments': call_arguments},
+                }
+                started = time.perf_counter()
+                response = await session.post(url, json=payload, headers=request_headers)
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200 or 'error' in response.json() or response.json()['result'].get('isError'):
+                    errors += 1
+
+        started = time.perf_counter()
+        async with httpx.AsyncClient(timeout=300) as session:
+            await asyncio.gather(*(client(index, session) for index in range(clients)))
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        return {
+            'seconds': round(elapsed, 3),
+            'calls_per_second': round(len(latencies) / elapsed, 1),
+            'p50_ms': round(statistics.median(latencies) * 1000, 1),
+            'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+            'errors': errors,
+        }
+
+
+class _LocalServer:
+    """在后台线程运行只含合成慢工具的 FastMCP stateless HTTP 服务。"""
+
+    def __init__(self, executor: McpToolExecutor):
+        self.executor = executor
+
+    def __enter__(self) -> str:
+        import uvicorn
+        from mcp.server.fastmcp import FastMCP
+
+        mcp = FastMCP('benchmark', stateless_http=True, json_response=True)
+        executor = self.executor
+
+        @mcp.tool()
+        async def probe(delay: float, client: str = '') -> str:
+            """阻塞 delay 秒的同步调用，模拟慢 search_items。"""
+            await executor.run(client, time.sleep, delay)
+            return 'ok'
+
+        with socket.socket() as probe_socket:
+            probe_socket.bind(('127.0.0.1', 0))
+            port = probe_socket.getsockname()[1]
+        self.server = uvicorn.Server(uvicorn.Config(
+            mcp.streamable_http_app(), host='127.0.0.1', port=port, log_level='warning',
+        ))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return f'http://127.0.0.1:{port}/mcp'
+
+    def __exit__(self, *exc_info) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
@@ -0,0 +1,60 @@
+"""用合成 occurrence 测量冲突扫描的伸缩性；不读写数据库。"""
+
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.planner.conflicts import PlannerConflictSweep
+from core.planner.recurrence import Occurrence, OccurrenceRef
+
+
+class Command(BaseCommand):
+    help = '按课表+会议形态生成 occurrence，输出各规模下冲突扫描的耗时与冲突数。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,50000', help='逗号分隔的 occurrence 数量。')
+        parser.add_argument('--limit', type=int, default=200, help='模拟接口分页的冲突对数量。')
+        parser.add_argument('--repeat', type=int, default=3, help='每个规模重复次数，取最小耗时。')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(item) for item in options['sizes'].split(',') if item.strip()]
+        except ValueError as exc:
+            raise CommandError(f'--sizes 必须是逗号分隔的整数: {exc}') from exc
+        results = []
+        for size in sizes:
+            occurrences = self._occurrences(size)
+            elapsed = []
+            for _ in range(max(options['repeat'], 1)):
+                started = time.perf_counter()
+                report = PlannerConflictSweep.run(occurrences, limit=options['limit'])
+                elapsed.append(time.perf_counter() - started)
+            results.append({
+                'occurrences': size,
+                'seconds': round(min(elapsed), 4),
+                'conflict_pairs': report['count'],
+                'clusters': len(report['clusters']),
+            })
+        self.stdout.write(json.dumps({'limit': options['limit'], 'results': results}, ensure_ascii=False, indent=2))
+
+    @staticmethod
+    def _occurrences(size: int) -> list[Occurrence]:
+        """每天 8 节 45 分钟课程加 2 场跨两节的会议，冲突密度与真实课表相近。"""
+        base = datetime(2026, 3, 2, 0, 30, tzinfo=timezone.utc)
+        items = []
+        for index in range(size):
+            day, slot = divmod(index, 10)
+            if slot < 8:
+                start = base + timedelta(days=day, minutes=55 * slot)
+                end = start + timedelta(minutes=45)
+            else:
+                start = base + timedelta(days=day, minutes=55 * (slot - 8) * 3 + 20)
+                end = start + timedelta(minutes=90)
+            ref = OccurrenceRef(
+                entity_type='event', entity_id=f'bench-{index}', series_id='',
+                recurrence_id='', occurrence_start=start, source_version=1,
+            )
+            items.append(Occurrence(ref=ref, start=start, end=end, payload={'title': f'bench-{index}'}, is_override=False))
+        return items
@@ -0,0 +1,81 @@
+"""用合成 resource 测量 Feed 编码中 VEVENT 字节缓存的效果；不读写数据库。"""
+
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.planner.ical import IcalEventResource, encode_feed_calendar, encoded_components
+
+
+class Command(BaseCommand):
+    help = '生成单次与周期事件混合的 Feed，输出冷编码、缓存命中编码的耗时与命中率。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,5000', help='逗号分隔的事件数量。')
+        parser.add_argument('--changed', type=float, default=0.01, help='两次编码之间修改过 revision 的事件比例。')
+        parser.add_argument('--repeat', type=int, default=3, help='每个规模重复次数，取最小耗时。')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(item) for item in options['sizes'].split(',') if item.strip()]
+        except ValueError as exc:
+            raise CommandError(f'--sizes 必须是逗号分隔的整数: {exc}') from exc
+        results = []
+        for size in sizes:
+            resources = self._resources(size)
+            changed = int(size * options['changed'])
+            edited = [
+                self._resource(index, revision=2) if index < changed else resource
+                for index, resource in enumerate(resources)
+            ]
+            cold, warm, partial = [], [], []
+            for _ in range(max(options['repeat'], 1)):
+                encoded_components.clear()
+                cold.append(self._timed(resources))
+                warm.append(self._timed(resources))
+                partial.append(self._timed(edited))
+            info = encoded_components.info()
+            results.append({
+                'events': size,
+                'changed_events': changed,
+                'cold_seconds': round(min(cold), 4),
+                'warm_seconds': round(min(warm), 4),
+                'partially_changed_seconds': round(min(partial), 4),
+                'hit_rate': info['hit_rate'],
+                'cache_size': info['size'],
+            })
+        self.stdout.write(json.dumps({'results': results}, ensure_ascii=False, indent=2))
+
+    @staticmethod
+    def _timed(resources: list[IcalEventResource]) -> float:
+        started = time.perf_counter()
+        encode_feed_calendar(name='UniScheduler - benchmark', events=resources)
+        return time.perf_counter() - started
+
+    @classmethod
+    def _resources(cls, size: int) -> list[IcalEventResource]:
+        return [cls._resource(index, revision=1) for index in range(size)]
+
+    @staticmethod
+    def _resource(index: int, *, revision: int) -> IcalEventResource:
+        """每 10 个事件中 2 个为每周课程，其余为单次事件，与常见课表 Feed 接近。"""
+        start = datetime(2026, 3, 2, 8, tzinfo=ZoneInfo('Asia/Shanghai')) + timedelta(hours=index % 12, days=index // 12)
+        recurring = index % 10 < 2
+        return IcalEventResource(
+            entity_id=f'bench-{index}',
+            ical_uid=f'bench-{index}@unischeduler',
+            resource_name=f'bench-{index}',
+            title=f'[课程] bench-{index}',
+            description='合成基准事件',
+            location='博文 402',
+            start=start,
+            end=start + timedelta(minutes=45),
+            updated_at=datetime(2026, 3, 1, tzinfo=timezone.utc) + timedelta(seconds=revision),
+            version=revision,
+            revision_token=f'e{revision}',
+            owner_id=1,
+            rrule='FREQ=WEEKLY;COUNT=16' if recurring else '',
+        )
@@ -0,0 +1,82 @@
+"""对比 rollback snapshot 新建行识别：全账号主键扫描 vs 主键水位；结束后回滚。"""
+
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import CalendarEvent
+from core.planner.snapshots import _created_keys, _high_water_marks, _user_querysets
+
+
+def _account_keys(user) -> set[str]:
+    """旧实现：枚举账号在全部 Planner 模型中的主键。"""
+    result = set()
+    for label, queryset in _user_querysets(user).items():
+        result.update(f'{label}:{pk}' for pk in queryset.values_list('pk', flat=True))
+    return result
+
+
+class Command(BaseCommand):
+    help = '在回滚事务中为临时用户批量生成 event，输出各规模下一次写入的新建行识别耗时。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,50000', help='逗号分隔的每用户行数。')
+        parser.add_argument('--repeat', type=int, default=5, help='每个规模重复次数，取中位数。')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted(int(item) for item in options['sizes'].split(',') if item.strip())
+        except ValueError as exc:
+            raise CommandError(f'--sizes 必须是逗号分隔的整数: {exc}') from exc
+        results = []
+        with transaction.atomic():
+            user = User.objects.create_user(username=f'snapshot-keys-bench-{uuid4().hex[:8]}')
+            base = datetime(2026, 3, 2, 1, tzinfo=timezone.utc)
+            counter = 0
+
+            def make_events(count: int) -> None:
+                nonlocal counter
+                CalendarEvent.objects.bulk_create([
+                    CalendarEvent(
+                        user=user, event_id=f'bench-{index}', title=f'bench-{index}',
+                        ical_uid=f'evt-bench-{index}@unischeduler', caldav_resource_name=f'bench-{index}',
+                        start_at=base + timedelta(hours=index), end_at=base + timedelta(hours=index, minutes=30),
+                    )
+                    for index in range(counter, counter + count)
+                ], batch_size=1000)
+                counter += count
+
+            for size in sizes:
+                make_events(size - CalendarEvent.objects.filter(user=user).count())
+                timings = {'full_scan': [], 'high_water_mark': []}
+                for _ in range(max(options['repeat'], 1)):
+                    # 只计识别本身的耗时，模拟写入不计入。
+                    started = time.perf_counter()
+                    before = _account_keys(user)
+                    elapsed = time.perf_counter() - started
+                    make_events(1)
+                    started = time.perf_counter()
+                    created_full = _account_keys(user) - before
+                    timings['full_scan'].append(elapsed + time.perf_counter() - started)
+
+                    started = time.perf_counter()
+                    marks = _high_water_marks()
+                    elapsed = time.perf_counter() - started
+                    make_events(1)
+                    started = time.perf_counter()
+                    created_marks = _created_keys(user, marks)
+                    timings['high_water_mark'].append(elapsed + time.perf_counter() - started)
+                    if len(created_full) != 1 or len(created_marks) != 1:
+                        raise CommandError('两种实现识别出的新建行数量不一致')
+                row = {'rows': size}
+                for name, values in timings.items():
+                    values.sort()
+                    row[f'{name}_median_ms'] = round(values[len(values) // 2] * 1000, 3)
+                results.append(row)
+            transaction.set_rollback(True)
+        self.stdout.write(json.dumps({'results': results}, ensure_ascii=False, indent=2))
@@ -0,0 +1,50 @@
+"""比较 split/truncate 槽位计数的旧写法（between 物化列表）与闭式计算的耗时；不读写数据库。"""
+
+import json
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from dateutil.rrule import rrulestr
+from django.core.management.base import BaseCommand, CommandError
+
+from core.planner.recurrence.slots import RecurrenceSlotCounter
+
+
+RULES = ('FREQ=MINUTELY;INTERVAL=15', 'FREQ=HOURLY', 'FREQ=DAILY', 'FREQ=WEEKLY;BYDAY=MO,WE,FR')
+
+
+class Command(BaseCommand):
+    help = '对若干简单 RRULE，在距 DTSTART 不同年数的锚点上计数此前槽位，输出旧写法与闭式计算的毫秒数。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--years', default='1,5', help='逗号分隔的锚点距 DTSTART 年数。')
+
+    def handle(self, *args, **options):
+        try:
+            years = [int(item) for item in options['years'].split(',') if item.strip()]
+        except ValueError as exc:
+            raise CommandError(f'--years 必须是逗号分隔的整数: {exc}') from exc
+        dtstart = datetime(2026, 3, 2, 9, tzinfo=ZoneInfo('Asia/Shanghai'))
+        results = []
+        for rule in RULES:
+            for span in years:
+                anchor = dtstart.replace(year=dtstart.year + span)
+                started = time.perf_counter()
+                expected = len([
+                    item for item in rrulestr(rule, dtstart=dtstart).between(dtstart, anchor, inc=True) if item < anchor
+                ])
+                listed = time.perf_counter() - started
+                started = time.perf_counter()
+                counted = RecurrenceSlotCounter.count_before(rule, dtstart=dtstart, anchor=anchor)
+                closed_form = time.perf_counter() - started
+                if counted != expected:
+                    raise CommandError(f'{rule} 计数不一致: {counted} != {expected}')
+                results.append({
+                    'rule': rule,
+                    'years': span,
+                    'slots': counted,
+                    'between_list_ms': round(listed * 1000, 3),
+                    'closed_form_ms': round(closed_form * 1000, 3),
+                })
+        self.stdout.write(json.dumps({'results': results}, ensure_ascii=False, indent=2))
@@ -0,0 +1,61 @@
+"""比较每轮重新压缩全部历史工具输出与跨轮复用压缩结果的耗时；不读写数据库。"""
+
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from langchain_core.messages import ToolMessage
+
+from agent_service.context_optimizer import TokenCalculator, ToolMessageCompressor
+
+
+class Command(BaseCommand):
+    help = '模拟一个会话逐轮新增工具输出，输出每轮压缩全部旧工具消息（无缓存/共享缓存）的总毫秒数。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--turns', type=int, default=200, help='轮数，每轮新增一条工具输出。')
+        parser.add_argument('--items', type=int, default=40, help='每条工具输出中的列表项数。')
+        parser.add_argument('--method', default='estimate', choices=['estimate', 'tiktoken'], help='token 计算方式。')
+
+    def handle(self, *args, **options):
+        turns, items = options['turns'], options['items']
+        if turns < 1 or items < 1:
+            raise CommandError('--turns、--items 必须为正整数')
+        calculator = TokenCalculator(method=options['method'])
+        messages = [
+            ToolMessage(
+                content=json.dumps({'events': [
+                    {'id': f'{turn}-{index}', 'title': f'第 {turn} 轮会议 {index}', 'description': '会议议程与备注。' * 10}
+                    for index in range(items)
+                ]}, ensure_ascii=False),
+                tool_call_id=f'call-{turn}', name='get_events',
+            )
+            for turn in range(turns)
+        ]
+
+        def run(shared: bool) -> float:
+            ToolMessageCompressor.compressed_outputs.clear()
+            started = time.perf_counter()
+            for turn in range(1, turns + 1):
+                if not shared:
+                    ToolMessageCompressor.compressed_outputs.clear()
+                compressor = ToolMessageCompressor(max_tokens=200)
+                outputs = [compressor.compress(message, calculator).content for message in messages[:turn]]
+            elapsed = time.perf_counter() - started
+            run.outputs = outputs
+            return elapsed
+
+        uncached = run(shared=False)
+        uncached_outputs = run.outputs
+        cached = run(shared=True)
+        if run.outputs != uncached_outputs:
+            raise CommandError('复用的压缩结果与重新压缩不一致')
+        info = ToolMessageCompressor.compressed_outputs.info()
+        ToolMessageCompressor.compressed_outputs.clear()
+        self.stdout.write(json.dumps({
+            'turns': turns,
+            'compress_calls': turns * (turns + 1) // 2,
+            'recompress_every_turn_ms': round(uncached * 1000, 3),
+            'shared_cache_ms': round(cached * 1000, 3),
+            'cache': info,
+        }, ensure_ascii=False, indent=2))
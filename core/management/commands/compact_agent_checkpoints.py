@@ -0,0 +1,38 @@
+"""按保留策略压缩 LangGraph checkpoint 库（agent_checkpoints.sqlite）。"""
+
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from agent_service.checkpoint_retention import CheckpointRetentionService
+
+
+class Command(BaseCommand):
+    help = '每个会话保留最新 N 条 checkpoint 与有效回滚窗口所需的 checkpoint，删除其余记录并回收空闲页；可定时执行。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep', type=int, default=20, help='每个会话保留的最新 checkpoint 数，默认 20。')
+        parser.add_argument('--vacuum-pages', type=int, default=0, help='incremental_vacuum 归还的页数，0 表示全部。')
+        parser.add_argument('--db-path', help='checkpoint 库路径，缺省为 agent_graph.CHECKPOINT_DB_PATH。')
+        parser.add_argument('--dry-run', action='store_true', help='只统计将被删除的记录，不写库。')
+        parser.add_argument(
+            '--convert-auto-vacuum', action='store_true',
+            help='旧库一次性切换为 auto_vacuum=INCREMENTAL（完整 VACUUM，会长时间锁库，仅在停服维护时使用）。',
+        )
+
+    def handle(self, *args, **options):
+        if options['keep'] < 1:
+            raise CommandError('--keep 必须为正整数')
+        db_path = options.get('db_path')
+        if not db_path:
+            from agent_service.agent_graph import CHECKPOINT_DB_PATH
+            db_path = CHECKPOINT_DB_PATH
+        if not os.path.exists(db_path):
+            raise CommandError(f'checkpoint 库不存在: {db_path}')
+        report = CheckpointRetentionService.compact(
+            db_path, keep_latest=options['keep'], vacuum_pages=options['vacuum_pages'], dry_run=options['dry_run'],
+            convert_auto_vacuum=options['convert_auto_vacuum'],
+        )
+        report['db_path'] = db_path
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
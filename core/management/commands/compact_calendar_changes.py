@@ -0,0 +1,32 @@
+"""压缩 CalDAV CalendarChange 变更日志，并推进 collection 的 pruned_through。"""
+
+import json
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.planner.calendar_changes import CalendarCollectionChangeWriter
+
+
+class Command(BaseCommand):
+    help = '删除早于保留期的 CalendarChange；持有更早 sync-token 的客户端将被要求全量重同步。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90, help='保留最近 N 天的变更日志，默认 90。')
+        parser.add_argument('--user-id', type=int, help='只处理指定用户。')
+        parser.add_argument('--dry-run', action='store_true', help='只统计将被删除的记录，不写库。')
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError('--days 必须为正整数')
+        user = None
+        if options.get('user_id') is not None:
+            user = User.objects.filter(pk=options['user_id']).first()
+            if user is None:
+                raise CommandError(f"用户不存在: {options['user_id']}")
+        before = timezone.now() - timedelta(days=options['days'])
+        report = CalendarCollectionChangeWriter.compact(before, user=user, dry_run=options['dry_run'])
+        report.update({'before': before.isoformat(), 'dry_run': options['dry_run']})
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
@@ -0,0 +1,31 @@
+"""从 normalized 表重建可选的 Planner occurrence 索引。"""
+
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core.planner.occurrence_index import PlannerOccurrenceIndex
+
+
+class Command(BaseCommand):
+    help = (
+        '重建 Planner occurrence 索引；未指定 --user-id 时处理全部用户。'
+        '写请求只做增量刷新，--stale 供定时任务重建待建、stale 或窗口不足的索引。'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user-id', type=int, help='只重建指定用户。')
+        parser.add_argument('--stale', action='store_true', help='只重建待建、stale 或窗口不足的用户。')
+
+    def handle(self, *args, **options):
+        users = PlannerOccurrenceIndex.pending_users() if options['stale'] else User.objects.all()
+        users = users.order_by('id')
+        if options.get('user_id') is not None:
+            users = users.filter(id=options['user_id'])
+            if not users.exists():
+                raise CommandError(f'用户不存在: {options["user_id"]}')
+        reports = [PlannerOccurrenceIndex.rebuild(user) for user in users.iterator(chunk_size=50)]
+        self.stdout.write(json.dumps(
+            {'user_count': len(reports), 'users': reports}, ensure_ascii=False, indent=2, sort_keys=True
+        ))
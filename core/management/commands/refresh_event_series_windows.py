@@ -0,0 +1,49 @@
+"""回填或重算 event/reminder recurrence series 的反规范化 occurrence 窗口。"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import EventRecurrenceSeries, ReminderRecurrenceSeries
+from core.planner.commands import PlannerCommandService
+from core.planner.entities import PlannerEntityCommandService
+
+
+class Command(BaseCommand):
+    help = '回填 recurrence series 的 occurrence 窗口；默认只处理尚未计算的 series。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user-id', type=int, help='只处理指定用户。')
+        parser.add_argument('--all', action='store_true', help='重算全部 active series，而不只是窗口为空的 series。')
+        parser.add_argument('--strict', action='store_true', help='存在无法计算的 series 时以非零状态退出。')
+
+    def handle(self, *args, **options):
+        targets = (
+            ('event', EventRecurrenceSeries.objects.filter(
+                deleted_at__isnull=True, master_event__deleted_at__isnull=True
+            ).select_related('master_event'), PlannerCommandService.refresh_series_window),
+            ('reminder', ReminderRecurrenceSeries.objects.filter(
+                deleted_at__isnull=True, master_reminder__deleted_at__isnull=True
+            ).select_related('master_reminder'), PlannerEntityCommandService.refresh_reminder_series_window),
+        )
+        refreshed = {}
+        issues = []
+        for kind, queryset, refresh in targets:
+            queryset = queryset.order_by('id')
+            if options.get('user_id') is not None:
+                queryset = queryset.filter(user_id=options['user_id'])
+            if not options['all']:
+                queryset = queryset.filter(occurrence_window_start__isnull=True)
+            refreshed[kind] = 0
+            for series in queryset.iterator(chunk_size=200):
+                try:
+                    refresh(series)
+                except ValueError as exc:
+                    issues.append({'kind': kind, 'series_id': series.series_id, 'user_id': series.user_id, 'error': str(exc)})
+                    continue
+                refreshed[kind] += 1
+        self.stdout.write(json.dumps(
+            {'refreshed': refreshed, 'issues': issues, 'ok': not issues}, ensure_ascii=False, indent=2
+        ))
+        if options['strict'] and issues:
+            raise CommandError(f'series 窗口回填失败: {len(issues)} issue(s)')
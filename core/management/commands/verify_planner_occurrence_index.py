@@ -0,0 +1,47 @@
+"""只读比较 Planner occurrence 索引与 normalized 实时展开结果。"""
+
+import json
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import PlannerOccurrenceIndexState
+from core.planner.occurrence_index import PlannerOccurrenceIndex
+
+
+class Command(BaseCommand):
+    help = '只读校验已就绪的 occurrence 索引；窗口取各用户索引的 horizon。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user-id', type=int, help='只校验指定用户。')
+        parser.add_argument('--strict', action='store_true', help='存在差异时以非零状态退出。')
+        parser.add_argument('--output', help='可选 JSON 输出路径。')
+
+    def handle(self, *args, **options):
+        states = PlannerOccurrenceIndexState.objects.filter(
+            status=PlannerOccurrenceIndexState.STATUS_READY
+        ).select_related('user').order_by('user_id')
+        if options.get('user_id') is not None:
+            if not User.objects.filter(id=options['user_id']).exists():
+                raise CommandError(f'用户不存在: {options["user_id"]}')
+            states = states.filter(user_id=options['user_id'])
+        reports = [
+            PlannerOccurrenceIndex.verify(state.user, range_start=state.horizon_start, range_end=state.horizon_end)
+            for state in states.iterator(chunk_size=50)
+        ]
+        result = {
+            'user_count': len(reports),
+            'difference_count': sum(item['difference_count'] for item in reports),
+            'users': reports,
+        }
+        serialized = json.dumps(result, ensure_ascii=False, indent=2, sort_keys=True)
+        if options.get('output'):
+            path = Path(options['output'])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(serialized + '\n', encoding='utf-8')
+            self.stdout.write(self.style.SUCCESS(f'occurrence 索引校验报告已写入: {path}'))
+        else:
+            self.stdout.write(serialized)
+        if options['strict'] and result['difference_count']:
+            raise CommandError(f"发现 {result['difference_count']} 个 occurrence 索引差异")
@@ -0,0 +1,14 @@
+from core.planner.rollout import PlannerRolloutPolicy
+
+
+class PlannerAccessScopeMiddleware:
+    """
+    中间件：为每个 HTTP 请求开启 Planner 准入判定的记忆作用域
+    同一请求内的多次 require_access 只查询一次 cohort/迁移状态，请求结束即丢弃
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with PlannerRolloutPolicy.request_scope():
+            return self.get_response(request)
@@ -0,0 +1,47 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('core', '0014_planner_series_occurrence_window'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlannerOccurrenceIndexState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('ready', '可用'), ('stale', '待重建')], default='stale', max_length=16)),
+                ('horizon_start', models.DateTimeField()),
+                ('horizon_end', models.DateTimeField()),
+                ('change_set_watermark', models.PositiveBigIntegerField(default=0)),
+                ('collection_version_sum', models.PositiveBigIntegerField(default=0)),
+                ('built_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='planner_occurrence_index_state', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PlannerOccurrenceIndexEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity_type', models.CharField(max_length=16)),
+                ('entity_id', models.CharField(max_length=100)),
+                ('series_id', models.CharField(blank=True, max_length=100)),
+                ('recurrence_id', models.CharField(blank=True, max_length=64)),
+                ('start_at', models.DateTimeField()),
+                ('end_at', models.DateTimeField()),
+                ('source_version', models.PositiveBigIntegerField(default=1)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='planner_occurrence_index_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [
+                    models.Index(fields=['user', 'entity_type', 'start_at', 'end_at'], name='planner_occ_index_range_idx'),
+                    models.Index(fields=['user', 'entity_type', 'entity_id'], name='planner_occ_index_entity_idx'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [('core', '0015_planner_occurrence_index')]
+
+    operations = [
+        migrations.AddField(
+            model_name='reminderrecurrenceseries',
+            name='occurrence_window_end',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='reminderrecurrenceseries',
+            name='occurrence_window_start',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='reminderrecurrenceseries',
+            index=models.Index(
+                fields=['user', 'occurrence_window_start', 'occurrence_window_end'],
+                name='planner_rem_series_win_idx',
+            ),
+        ),
+    ]
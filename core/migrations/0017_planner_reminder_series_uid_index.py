@@ -0,0 +1,12 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [('core', '0016_planner_reminder_series_occurrence_window')]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reminderrecurrenceseries',
+            index=models.Index(fields=['user', 'ical_uid'], name='planner_rem_series_uid_idx'),
+        ),
+    ]
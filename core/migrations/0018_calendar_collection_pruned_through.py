@@ -0,0 +1,13 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [('core', '0017_planner_reminder_series_uid_index')]
+
+    operations = [
+        migrations.AddField(
+            model_name='calendarcollectionversion',
+            name='pruned_through',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
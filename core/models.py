@@ -2098,6 +2098,9 @@ class EventRecurrenceSeries(PlannerVersionedModel):
     )
     split_recurrence_id = models.CharField(max_length=64, blank=True)
     ical_metadata = models.JSONField(default=dict, blank=True)
+    # 反规范化的 occurrence UTC 窗口，仅用于查询裁剪；start 为空表示尚未计算，end 为空表示无终止规则。
+    occurrence_window_start = models.DateTimeField(null=True, blank=True)
+    occurrence_window_end = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         constraints = [
@@ -2114,7 +2117,13 @@ class EventRecurrenceSeries(PlannerVersionedModel):
                 name='planner_event_series_dtstart_shape',
             ),
         ]
-        indexes = [models.Index(fields=['user', 'deleted_at'], name='planner_event_series_user_idx')]
+        indexes = [
+            models.Index(fields=['user', 'deleted_at'], name='planner_event_series_user_idx'),
+            models.Index(
+                fields=['user', 'occurrence_window_start', 'occurrence_window_end'],
+                name='planner_event_series_win_idx',
+            ),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.ical_uid:
@@ -2217,8 +2226,18 @@ class ReminderRecurrenceSeries(PlannerVersionedModel):
     )
     split_recurrence_id = models.CharField(max_length=64, blank=True)
     ical_metadata = models.JSONField(default=dict, blank=True)
+    # 与 EventRecurrenceSeries 相同的查询裁剪窗口；start 为空表示尚未计算，end 为空表示无终止规则。
+    occurrence_window_start = models.DateTimeField(null=True, blank=True)
+    occurrence_window_end = models.DateTimeField(null=True, blank=True)
 
     class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'occurrence_window_start', 'occurrence_window_end'],
+                name='planner_rem_series_win_idx',
+            ),
+            models.Index(fields=['user', 'ical_uid'], name='planner_rem_series_uid_idx'),
+        ]
         constraints = [
             models.UniqueConstraint(fields=['user', 'series_id'], name='planner_reminder_series_public_uniq'),
             models.CheckConstraint(
@@ -2436,6 +2455,8 @@ class CalendarCollectionVersion(models.Model):
     collection_id = models.CharField(max_length=100)
     version = models.PositiveBigIntegerField(default=0)
     sync_token = models.CharField(max_length=255, default=_planner_public_id)
+    # 不晚于该版本的 CalendarChange 已被压缩或无法完整描述（如回滚），早于它的 sync-token 必须全量重同步。
+    pruned_through = models.PositiveBigIntegerField(default=0)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
@@ -2519,3 +2540,39 @@ class PlannerRollbackSnapshot(models.Model):
         indexes = [
             models.Index(fields=['rollback_window', 'created_at'], name='planner_snapshot_window_idx')
         ]
+
+
+class PlannerOccurrenceIndexState(models.Model):
+    """每个用户 occurrence 索引的滚动窗口与增量水位。"""
+
+    STATUS_READY = 'ready'
+    STATUS_STALE = 'stale'
+    STATUS_CHOICES = [(STATUS_READY, '可用'), (STATUS_STALE, '待重建')]
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='planner_occurrence_index_state')
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_STALE)
+    horizon_start = models.DateTimeField()
+    horizon_end = models.DateTimeField()
+    change_set_watermark = models.PositiveBigIntegerField(default=0)
+    collection_version_sum = models.PositiveBigIntegerField(default=0)
+    built_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class PlannerOccurrenceIndexEntry(models.Model):
+    """只读派生的 occurrence 行；可随时从 normalized 表重建，不是事实源。"""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='planner_occurrence_index_entries')
+    entity_type = models.CharField(max_length=16)
+    entity_id = models.CharField(max_length=100)
+    series_id = models.CharField(max_length=100, blank=True)
+    recurrence_id = models.CharField(max_length=64, blank=True)
+    start_at = models.DateTimeField()
+    end_at = models.DateTimeField()
+    source_version = models.PositiveBigIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'entity_type', 'start_at', 'end_at'], name='planner_occ_index_range_idx'),
+            models.Index(fields=['user', 'entity_type', 'entity_id'], name='planner_occ_index_entity_idx'),
+        ]
@@ -5,14 +5,17 @@
 
 from __future__ import annotations
 
-from datetime import date, datetime, time, timedelta
+from datetime import date, datetime, timedelta
 from typing import Any, Mapping
 
+from django.conf import settings
+
 from core.models import (
     CalendarEvent, CollaborativeCalendarGroup, EventRecurrenceSeries, EventShareGroup,
     GroupMembership, Reminder, ReminderRecurrenceSeries, Todo,
 )
 from core.planner.commands import PlannerCommandService
+from core.planner.conflicts import PlannerConflictSweep
 from core.planner.context import PlannerExecutionContext
 from core.planner.entities import (
     PlannerEntityCommandService,
@@ -21,6 +24,8 @@ from core.planner.entities import (
     serialize_reminder,
     serialize_todo,
 )
+from core.planner.feed_cache import CalendarFeedCache, CalendarFeedPayload
+from core.planner.occurrence_index import PlannerOccurrenceIndex
 from core.planner.presentation import serialize_event_definition, serialize_occurrence
 from core.planner.recurrence.codec import PlannerTimeCodec
 from core.planner.repository import PlannerRepository
@@ -46,6 +51,8 @@ class PlannerApplicationAccessError(PermissionError):
 class PlannerApplicationService:
     """面向 Web/Agent/Quick Action/MCP/附件的统一 Planner 用例门面。"""
 
+    feed_cache = CalendarFeedCache(max_bytes=int(getattr(settings, 'PLANNER_FEED_CACHE_MAX_BYTES', 32 * 1024 * 1024)))
+
     @staticmethod
     def require_access(context: PlannerExecutionContext, *, write: bool = False) -> PlannerStorageDecision:
         decision = (
@@ -63,7 +70,7 @@ class PlannerApplicationService:
         context: PlannerExecutionContext, *, command_type: str, resource_type: str,
         resource_id: str | None, operation, result_resource_id,
     ):
-        return PlannerSnapshotRecorder.execute(
+        result = PlannerSnapshotRecorder.execute(
             context,
             command_type=command_type,
             resource_type=resource_type,
@@ -71,6 +78,8 @@ class PlannerApplicationService:
             operation=operation,
             result_resource_id=result_resource_id,
         )
+        PlannerOccurrenceIndex.sync(context.user)
+        return result
 
     @classmethod
     def list_event_definitions(cls, context: PlannerExecutionContext, *, range_start: datetime, range_end: datetime) -> dict[str, Any]:
@@ -85,9 +94,7 @@ class PlannerApplicationService:
     @classmethod
     def build_calendar_feed(cls, context: PlannerExecutionContext, *, feed_type: str) -> bytes:
         cls.require_access(context)
-        if feed_type not in {'all', 'events', 'todos', 'reminders'}:
-            from core.planner.commands import PlannerCommandError
-            raise PlannerCommandError('不支持的 calendar feed type', code='invalid_feed_type')
+        cls._require_feed_type(feed_type)
         from core.planner.calendar_projection import NormalizedCalendarProjectionService
         from core.planner.ical import encode_feed_calendar
         include = lambda value: feed_type in {'all', value}
@@ -98,6 +105,34 @@ class PlannerApplicationService:
             reminders=NormalizedCalendarProjectionService.reminder_resources(context.user, feed_titles=True) if include('reminders') else (),
         )
 
+    @classmethod
+    def calendar_feed_etag(cls, context: PlannerExecutionContext, *, feed_type: str) -> str:
+        """订阅轮询的条件请求只需这一步：一次按用户索引的版本查询。"""
+        cls.require_access(context)
+        cls._require_feed_type(feed_type)
+        return CalendarFeedCache.version_etag(context.user, feed_type)
+
+    @classmethod
+    def get_calendar_feed(
+        cls, context: PlannerExecutionContext, *, feed_type: str, etag: str | None = None,
+    ) -> CalendarFeedPayload:
+        """按版本 ETag 复用已编码（含 gzip 预压缩）的 Feed，版本变化时才重新投影与编码。"""
+        etag = etag or cls.calendar_feed_etag(context, feed_type=feed_type)
+        key = (context.user.pk, feed_type)
+        cached = cls.feed_cache.get(key, etag)
+        if cached is not None:
+            return cached
+        # 先取 ETag 再构建：并发写入只会让 body 比 ETag 新，下次轮询版本变化即重新构建。
+        payload = CalendarFeedCache.compress(etag, cls.build_calendar_feed(context, feed_type=feed_type))
+        cls.feed_cache.put(key, payload)
+        return payload
+
+    @staticmethod
+    def _require_feed_type(feed_type: str) -> None:
+        if feed_type not in {'all', 'events', 'todos', 'reminders'}:
+            from core.planner.commands import PlannerCommandError
+            raise PlannerCommandError('不支持的 calendar feed type', code='invalid_feed_type')
+
     @classmethod
     def list_calendar_collections(cls, context: PlannerExecutionContext):
         cls.require_access(context)
@@ -127,6 +162,18 @@ class PlannerApplicationService:
         from core.planner.caldav import PlannerCalDAVQueryService
         return PlannerCalDAVQueryService.collection_ctag(context.user, collection_id)
 
+    @classmethod
+    def get_calendar_sync_token(cls, context: PlannerExecutionContext, *, collection_id: str) -> str:
+        cls.require_access(context)
+        from core.planner.caldav import PlannerCalDAVQueryService
+        return PlannerCalDAVQueryService.sync_token(context.user, collection_id)
+
+    @classmethod
+    def list_calendar_changes(cls, context: PlannerExecutionContext, *, collection_id: str, sync_token: str):
+        cls.require_access(context)
+        from core.planner.caldav import PlannerCalDAVQueryService
+        return PlannerCalDAVQueryService.changes_since(context.user, collection_id, sync_token)
+
     @classmethod
     def apply_caldav_event_resource(
         cls, context: PlannerExecutionContext, *, collection_id: str, resource_name: str,
@@ -164,7 +211,10 @@ class PlannerApplicationService:
     @classmethod
     def list_event_occurrences(cls, context: PlannerExecutionContext, *, range_start: datetime, range_end: datetime) -> dict[str, Any]:
         cls.require_access(context)
-        items = PlannerRepository.list_event_occurrences(context.user, range_start=range_start, range_end=range_end)
+        items = PlannerRepository.list_event_occurrences(
+            context.user, range_start=range_start, range_end=range_end,
+            event_ids=PlannerOccurrenceIndex.candidate_ids(context.user, 'event', range_start=range_start, range_end=range_end),
+        )
         share_ids_by_event: dict[str, list[str]] = {}
         for event_id, share_group_id in EventShareGroup.objects.filter(
             event__user=context.user,
@@ -184,30 +234,19 @@ class PlannerApplicationService:
         }
 
     @classmethod
-    def list_conflicts(cls, context: PlannerExecutionContext, *, range_start: datetime, range_end: datetime) -> dict[str, Any]:
+    def list_conflicts(
+        cls, context: PlannerExecutionContext, *, range_start: datetime, range_end: datetime,
+        cursor: int = 0, limit: int | None = None,
+    ) -> dict[str, Any]:
         cls.require_access(context)
-        occurrences = PlannerRepository.list_event_occurrences(context.user, range_start=range_start, range_end=range_end)
-        normalized = []
-        for occurrence in occurrences:
-            start_value, end_value = occurrence.start, occurrence.end
-            if isinstance(start_value, date) and not isinstance(start_value, datetime):
-                start_value = datetime.combine(start_value, time.min, tzinfo=PlannerTimeCodec.get_timezone())
-                end_value = datetime.combine(end_value, time.min, tzinfo=PlannerTimeCodec.get_timezone())
-            normalized.append((PlannerTimeCodec.to_utc(start_value), PlannerTimeCodec.to_utc(end_value), occurrence))
-        normalized.sort(key=lambda item: (item[0], item[1], item[2].ref.entity_id))
-        active, conflicts = [], []
-        for start_value, end_value, occurrence in normalized:
-            active = [item for item in active if item[1] > start_value]
-            for other_start, other_end, other in active:
-                conflicts.append({
-                    "overlap": {
-                        "start": max(start_value, other_start).isoformat(),
-                        "end": min(end_value, other_end).isoformat(),
-                    },
-                    "items": [serialize_occurrence(other), serialize_occurrence(occurrence)],
-                })
-            active.append((start_value, end_value, occurrence))
-        return {"conflicts": conflicts, "count": len(conflicts)}
+        if cursor < 0 or (limit is not None and not 1 <= limit <= 1000):
+            from core.planner.commands import PlannerCommandError
+            raise PlannerCommandError("cursor 不能为负数，limit 必须在 1 到 1000", code="invalid_pagination")
+        occurrences = PlannerRepository.list_event_occurrences(
+            context.user, range_start=range_start, range_end=range_end,
+            event_ids=PlannerOccurrenceIndex.candidate_ids(context.user, 'event', range_start=range_start, range_end=range_end),
+        )
+        return PlannerConflictSweep.run(occurrences, cursor=cursor, limit=limit)
 
     @classmethod
     def create_event(cls, context: PlannerExecutionContext, payload: Mapping[str, Any], *, range_start: datetime, range_end: datetime) -> dict[str, Any]:
@@ -270,6 +309,11 @@ class PlannerApplicationService:
             raise PlannerCommandError("page 必须大于 0，page_size 必须在 1 到 100", code="invalid_pagination")
         folded = query.strip().casefold()
         event_ids = PlannerRepository.search_event_candidate_ids(context.user, folded) if "event" in requested_types else set()
+        indexed_event_ids = PlannerOccurrenceIndex.candidate_ids(
+            context.user, 'event', range_start=range_start, range_end=range_end
+        ) if event_ids else None
+        if indexed_event_ids is not None:
+            event_ids &= indexed_event_ids
         occurrences = PlannerRepository.list_event_occurrences(
             context.user, range_start=range_start, range_end=range_end, event_ids=event_ids,
         ) if "event" in requested_types else []
@@ -293,7 +337,10 @@ class PlannerApplicationService:
                     results.append(serialize_todo(todo))
         if "reminder" in requested_types:
             for item in PlannerEntityQueryService.list_reminder_occurrences(
-                context.user, range_start=range_start, range_end=range_end
+                context.user, range_start=range_start, range_end=range_end,
+                reminder_ids=PlannerOccurrenceIndex.candidate_ids(
+                    context.user, 'reminder', range_start=range_start, range_end=range_end
+                ),
             ):
                 searchable = f"{item.payload.get('title', '')} {item.payload.get('content', '')}".casefold()
                 if not folded or folded in searchable:
@@ -545,6 +592,11 @@ class PlannerApplicationService:
         todos = PlannerEntityQueryService.list_todos(context.user, status_value=status_value, group_id=group_id)
         return {"todos": [serialize_todo(item) for item in todos], "count": len(todos)}
 
+    @classmethod
+    def todo_dependency_graph(cls, context: PlannerExecutionContext, *, todo_id: str = "") -> dict[str, Any]:
+        cls.require_access(context)
+        return PlannerEntityQueryService.todo_dependency_graph(context.user, todo_id=todo_id)
+
     @classmethod
     def create_todo(cls, context: PlannerExecutionContext, payload: Mapping[str, Any]) -> dict[str, Any]:
         cls.require_access(context, write=True)
@@ -595,7 +647,10 @@ class PlannerApplicationService:
     @classmethod
     def list_reminder_occurrences(cls, context: PlannerExecutionContext, *, range_start: datetime, range_end: datetime) -> dict[str, Any]:
         cls.require_access(context)
-        items = PlannerEntityQueryService.list_reminder_occurrences(context.user, range_start=range_start, range_end=range_end)
+        items = PlannerEntityQueryService.list_reminder_occurrences(
+            context.user, range_start=range_start, range_end=range_end,
+            reminder_ids=PlannerOccurrenceIndex.candidate_ids(context.user, 'reminder', range_start=range_start, range_end=range_end),
+        )
         return {"occurrences": [serialize_occurrence(item) for item in items], "count": len(items)}
 
     @classmethod
@@ -7,10 +7,11 @@ from datetime import date, datetime
 from hashlib import sha256
 
 from django.db import transaction
+from django.db.models import Q
 
 from core.models import (
     CalendarChange, CalendarCollectionVersion, CalendarEvent, EventGroup, EventOccurrenceOverride,
-    EventRecurrenceSeries,
+    EventRecurrenceSeries, ReminderRecurrenceSeries,
 )
 from core.planner.calendar_projection import NormalizedCalendarProjectionService
 from core.planner.commands import PlannerCommandError, PlannerCommandService
@@ -36,6 +37,10 @@ class CalDAVIdentityConflict(ValueError):
     pass
 
 
+class CalDAVInvalidSyncToken(ValueError):
+    pass
+
+
 @dataclass(frozen=True, slots=True)
 class CalendarCollectionProjection:
     collection_id: str
@@ -59,6 +64,13 @@ class CalendarResourceProjection:
         return encode_event_resource(self.resource)
 
 
+@dataclass(frozen=True, slots=True)
+class CalendarSyncDelta:
+    sync_token: str
+    changed: tuple[CalendarResourceProjection, ...]
+    removed: tuple[str, ...]
+
+
 @dataclass(frozen=True, slots=True)
 class CalendarObjectWriteResult:
     created: bool
@@ -92,61 +104,178 @@ class PlannerCalDAVQueryService:
         cls, user, collection_id: str, *, range_start: datetime | None = None,
         range_end: datetime | None = None,
     ) -> list[CalendarResourceProjection]:
+        """有时间窗时按 collection 与窗口下推查询，只为命中的 entity 构建 resource。"""
         collection = cls.get_collection(user, collection_id)
-        resources = cls._reminder_resources(user) if collection.read_only else cls._event_resources(user, collection_id)
-        if range_start is not None or range_end is not None:
-            if range_start is None or range_end is None or range_end <= range_start:
-                return []
-            if collection.read_only:
-                ids = {
-                    item.ref.entity_id for item in PlannerEntityQueryService.list_reminder_occurrences(
-                        user, range_start=range_start, range_end=range_end
-                    )
-                }
-            else:
-                ids = {
-                    item.ref.entity_id for item in PlannerRepository.list_event_occurrences(
-                        user, range_start=range_start, range_end=range_end
-                    )
-                }
-            resources = [item for item in resources if item.entity_id in ids]
+        if range_start is None and range_end is None:
+            resources = (
+                cls._reminder_resources(user) if collection.read_only else cls._event_resources(user, collection_id)
+            )
+        elif range_start is None or range_end is None or range_end <= range_start:
+            return []
+        elif collection.read_only:
+            reminder_ids = {
+                item.ref.entity_id for item in PlannerEntityQueryService.list_reminder_occurrences(
+                    user, range_start=range_start, range_end=range_end
+                )
+            }
+            resources = NormalizedCalendarProjectionService.reminder_resources(
+                user, feed_titles=False, reminder_filter=Q(reminder_id__in=reminder_ids)
+            ) if reminder_ids else []
+        else:
+            resources = [
+                NormalizedCalendarProjectionService._event_resource(item, feed_titles=False)
+                for item in PlannerRepository.list_event_definitions_with_occurrences(
+                    user, range_start=range_start, range_end=range_end,
+                    single_filter=cls._collection_filter(collection_id),
+                    series_filter=cls._collection_filter(collection_id, prefix='master_event__'),
+                )
+            ]
         return [cls._wrap(collection_id, item) for item in resources]
 
     @classmethod
     def get_resource(cls, user, collection_id: str, resource_name: str) -> CalendarResourceProjection:
+        """单个 resource 只按名称/UID 投影命中行，不构建整个 collection。"""
         normalized_name = resource_name.removesuffix('.ics')
-        for resource in cls.list_resources(user, collection_id):
-            if normalized_name in {resource.resource_name, resource.resource.ical_uid}:
-                return resource
+        collection = cls.get_collection(user, collection_id)
+        if collection.read_only:
+            resources = NormalizedCalendarProjectionService.reminder_resources(
+                user, feed_titles=False, reminder_filter=cls._reminder_resource_filter(normalized_name)
+            )
+        else:
+            resources = [
+                NormalizedCalendarProjectionService._event_resource(item, feed_titles=False)
+                for item in PlannerRepository.find_event_definitions_by_resource(user, {normalized_name})
+                if cls._in_collection(item.event, collection_id)
+            ]
+        for resource in resources:
+            if normalized_name in {resource.resource_name, resource.ical_uid}:
+                return cls._wrap(collection_id, resource)
         raise CalDAVResourceNotFound(normalized_name)
 
     @classmethod
     def collection_ctag(cls, user, collection_id: str) -> str:
+        """CTag 只取决于单调的 collection 版本，轮询时不构建任何 resource 投影。"""
         collection = cls.get_collection(user, collection_id)
-        raw_resources = (
-            cls._reminder_resources(user) if collection.read_only
-            else cls._event_resources(user, collection.collection_id)
-        )
-        version = CalendarCollectionVersion.objects.filter(
-            user=user, collection_type='caldav', collection_id=collection.collection_id
-        ).values_list('version', flat=True).first() or 0
+        version, _pruned_through = cls._collection_version(user, collection.collection_id)
         return f'"caldav-{collection.collection_id}-{version}"'
 
+    @classmethod
+    def sync_token(cls, user, collection_id: str) -> str:
+        collection = cls.get_collection(user, collection_id)
+        version, _pruned_through = cls._collection_version(user, collection.collection_id)
+        return cls._format_sync_token(collection.collection_id, version)
+
+    @classmethod
+    def changes_since(cls, user, collection_id: str, token: str) -> CalendarSyncDelta:
+        """RFC 6578：空 token 返回全量；否则只投影 token 之后 CalendarChange 涉及的 resource。
+
+        token 早于 pruned_through 时对应的变更日志已不完整，抛出 CalDAVInvalidSyncToken 让客户端全量重同步。
+        """
+        collection = cls.get_collection(user, collection_id)
+        version, pruned_through = cls._collection_version(user, collection.collection_id)
+        current = cls._format_sync_token(collection.collection_id, version)
+        if not token:
+            return CalendarSyncDelta(current, tuple(cls.list_resources(user, collection_id)), ())
+        since = cls._parse_sync_token(token, collection.collection_id)
+        if since is None or since > version or since < pruned_through:
+            raise CalDAVInvalidSyncToken(token)
+        names = set(
+            CalendarChange.objects.filter(
+                collection__user=user, collection__collection_type='caldav',
+                collection__collection_id=collection.collection_id, token__gt=since, token__lte=version,
+            ).values_list('resource_public_id', flat=True)
+        )
+        if not names:
+            return CalendarSyncDelta(current, (), ())
+        if collection.read_only:
+            changed, stale = cls._changed_reminders(user, names)
+        else:
+            changed, stale = cls._changed_events(user, collection.collection_id, names)
+        present = {item.resource_name for item in changed}
+        return CalendarSyncDelta(
+            current,
+            tuple(cls._wrap(collection.collection_id, item) for item in changed),
+            tuple(sorted(stale - present)),
+        )
+
+    @classmethod
+    def _event_resources(cls, user, collection_id: str) -> list[IcalEventResource]:
+        return [
+            NormalizedCalendarProjectionService._event_resource(item, feed_titles=False)
+            for item in PlannerRepository.list_all_event_definitions(user)
+            if cls._in_collection(item.event, collection_id)
+        ]
+
     @staticmethod
-    def _event_resources(user, collection_id: str) -> list[IcalEventResource]:
-        projections = PlannerRepository.list_all_event_definitions(user)
+    def _collection_filter(collection_id: str, *, prefix: str = '') -> Q:
+        """_in_collection 的 SQL 形式；prefix 用于从 series 关联到 master event。"""
         if collection_id == 'default':
-            projections = [
-                item for item in projections
-                if item.event.group_id is None or item.event.group.deleted_at is not None
-            ]
-        else:
-            projections = [
-                item for item in projections
-                if item.event.group_id is not None and item.event.group.group_id == collection_id
-                and item.event.group.deleted_at is None
-            ]
-        return [NormalizedCalendarProjectionService._event_resource(item, feed_titles=False) for item in projections]
+            return Q(**{f'{prefix}group__isnull': True}) | Q(**{f'{prefix}group__deleted_at__isnull': False})
+        return Q(**{f'{prefix}group__group_id': collection_id, f'{prefix}group__deleted_at__isnull': True})
+
+    @staticmethod
+    def _in_collection(event: CalendarEvent, collection_id: str) -> bool:
+        if collection_id == 'default':
+            return event.group_id is None or event.group.deleted_at is not None
+        return event.group_id is not None and event.group.group_id == collection_id and event.group.deleted_at is None
+
+    @staticmethod
+    def _reminder_resource_filter(name: str) -> Q:
+        """reminder resource 名/UID 由 reminder_id、series_id 或 series.ical_uid 派生，反推为索引查询。"""
+        stem = name.removesuffix('@unischeduler')
+        condition = Q(recurrence_series__ical_uid=name)
+        if stem.startswith('rem-'):
+            condition |= Q(reminder_id=stem.removeprefix('rem-'))
+        if stem.startswith('rem-series-'):
+            condition |= Q(recurrence_series__series_id=stem.removeprefix('rem-series-'))
+        return condition
+
+    @classmethod
+    def _changed_events(
+        cls, user, collection_id: str, names: set[str],
+    ) -> tuple[list[IcalEventResource], set[str]]:
+        changed = [
+            NormalizedCalendarProjectionService._event_resource(item, feed_titles=False)
+            for item in PlannerRepository.find_event_definitions_by_resource(user, names)
+            if cls._in_collection(item.event, collection_id)
+        ]
+        # 单次与重复之间转换会更换 resource 名，日志只记录新名字；同一 event 的另一个名字也需要 tombstone。
+        stale = set(names)
+        for event_name, series_name in CalendarEvent.objects.filter(user=user).filter(
+            Q(caldav_resource_name__in=names) | Q(recurrence_series__caldav_resource_name__in=names)
+        ).values_list('caldav_resource_name', 'recurrence_series__caldav_resource_name'):
+            stale.update(name for name in (event_name, series_name) if name)
+        return changed, stale
+
+    @staticmethod
+    def _changed_reminders(user, reminder_ids: set[str]) -> tuple[list[IcalEventResource], set[str]]:
+        changed = NormalizedCalendarProjectionService.reminder_resources(
+            user, feed_titles=False, reminder_filter=Q(reminder_id__in=reminder_ids)
+        )
+        stale = {f'rem-{reminder_id}' for reminder_id in reminder_ids}
+        stale.update(
+            f'rem-series-{series_id}' for series_id in ReminderRecurrenceSeries.objects.filter(
+                user=user, master_reminder__reminder_id__in=reminder_ids
+            ).values_list('series_id', flat=True)
+        )
+        return changed, stale
+
+    @staticmethod
+    def _collection_version(user, collection_id: str) -> tuple[int, int]:
+        return CalendarCollectionVersion.objects.filter(
+            user=user, collection_type='caldav', collection_id=collection_id
+        ).values_list('version', 'pruned_through').first() or (0, 0)
+
+    @staticmethod
+    def _format_sync_token(collection_id: str, version: int) -> str:
+        return f'urn:unischeduler:sync:{collection_id}:{version}'
+
+    @staticmethod
+    def _parse_sync_token(token: str, collection_id: str) -> int | None:
+        prefix = f'urn:unischeduler:sync:{collection_id}:'
+        if not token.startswith(prefix) or not token[len(prefix):].isdigit():
+            return None
+        return int(token[len(prefix):])
 
     @staticmethod
     def _reminder_resources(user) -> list[IcalEventResource]:
@@ -364,6 +493,7 @@ class PlannerCalDAVCommandService:
             EventOccurrenceOverride.objects.create(**values)
         if overrides:
             series.bump_version(update_fields=[])
+        PlannerCommandService.refresh_series_window(series)
 
     @staticmethod
     def _find_event(user, resource_name: str, *, lock: bool):
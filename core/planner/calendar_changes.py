@@ -2,8 +2,12 @@
 
 from __future__ import annotations
 
+from datetime import datetime
 from uuid import uuid4
 
+from django.db import transaction
+from django.db.models import Max
+
 from core.models import CalendarChange, CalendarCollectionVersion
 
 
@@ -25,3 +29,34 @@ class CalendarCollectionChangeWriter:
             collection=collection, token=collection.version, resource_type=resource_type,
             resource_public_id=resource_public_id, action=action, etag=etag,
         )
+
+    @classmethod
+    def compact(cls, before: datetime, *, user=None, dry_run: bool = False) -> dict:
+        """删除 before 之前的变更日志，并把 pruned_through 推进到被删除的最大 token。
+
+        持有更早 sync-token 的客户端随后收到 valid-sync-token 错误并全量重同步；
+        每个 collection 的最新一条记录始终保留，空闲 collection 的 token 不会因压缩失效。
+        """
+        collections = CalendarCollectionVersion.objects.filter(collection_type=cls.COLLECTION_TYPE)
+        if user is not None:
+            collections = collections.filter(user=user)
+        report = {'collections': 0, 'deleted': 0}
+        for collection_pk in collections.values_list('pk', flat=True):
+            with transaction.atomic():
+                collection = CalendarCollectionVersion.objects.select_for_update().get(pk=collection_pk)
+                expired = CalendarChange.objects.filter(
+                    collection=collection, occurred_at__lt=before, token__lt=collection.version
+                )
+                through = expired.aggregate(value=Max('token'))['value']
+                if through is None:
+                    continue
+                count = expired.count()
+                report['collections'] += 1
+                report['deleted'] += count
+                if dry_run:
+                    continue
+                CalendarChange.objects.filter(collection=collection, token__lte=through).delete()
+                if through > collection.pruned_through:
+                    collection.pruned_through = through
+                    collection.save(update_fields={'pruned_through', 'updated_at'})
+        return report
@@ -49,23 +49,33 @@ class NormalizedCalendarProjectionService:
                 updated_at=todo.updated_at,
                 version=todo.version,
                 revision_token=f't{todo.version}',
+                owner_id=todo.user_id,
                 include_status=False,
                 alarm_description=f"待办：{todo.title}",
             ))
         return results
 
     @classmethod
-    def reminder_resources(cls, user, *, feed_titles: bool = True) -> list[IcalEventResource]:
-        reminders = Reminder.objects.filter(user=user, deleted_at__isnull=True).select_related().order_by(
-            'trigger_at', 'trigger_date', 'id'
-        )
-        results = []
-        for reminder in reminders:
-            series = ReminderRecurrenceSeries.objects.filter(
-                master_reminder=reminder, deleted_at__isnull=True
+    def reminder_resources(
+        cls, user, *, feed_titles: bool = True, reminder_filter: Q | None = None,
+    ) -> list[IcalEventResource]:
+        """reminder、series 及其 rdate/exdate/state 以固定次数查询批量加载，查询数与 reminder 数无关。"""
+        reminder_qs = Reminder.objects.filter(user=user, deleted_at__isnull=True)
+        if reminder_filter is not None:
+            reminder_qs = reminder_qs.filter(reminder_filter)
+        reminders = list(reminder_qs.order_by('trigger_at', 'trigger_date', 'id'))
+        # 以子查询复用同一 reminder 谓词，避免随 reminder 数增长的字面量 IN 列表。
+        series_by_reminder = {
+            series.master_reminder_id: series
+            for series in ReminderRecurrenceSeries.objects.filter(
+                user=user, master_reminder__in=reminder_qs.values('pk'), deleted_at__isnull=True,
             ).prefetch_related('rdates', 'exdates', Prefetch(
                 'occurrence_states', queryset=ReminderOccurrenceState.objects.filter(deleted_at__isnull=True)
-            )).first()
+            ))
+        } if reminders else {}
+        results = []
+        for reminder in reminders:
+            series = series_by_reminder.get(reminder.pk)
             start = reminder.trigger_at
             if start is None:
                 start = datetime.combine(reminder.trigger_date, time(hour=9), tzinfo=ZoneInfo(reminder.tzid))
@@ -77,7 +87,9 @@ class NormalizedCalendarProjectionService:
             overrides = ()
             version = reminder.version
             series_id = ""
+            revision_token = f'r{reminder.version}'
             if series is not None:
+                states = list(series.occurrence_states.all())
                 series_id = series.series_id
                 uid = series.ical_uid or f"rem-series-{series.series_id}@unischeduler"
                 resource_name = f"rem-series-{series.series_id}"
@@ -85,7 +97,11 @@ class NormalizedCalendarProjectionService:
                 rdates = tuple(item.starts_at or item.starts_date for item in series.rdates.all())
                 exdates = tuple(item.recurrence_id for item in series.exdates.all())
                 version = max(version, series.version)
-                overrides = tuple(cls._reminder_override(item, start) for item in series.occurrence_states.all())
+                overrides = tuple(cls._reminder_override(item, start) for item in states)
+                revision_token = (
+                    f'r{reminder.version}-s{series.version}-o'
+                    + ','.join(f'{item.recurrence_id}:{item.version}' for item in states)
+                )
             return_title = f"[提醒] {reminder.title}" if feed_titles else reminder.title
             results.append(IcalEventResource(
                 entity_id=reminder.reminder_id,
@@ -98,11 +114,8 @@ class NormalizedCalendarProjectionService:
                 tzid=reminder.tzid,
                 updated_at=reminder.updated_at,
                 version=version,
-                revision_token=(
-                    f'r{reminder.version}-s{series.version}-o'
-                    + ','.join(f'{item.recurrence_id}:{item.version}' for item in series.occurrence_states.all())
-                    if series is not None else f'r{reminder.version}'
-                ),
+                revision_token=revision_token,
+                owner_id=reminder.user_id,
                 series_id=series_id,
                 rrule=rrule,
                 rdates=tuple(item for item in rdates if item is not None),
@@ -128,7 +141,7 @@ class NormalizedCalendarProjectionService:
                 start=start, end=end, tzid=event.tzid, is_all_day=event.is_all_day,
                 description=event.description, location=event.location, status=event.status,
                 updated_at=event.updated_at, version=event.version,
-                revision_token=f'e{event.version}',
+                revision_token=f'e{event.version}', owner_id=event.user_id,
             )
         series = event.recurrence_series
         overrides = tuple(
@@ -148,7 +161,7 @@ class NormalizedCalendarProjectionService:
             start=start, end=end, tzid=event.tzid, is_all_day=event.is_all_day,
             description=event.description, location=event.location, status=event.status,
             updated_at=max(event.updated_at, series.updated_at),
-            version=max(event.version, series.version), series_id=series.series_id,
+            version=max(event.version, series.version), series_id=series.series_id, owner_id=event.user_id,
             revision_token=(
                 f'e{event.version}-s{series.version}-o'
                 + ','.join(f'{item.recurrence_id}:{item.version or 0}' for item in projection.overrides)
@@ -10,7 +10,6 @@ from datetime import date, datetime, timedelta
 from typing import Any, Mapping
 from uuid import uuid4
 
-from dateutil.rrule import rruleset, rrulestr
 from django.contrib.auth.models import User
 from django.db import transaction
 from django.db.models import Q
@@ -33,6 +32,7 @@ from core.models import (
     PlannerChangeSet,
 )
 from core.planner.recurrence.codec import InvalidRRuleError, PlannerTimeCodec, PlannerTimeError, canonicalize_rrule
+from core.planner.recurrence.slots import RecurrenceSlotCounter
 from core.planner.calendar_changes import CalendarCollectionChangeWriter
 from core.planner.repository import PlannerNotFoundError, PlannerRepository
 from logger import logger
@@ -189,6 +189,7 @@ class PlannerCommandService:
             override.kind = EventOccurrenceOverride.KIND_CANCELLED
             override.patch = {}
             override.bump_version(update_fields={'kind', 'patch'})
+            cls.refresh_series_window(series)
             cls._record_change(
                 user,
                 detached,
@@ -208,6 +209,7 @@ class PlannerCommandService:
             override.patch = {**override.patch, **patch}
             cls._apply_override_effective_values(override, effective_values)
             override.bump_version(update_fields={'patch', *effective_values.keys()})
+        cls.refresh_series_window(series)
         cls._record_change(
             user,
             event,
@@ -278,9 +280,22 @@ class PlannerCommandService:
                     'kind', 'patch', 'effective_start_at', 'effective_end_at', 'effective_start_date', 'effective_end_date'
                 }
             )
+        cls.refresh_series_window(series)
         cls._record_change(user, event, command_type='event.delete_single', before=before, after=cls._snapshot(event, series))
         return event
 
+    @staticmethod
+    def refresh_series_window(series: EventRecurrenceSeries | None) -> None:
+        """写入后回填 series 的 occurrence 窗口；只是查询裁剪索引，不递增版本也不记录 CalendarChange。"""
+        if series is None or series.deleted_at is not None:
+            return
+        start, end = PlannerRepository.series_occurrence_window(series)
+        series.occurrence_window_start = start
+        series.occurrence_window_end = end
+        EventRecurrenceSeries.objects.filter(pk=series.pk).update(
+            occurrence_window_start=start, occurrence_window_end=end
+        )
+
     @classmethod
     def source_version(cls, event: CalendarEvent, occurrence_ref: Mapping[str, Any] | None = None) -> int:
         """返回客户端下次 command 应携带的 source_version。"""
@@ -410,6 +425,7 @@ class PlannerCommandService:
             )
 
         cls._truncate_parent_rule(event, series, kept_count)
+        cls.refresh_series_window(child_series)
         cls._copy_event_relations(event, child)
         if 'share_group_ids' in payload:
             cls._replace_share_groups(user, child, payload['share_group_ids'])
@@ -451,6 +467,7 @@ class PlannerCommandService:
         series.rrule_canonical = canonicalize_rrule(rule, dtstart=dtstart, tzid=series.tzid)
         series.sequence += 1
         series.bump_version(update_fields={'rrule', 'rrule_canonical', 'sequence'})
+        cls.refresh_series_window(series)
 
     @classmethod
     def _count_slots_before(cls, series: EventRecurrenceSeries, recurrence_id: str) -> int:
@@ -462,8 +479,9 @@ class PlannerCommandService:
         if is_all_day:
             rule_start = rule_start.replace(tzinfo=None)
             anchor_dt = anchor_dt.replace(tzinfo=None)
-        rule = rrulestr(series.rrule_canonical or series.rrule, dtstart=rule_start)
-        return len([item for item in rule.between(rule_start, anchor_dt, inc=True) if item < anchor_dt])
+        return RecurrenceSlotCounter.count_before(
+            series.rrule_canonical or series.rrule, dtstart=rule_start, anchor=anchor_dt
+        )
 
     @staticmethod
     def _event_duration(event: CalendarEvent) -> timedelta:
@@ -660,6 +678,7 @@ class PlannerCommandService:
             tzid=event.tzid,
         )
         cls._replace_series_dates(series, definition)
+        cls.refresh_series_window(series)
         return series
 
     @classmethod
@@ -673,6 +692,7 @@ class PlannerCommandService:
         series.sequence += 1
         series.bump_version(update_fields={'rrule', 'rrule_canonical', 'dtstart_at', 'dtstart_date', 'tzid', 'sequence'})
         cls._replace_series_dates(series, definition)
+        cls.refresh_series_window(series)
 
     @classmethod
     def _rewrite_series_for_master_time(cls, series: EventRecurrenceSeries, event: CalendarEvent) -> None:
@@ -692,6 +712,7 @@ class PlannerCommandService:
         series.tzid = event.tzid
         series.sequence += 1
         series.bump_version(update_fields={'rrule_canonical', 'dtstart_at', 'dtstart_date', 'tzid', 'sequence'})
+        cls.refresh_series_window(series)
 
     @classmethod
     def _shift_series_occurrence_keys(
@@ -867,13 +888,14 @@ class PlannerCommandService:
             if is_all_day:
                 rule_start = rule_start.replace(tzinfo=None)
                 slot_value = slot_value.replace(tzinfo=None)
-            recurrence_set = rruleset()
-            recurrence_set.rrule(rrulestr(series.rrule_canonical or series.rrule, dtstart=rule_start))
-            for rdate in series.rdates.all():
-                value = rdate.starts_date if is_all_day else rdate.starts_at
-                if value is not None:
-                    recurrence_set.rdate(PlannerTimeCodec.recurrence_datetime(value, tzid=series.tzid).replace(tzinfo=None) if is_all_day else PlannerTimeCodec.to_local(value, tzid=series.tzid))
-            if recurrence_set.after(slot_value - timedelta(seconds=1), inc=True) != slot_value:
+            rdates = [
+                PlannerTimeCodec.recurrence_datetime(value, tzid=series.tzid).replace(tzinfo=None) if is_all_day else PlannerTimeCodec.to_local(value, tzid=series.tzid)
+                for rdate in series.rdates.all()
+                if (value := rdate.starts_date if is_all_day else rdate.starts_at) is not None
+            ]
+            if slot_value not in rdates and not RecurrenceSlotCounter.contains(
+                series.rrule_canonical or series.rrule, dtstart=rule_start, value=slot_value
+            ):
                 raise PlannerCommandError('recurrence_id 不属于该 series', code='recurrence_id_not_in_series')
             if series.exdates.filter(recurrence_id=recurrence_id).exists():
                 raise PlannerCommandError('recurrence_id 已被 EXDATE 排除', code='recurrence_id_not_in_series')
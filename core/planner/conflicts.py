@@ -0,0 +1,87 @@
+"""occurrence 半开区间冲突检测的纯计算引擎；不访问数据库。"""
+
+from __future__ import annotations
+
+import heapq
+from datetime import date, datetime, time
+from itertools import islice
+from typing import Any, Iterable
+
+from core.planner.presentation import occurrence_client_id, serialize_occurrence
+from core.planner.recurrence import Occurrence, PlannerTimeCodec
+
+
+class PlannerConflictSweep:
+    """按开始时间扫描，用最小堆淘汰已结束区间；复杂度 O(n log n + 输出冲突数)。"""
+
+    @staticmethod
+    def utc_interval(occurrence: Occurrence) -> tuple[datetime, datetime]:
+        start_value, end_value = occurrence.start, occurrence.end
+        if isinstance(start_value, date) and not isinstance(start_value, datetime):
+            start_value = datetime.combine(start_value, time.min, tzinfo=PlannerTimeCodec.get_timezone())
+            end_value = datetime.combine(end_value, time.min, tzinfo=PlannerTimeCodec.get_timezone())
+        return PlannerTimeCodec.to_utc(start_value), PlannerTimeCodec.to_utc(end_value)
+
+    @classmethod
+    def run(cls, occurrences: Iterable[Occurrence], *, cursor: int = 0, limit: int | None = None) -> dict[str, Any]:
+        """返回 [cursor, cursor+limit) 的冲突对与全部冲突簇；只序列化当前页冲突对中的 occurrence，且最多一次。"""
+        normalized = sorted(
+            ((*cls.utc_interval(occurrence), occurrence) for occurrence in occurrences),
+            key=lambda item: (item[0], item[1], item[2].ref.entity_id),
+        )
+        page_end = None if limit is None else cursor + limit
+        serialized: dict[int, dict[str, Any]] = {}
+
+        def serialize(index: int) -> dict[str, Any]:
+            if index not in serialized:
+                serialized[index] = serialize_occurrence(normalized[index][2])
+            return serialized[index]
+
+        # active 以插入顺序保存仍未结束的 occurrence，输出顺序与逐项比较的旧实现一致。
+        active: dict[int, None] = {}
+        ending: list[tuple[datetime, int]] = []
+        conflicts, clusters = [], []
+        cluster: dict[str, Any] | None = None
+        total = 0
+        for index, (start_value, end_value, _occurrence) in enumerate(normalized):
+            while ending and ending[0][0] <= start_value:
+                active.pop(heapq.heappop(ending)[1], None)
+            if not active:
+                if cluster is not None and len(cluster['members']) > 1:
+                    clusters.append(cluster)
+                cluster = {'start': start_value, 'end': end_value, 'members': [], 'pair_count': 0}
+            cluster['members'].append(index)
+            cluster['end'] = max(cluster['end'], end_value)
+            cluster['pair_count'] += len(active)
+            page_start_offset = total
+            total += len(active)
+            if total > cursor and (page_end is None or page_start_offset < page_end):
+                skip = max(cursor - page_start_offset, 0)
+                stop = None if page_end is None else page_end - page_start_offset
+                for other in islice(active, skip, stop):
+                    other_start, other_end, _other = normalized[other]
+                    conflicts.append({
+                        'overlap': {
+                            'start': max(start_value, other_start).isoformat(),
+                            'end': min(end_value, other_end).isoformat(),
+                        },
+                        'items': [serialize(other), serialize(index)],
+                    })
+            active[index] = None
+            heapq.heappush(ending, (end_value, index))
+        if cluster is not None and len(cluster['members']) > 1:
+            clusters.append(cluster)
+        return {
+            'conflicts': conflicts,
+            'clusters': [
+                {
+                    'start': item['start'].isoformat(),
+                    'end': item['end'].isoformat(),
+                    'occurrence_ids': [occurrence_client_id(normalized[index][2]) for index in item['members']],
+                    'pair_count': item['pair_count'],
+                }
+                for item in clusters
+            ],
+            'count': total,
+            'next_cursor': page_end if page_end is not None and page_end < total else None,
+        }
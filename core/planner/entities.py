@@ -6,10 +6,9 @@ from datetime import date, datetime, timedelta
 from typing import Any, Mapping
 from uuid import uuid4
 
-from dateutil.rrule import rrulestr
 from django.contrib.auth.models import User
 from django.db import models, transaction
-from django.db.models import Q
+from django.db.models import Prefetch, Q
 from django.utils import timezone
 
 from core.models import (
@@ -31,6 +30,8 @@ from core.planner.commands import PlannerCommandError, PlannerCommandService, Pl
 from core.planner.calendar_changes import CalendarCollectionChangeWriter
 from core.planner.recurrence.codec import InvalidRRuleError, PlannerTimeCodec, canonicalize_rrule
 from core.planner.recurrence.expander import Occurrence, OccurrenceOverride, OccurrenceRef, RecurrenceDefinition, RecurrenceExpander
+from core.planner.recurrence.slots import RecurrenceSlotCounter
+from core.planner.todo_graph import TodoDependencyGraph
 from logger import logger
 
 
@@ -108,18 +109,59 @@ class PlannerEntityQueryService:
             queryset = queryset.filter(group__group_id=group_id)
         return list(queryset.order_by('due_at', 'due_date', 'id'))
 
+    @staticmethod
+    def todo_dependency_graph(user: User, *, todo_id: str = '') -> dict[str, Any]:
+        """未删除 todo 的依赖图：节点、边、拓扑序与按预计耗时的关键路径；两次查询，与图深度无关。"""
+        todos = {
+            row[0]: row for row in Todo.objects.filter(user=user, deleted_at__isnull=True).values_list(
+                'pk', 'todo_id', 'title', 'status', 'estimated_duration_seconds'
+            )
+        }
+        graph = TodoDependencyGraph.load(user, active_only=True, nodes=todos)
+        order, cyclic = graph.topological_order()
+        finish, critical_path = graph.critical_path(order, {pk: row[4] or 0 for pk, row in todos.items()})
+        public_id = {pk: row[1] for pk, row in todos.items()}
+        result: dict[str, Any] = {
+            'nodes': [
+                {
+                    'todo_id': row[1], 'title': row[2], 'status': row[3], 'estimated_duration_seconds': row[4],
+                    'earliest_finish_seconds': finish.get(pk),
+                }
+                for pk, row in sorted(todos.items())
+            ],
+            'edges': [
+                {'todo_id': public_id[pk], 'depends_on': public_id[target]}
+                for pk in sorted(graph.prerequisites) for target in sorted(graph.prerequisites[pk])
+            ],
+            'order': [public_id[pk] for pk in order],
+            'cyclic': sorted(public_id[pk] for pk in cyclic),
+            'critical_path': [public_id[pk] for pk in critical_path],
+        }
+        if todo_id:
+            pk = next((pk for pk, row in todos.items() if row[1] == todo_id), None)
+            if pk is None:
+                raise PlannerCommandError('未找到 todo', code='todo_not_found')
+            result['todo_id'] = todo_id
+            result['ancestors'] = sorted(public_id[item] for item in graph.ancestors(pk))
+            result['descendants'] = sorted(public_id[item] for item in graph.descendants(pk))
+        return result
+
     @staticmethod
     def list_reminders(user: User) -> list[Reminder]:
         return list(Reminder.objects.filter(user=user, deleted_at__isnull=True).order_by('trigger_at', 'trigger_date', 'id'))
 
     @classmethod
-    def list_reminder_occurrences(cls, user: User, *, range_start: datetime, range_end: datetime) -> list[Occurrence]:
+    def list_reminder_occurrences(
+        cls, user: User, *, range_start: datetime, range_end: datetime, reminder_ids: set[str] | None = None,
+    ) -> list[Occurrence]:
         results: list[Occurrence] = []
         singles = Reminder.objects.filter(
             user=user, deleted_at__isnull=True,
         ).filter(
             Q(recurrence_series__isnull=True) | Q(recurrence_series__deleted_at__isnull=False)
         ).filter(Q(trigger_at__gte=range_start, trigger_at__lt=range_end) | Q(trigger_date__gte=range_start.date(), trigger_date__lt=range_end.date()))
+        if reminder_ids is not None:
+            singles = singles.filter(reminder_id__in=reminder_ids)
         for reminder in singles:
             start = reminder.trigger_at or reminder.trigger_date
             if start is None:
@@ -136,39 +178,65 @@ class PlannerEntityQueryService:
             )
         series_rows = ReminderRecurrenceSeries.objects.filter(
             user=user, deleted_at__isnull=True, master_reminder__deleted_at__isnull=True
-        ).select_related('master_reminder').prefetch_related('exdates', 'rdates', 'occurrence_states')
+        ).filter(
+            # 与 event series 相同：未回填窗口的 series 保守参与展开。
+            Q(occurrence_window_start__isnull=True) | (
+                Q(occurrence_window_start__lt=range_end)
+                & (Q(occurrence_window_end__isnull=True) | Q(occurrence_window_end__gt=range_start))
+            )
+        ).select_related('master_reminder').prefetch_related('exdates', 'rdates', Prefetch(
+            'occurrence_states', queryset=ReminderOccurrenceState.objects.filter(deleted_at__isnull=True)
+        ))
+        if reminder_ids is not None:
+            series_rows = series_rows.filter(master_reminder__reminder_id__in=reminder_ids)
         for series in series_rows:
-            master = series.master_reminder
-            dtstart = series.dtstart_at or series.dtstart_date
-            if dtstart is None:
+            definition = cls._reminder_definition(series)
+            if definition is None:
                 continue
-            definition = RecurrenceDefinition(
-                entity_type='reminder', entity_id=master.reminder_id, series_id=series.series_id,
-                dtstart=dtstart,
-                duration=timedelta(seconds=1) if isinstance(dtstart, datetime) else timedelta(days=1),
-                rrule=series.rrule_canonical or series.rrule, tzid=series.tzid,
-                source_version=max(master.version, series.version),
-                payload={'title': master.title, 'content': master.content, 'status': master.status, 'priority': master.priority},
-                rdates=tuple((item.starts_at or item.starts_date) for item in series.rdates.all() if (item.starts_at or item.starts_date)),
-                exdates=frozenset(item.recurrence_id for item in series.exdates.all()),
-            )
-            overrides = []
-            for state in series.occurrence_states.filter(deleted_at__isnull=True):
-                patch = {**state.patch, 'status': state.status}
-                effective = state.effective_trigger_at
-                overrides.append(
-                    OccurrenceOverride(
-                        recurrence_id=state.recurrence_id,
-                        kind='cancelled' if state.status in {'dismissed', 'cancelled'} else 'modified',
-                        patch=patch,
-                        effective_start=effective,
-                        effective_end=effective + timedelta(seconds=1) if effective else None,
-                        version=state.version,
-                    )
-                )
+            overrides = [cls._reminder_override(state) for state in series.occurrence_states.all()]
             results.extend(RecurrenceExpander.expand(definition, range_start=range_start, range_end=range_end, overrides=overrides))
         return sorted(results, key=lambda item: PlannerTimeCodec.recurrence_datetime(item.start))
 
+    @classmethod
+    def reminder_series_occurrence_window(cls, series: ReminderRecurrenceSeries) -> tuple[datetime, datetime | None] | None:
+        """计算 reminder series 的 UTC occurrence 窗口；dtstart 缺失时返回 None。"""
+        definition = cls._reminder_definition(series)
+        if definition is None:
+            return None
+        states = series.occurrence_states.filter(deleted_at__isnull=True)
+        return RecurrenceExpander.occurrence_bounds(
+            definition, overrides=tuple(cls._reminder_override(state) for state in states)
+        )
+
+    @staticmethod
+    def _reminder_definition(series: ReminderRecurrenceSeries) -> RecurrenceDefinition | None:
+        master = series.master_reminder
+        dtstart = series.dtstart_at or series.dtstart_date
+        if dtstart is None:
+            return None
+        return RecurrenceDefinition(
+            entity_type='reminder', entity_id=master.reminder_id, series_id=series.series_id,
+            dtstart=dtstart,
+            duration=timedelta(seconds=1) if isinstance(dtstart, datetime) else timedelta(days=1),
+            rrule=series.rrule_canonical or series.rrule, tzid=series.tzid,
+            source_version=max(master.version, series.version),
+            payload={'title': master.title, 'content': master.content, 'status': master.status, 'priority': master.priority},
+            rdates=tuple((item.starts_at or item.starts_date) for item in series.rdates.all() if (item.starts_at or item.starts_date)),
+            exdates=frozenset(item.recurrence_id for item in series.exdates.all()),
+        )
+
+    @staticmethod
+    def _reminder_override(state: ReminderOccurrenceState) -> OccurrenceOverride:
+        effective = state.effective_trigger_at
+        return OccurrenceOverride(
+            recurrence_id=state.recurrence_id,
+            kind='cancelled' if state.status in {'dismissed', 'cancelled'} else 'modified',
+            patch={**state.patch, 'status': state.status},
+            effective_start=effective,
+            effective_end=effective + timedelta(seconds=1) if effective else None,
+            version=state.version,
+        )
+
 
 class PlannerEntityCommandService:
     @classmethod
@@ -722,6 +790,7 @@ class PlannerEntityCommandService:
         )
         series.sequence += 1
         series.bump_version(update_fields={'rrule', 'rrule_canonical', 'sequence'})
+        cls.refresh_reminder_series_window(series)
 
     @classmethod
     def _count_reminder_slots_before(cls, series: ReminderRecurrenceSeries, recurrence_id: str) -> int:
@@ -729,8 +798,9 @@ class PlannerEntityCommandService:
         anchor = PlannerTimeCodec.parse_recurrence_id(recurrence_id, tzid=series.tzid)
         rule_start = PlannerTimeCodec.recurrence_datetime(dtstart, tzid=series.tzid)
         anchor_dt = PlannerTimeCodec.recurrence_datetime(anchor, tzid=series.tzid)
-        rule = rrulestr(series.rrule_canonical or series.rrule, dtstart=rule_start)
-        return len([item for item in rule.between(rule_start, anchor_dt, inc=True) if item < anchor_dt])
+        return RecurrenceSlotCounter.count_before(
+            series.rrule_canonical or series.rrule, dtstart=rule_start, anchor=anchor_dt
+        )
 
     @staticmethod
     def _rrule_parts(rule: str) -> dict[str, str]:
@@ -746,8 +816,9 @@ class PlannerEntityCommandService:
         rule_start = PlannerTimeCodec.recurrence_datetime(
             series.dtstart_at or series.dtstart_date, tzid=series.tzid
         )
-        rule = rrulestr(series.rrule_canonical or series.rrule, dtstart=rule_start)
-        if not rule.between(anchor_dt, anchor_dt, inc=True):
+        if not RecurrenceSlotCounter.contains(
+            series.rrule_canonical or series.rrule, dtstart=rule_start, value=anchor_dt
+        ):
             raise PlannerCommandError('occurrence 不属于 reminder series', code='occurrence_not_found')
 
     @staticmethod
@@ -842,30 +913,32 @@ class PlannerEntityCommandService:
                 raise PlannerCommandError('dependency 不存在或跨用户', code='invalid_dependencies')
             if any(target.pk == todo.pk for target in targets):
                 raise PlannerCommandError('todo 不能依赖自身', code='todo_dependency_cycle')
+            graph = TodoDependencyGraph.load(user)
             for target in targets:
-                if cls._dependency_reaches(target, todo):
+                if graph.reaches(target.pk, todo.pk):
                     raise PlannerCommandError('todo dependency 形成环', code='todo_dependency_cycle')
             TodoDependency.objects.filter(todo=todo).delete()
             TodoDependency.objects.bulk_create([TodoDependency(todo=todo, depends_on=target) for target in targets])
         return changed
 
-    @staticmethod
-    def _dependency_reaches(start: Todo, target: Todo) -> bool:
-        pending = [start.pk]
-        seen = set()
-        while pending:
-            current = pending.pop()
-            if current == target.pk: return True
-            if current in seen: continue
-            seen.add(current)
-            pending.extend(TodoDependency.objects.filter(todo_id=current).values_list('depends_on_id', flat=True))
-        return False
-
     @staticmethod
     def _require_version(obj: Any, expected: int) -> None:
         if expected != obj.version:
             raise PlannerCommandVersionConflict(f'版本冲突: expected={expected}, actual={obj.version}')
 
+    @staticmethod
+    def refresh_reminder_series_window(series: ReminderRecurrenceSeries | None) -> None:
+        """与 PlannerCommandService.refresh_series_window 对应的 reminder 版本；不递增版本。"""
+        if series is None or series.deleted_at is not None:
+            return
+        window = PlannerEntityQueryService.reminder_series_occurrence_window(series)
+        start, end = window if window is not None else (None, None)
+        series.occurrence_window_start = start
+        series.occurrence_window_end = end
+        ReminderRecurrenceSeries.objects.filter(pk=series.pk).update(
+            occurrence_window_start=start, occurrence_window_end=end
+        )
+
     @staticmethod
     def _record(user: User, resource_type: str, resource_id: str, version: int, command: str, action: str) -> None:
         collection, _ = CalendarCollectionVersion.objects.select_for_update().get_or_create(
@@ -879,6 +952,12 @@ class PlannerEntityCommandService:
             resource_public_id=resource_id, action=action, etag=f'{resource_type}:{resource_id}:{version}'
         )
         if resource_type == 'reminder':
+            # 所有 reminder 写入都经过这里，统一回填 series 窗口，避免遗漏某条写路径导致裁剪过窄。
+            PlannerEntityCommandService.refresh_reminder_series_window(
+                ReminderRecurrenceSeries.objects.filter(
+                    user=user, master_reminder__reminder_id=resource_id, deleted_at__isnull=True
+                ).select_related('master_reminder').first()
+            )
             CalendarCollectionChangeWriter.record(
                 user, collection_id='reminders', resource_type='reminder',
                 resource_public_id=resource_id, action=action,
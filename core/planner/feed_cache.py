@@ -0,0 +1,102 @@
+"""订阅 Feed 编码结果的进程内缓存；以 CalendarCollectionVersion 计数器派生的强 ETag 为版本。"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Hashable
+
+from core.models import CalendarCollectionVersion
+
+
+def gzip_etag(etag: str) -> str:
+    """
+    强 ETag 按内容编码区分，gzip 表示使用独立的 validator。
+
+    接受 gzip 的请求总是得到 gzip 表示，因此只凭版本 ETag 即可得出，304 不需要读取或构建 Feed。
+    """
+    return f'{etag[:-1]}-gzip"'
+
+
+@dataclass(frozen=True, slots=True)
+class CalendarFeedPayload:
+    etag: str
+    body: bytes
+    gzip_body: bytes
+
+    @property
+    def gzip_etag(self) -> str:
+        return gzip_etag(self.etag)
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + len(self.gzip_body)
+
+
+class CalendarFeedCache:
+    """按字节数有界的 LRU；条目携带 ETag，版本变化后旧条目在下一次读取时被替换。"""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._bytes = 0
+        self._entries: OrderedDict[Hashable, CalendarFeedPayload] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def version_etag(user, feed_type: str) -> str:
+        """所有会改变 Feed 内容的写入都会递增某个 collection 版本；一次按用户索引的查询即可得到版本。"""
+        rows = CalendarCollectionVersion.objects.filter(user=user).order_by(
+            'collection_type', 'collection_id'
+        ).values_list('collection_type', 'collection_id', 'version', 'sync_token')
+        raw = '|'.join([
+            feed_type, str(user.pk), user.username,
+            *(f'{kind}:{cid}:{version}:{token}' for kind, cid, version, token in rows),
+        ])
+        return f'"feed-{hashlib.sha256(raw.encode()).hexdigest()[:32]}"'
+
+    @staticmethod
+    def compress(etag: str, body: bytes) -> CalendarFeedPayload:
+        # mtime=0 保证同一 body 的 gzip 字节稳定，强 ETag 才成立。
+        return CalendarFeedPayload(etag, body, gzip.compress(body, compresslevel=6, mtime=0))
+
+    def get(self, key: Hashable, etag: str) -> CalendarFeedPayload | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.etag == etag:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, payload: CalendarFeedPayload) -> None:
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            if payload.size > self.max_bytes:
+                return
+            self._entries[key] = payload
+            self._bytes += payload.size
+            while self._bytes > self.max_bytes:
+                _key, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+
+    def info(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                'hits': self.hits, 'misses': self.misses, 'size': len(self._entries),
+                'bytes': self._bytes, 'max_bytes': self.max_bytes,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
@@ -6,9 +6,12 @@ normalized projection 转成这里的 DTO，再调用编码/解析函数。
 
 from __future__ import annotations
 
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass, field
 from datetime import date, datetime, timedelta, timezone
-from typing import Any, Iterable, Mapping
+from functools import lru_cache
+from typing import Any, Callable, Hashable, Iterable, Mapping
 from zoneinfo import ZoneInfo
 
 from icalendar import Alarm, Calendar, Event, Timezone, TimezoneStandard, vRecur
@@ -52,6 +55,8 @@ class IcalEventResource:
     updated_at: datetime | None = None
     version: int = 1
     revision_token: str = ""
+    # 所属用户主键；编码结果缓存跨用户共享，缺失时不缓存
+    owner_id: int | None = None
     series_id: str = ""
     rrule: str = ""
     rdates: tuple[Temporal, ...] = ()
@@ -86,13 +91,72 @@ class ParsedCalendarObject:
     overrides: tuple[ParsedEventComponent, ...]
 
 
+class EncodedComponentCache:
+    """已编码 VEVENT 字节的有界 LRU；key 含 owner 与 revision_token，resource 修改后旧条目自然失效。"""
+
+    def __init__(self, maxsize: int = 20000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_encode(self, key: Hashable, encode: Callable[[], bytes]) -> bytes:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        encoded = encode()
+        with self._lock:
+            self._entries[key] = encoded
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return encoded
+
+    def info(self) -> dict[str, int | float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits, "misses": self.misses, "size": len(self._entries), "maxsize": self.maxsize,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+encoded_components = EncodedComponentCache()
+
+
 def encode_event_resource(resource: IcalEventResource) -> bytes:
     """编码一个 CalDAV resource（master + sparse override）。"""
-    _validate_resource(resource)
-    calendar = _calendar(name=None, method=None)
-    for component in build_event_components(resource):
-        calendar.add_component(component)
-    return calendar.to_ical()
+    head, tail = _calendar_envelope(None, None, None)
+    return head + encode_resource_components(resource) + tail
+
+
+def encode_resource_components(resource: IcalEventResource) -> bytes:
+    """返回 resource 的全部 VEVENT 字节；内容相同的 revision 只构建一次 component。"""
+
+    def encode() -> bytes:
+        _validate_resource(resource)
+        return b"".join(component.to_ical() for component in build_event_components(resource))
+
+    if not resource.revision_token or resource.owner_id is None:
+        return encode()
+    # 缓存跨用户共享而 entity_id 只在用户内唯一，因此 key 带 owner；revision_token 覆盖业务字段，
+    # Feed 标题/提醒文案带分组或类型前缀且分组改名不改变 revision，这些展示字段单独进入 key。
+    key = (
+        resource.owner_id, resource.entity_id, resource.revision_token,
+        resource.title, resource.alarm_description, resource.include_status,
+    )
+    return encoded_components.get_or_encode(key, encode)
 
 
 def encode_feed_calendar(
@@ -103,15 +167,12 @@ def encode_feed_calendar(
     reminders: Iterable[IcalEventResource] = (),
     refresh_hours: int = 1,
 ) -> bytes:
-    """编码 Apple HTTP subscription 使用的 VCALENDAR。"""
-    calendar = _calendar(name=name, method="PUBLISH")
-    calendar.add("X-PUBLISHED-TTL", f"PT{refresh_hours}H")
-    calendar.add("REFRESH-INTERVAL;VALUE=DURATION", f"PT{refresh_hours}H")
-    for resource in (*tuple(events), *tuple(todos), *tuple(reminders)):
-        _validate_resource(resource)
-        for component in build_event_components(resource):
-            calendar.add_component(component)
-    return calendar.to_ical()
+    """编码 Apple HTTP subscription 使用的 VCALENDAR；由缓存的 component 字节拼接而成。"""
+    head, tail = _calendar_envelope(name, "PUBLISH", refresh_hours)
+    body = b"".join(
+        encode_resource_components(resource) for resource in (*tuple(events), *tuple(todos), *tuple(reminders))
+    )
+    return head + body + tail
 
 
 def build_event_components(resource: IcalEventResource) -> tuple[Event, ...]:
@@ -140,6 +201,17 @@ def decode_event_resource(payload: bytes | str) -> ParsedCalendarObject:
     return ParsedCalendarObject(uid=next(iter(uids)), master=masters[0], overrides=overrides)
 
 
+@lru_cache(maxsize=256)
+def _calendar_envelope(name: str | None, method: str | None, refresh_hours: int | None) -> tuple[bytes, bytes]:
+    """VCALENDAR 头（含 VTIMEZONE）与结尾；与逐个 add_component 后 to_ical() 的字节完全一致。"""
+    calendar = _calendar(name=name, method=method)
+    if refresh_hours is not None:
+        calendar.add("X-PUBLISHED-TTL", f"PT{refresh_hours}H")
+        calendar.add("REFRESH-INTERVAL;VALUE=DURATION", f"PT{refresh_hours}H")
+    tail = b"END:VCALENDAR\r\n"
+    return calendar.to_ical().removesuffix(tail), tail
+
+
 def _calendar(*, name: str | None, method: str | None) -> Calendar:
     calendar = Calendar()
     calendar.add("PRODID", PRODID)
@@ -0,0 +1,263 @@
+"""可选的物化 occurrence 索引：滚动窗口内的只读派生投影。
+
+索引只回答“窗口内有哪些 entity”，payload 仍由 normalized 表实时展开，
+因此索引过期时最多退化为全量展开，而不会返回错误内容。
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta
+from typing import Any, Iterable
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Max, Q, Sum
+from django.utils import timezone
+
+from core.models import (
+    CalendarCollectionVersion,
+    PlannerChangeSet,
+    PlannerOccurrenceIndexEntry,
+    PlannerOccurrenceIndexState,
+)
+from core.planner.recurrence import Occurrence, PlannerTimeCodec
+from logger import logger
+
+
+class PlannerOccurrenceIndex:
+    """按用户维护 [now-90d, now+400d) occurrence 行，供窗口查询先做一次索引范围扫描。"""
+
+    HORIZON_PAST = timedelta(days=90)
+    HORIZON_FUTURE = timedelta(days=400)
+    # 窗口右端剩余不足该值时由 rebuild --stale 整体重建，保证常用查询始终落在窗口内。
+    HORIZON_MIN_FUTURE = timedelta(days=365)
+    ENTITY_TYPES = ('event', 'reminder')
+
+    @staticmethod
+    def enabled() -> bool:
+        return str(getattr(settings, 'PLANNER_OCCURRENCE_INDEX', 'false')).lower() == 'true'
+
+    @classmethod
+    def candidate_ids(
+        cls, user: User, entity_type: str, *, range_start: datetime, range_end: datetime,
+    ) -> set[str] | None:
+        """返回窗口内可能产生 occurrence 的 entity_id；索引不可用或不新鲜时返回 None 交由实时展开。"""
+        if not cls.enabled():
+            return None
+        state = PlannerOccurrenceIndexState.objects.filter(user=user).first()
+        if state is None or state.status != PlannerOccurrenceIndexState.STATUS_READY:
+            return None
+        if range_start < state.horizon_start or range_end > state.horizon_end:
+            return None
+        if cls._collection_version_sum(user) != state.collection_version_sum:
+            return None
+        return set(
+            PlannerOccurrenceIndexEntry.objects.filter(
+                user=user, entity_type=entity_type, start_at__lt=range_end, end_at__gt=range_start,
+            ).values_list('entity_id', flat=True).distinct()
+        )
+
+    @classmethod
+    def sync(cls, user: User) -> None:
+        """Application Service 写入后调用：按 PlannerChangeSet 水位增量刷新受影响 entity。"""
+        if not cls.enabled():
+            return
+        try:
+            cls._sync(user)
+        except Exception as exc:
+            # 索引只是派生投影，刷新失败不能让已提交的写入报错；标记 stale 后读取回退实时展开。
+            logger.warning(f'Planner occurrence index sync failed: user={user.pk} error={exc}')
+            cls.invalidate(user)
+
+    @classmethod
+    def _sync(cls, user: User) -> None:
+        """
+        只做按 entity 的增量刷新；全量重建不在写请求路径上执行。
+
+        尚未构建或无法归因的变更只登记为 stale，读取回退实时展开，
+        由 rebuild_planner_occurrence_index --stale 在请求之外重建。
+        """
+        with transaction.atomic():
+            state = PlannerOccurrenceIndexState.objects.select_for_update().filter(user=user).first()
+            now = timezone.now()
+            if state is None:
+                PlannerOccurrenceIndexState.objects.get_or_create(
+                    user=user, defaults={'status': PlannerOccurrenceIndexState.STATUS_STALE,
+                                         'horizon_start': now, 'horizon_end': now},
+                )
+                return
+            if state.status != PlannerOccurrenceIndexState.STATUS_READY:
+                return
+            change_sets = list(
+                PlannerChangeSet.objects.filter(user=user, pk__gt=state.change_set_watermark)
+                .order_by('pk').values('pk', 'command_type', 'before_payload', 'after_payload')
+            )
+            version_sum = cls._collection_version_sum(user)
+            if not change_sets and version_sum == state.collection_version_sum:
+                return
+            affected = cls._affected_entities(change_sets)
+            if affected is None or not change_sets:
+                # 无法归因的变更（分组删除、回滚恢复等）标记 stale，索引不再被读取，直到重建。
+                cls.invalidate(user)
+                return
+            for entity_type, entity_ids in affected.items():
+                cls._refresh_entities(user, entity_type, entity_ids, state.horizon_start, state.horizon_end)
+            state.change_set_watermark = change_sets[-1]['pk']
+            state.collection_version_sum = version_sum
+            state.save(update_fields={'change_set_watermark', 'collection_version_sum', 'updated_at'})
+
+    @classmethod
+    @transaction.atomic
+    def rebuild(cls, user: User, *, now: datetime | None = None) -> dict[str, Any]:
+        """从 normalized 表重建该用户的全部索引行。"""
+        now = now or timezone.now()
+        horizon_start, horizon_end = now - cls.HORIZON_PAST, now + cls.HORIZON_FUTURE
+        watermark = PlannerChangeSet.objects.filter(user=user).aggregate(value=Max('pk'))['value'] or 0
+        version_sum = cls._collection_version_sum(user)
+        PlannerOccurrenceIndexEntry.objects.filter(user=user).delete()
+        counts = {
+            entity_type: cls._insert_entries(user, entity_type, None, horizon_start, horizon_end)
+            for entity_type in cls.ENTITY_TYPES
+        }
+        PlannerOccurrenceIndexState.objects.update_or_create(
+            user=user,
+            defaults={
+                'status': PlannerOccurrenceIndexState.STATUS_READY,
+                'horizon_start': horizon_start,
+                'horizon_end': horizon_end,
+                'change_set_watermark': watermark,
+                'collection_version_sum': version_sum,
+                'built_at': now,
+            },
+        )
+        logger.info(f'Planner occurrence index rebuilt: user={user.pk} counts={counts}')
+        return {'user_id': user.pk, 'entries': counts, 'horizon': [horizon_start.isoformat(), horizon_end.isoformat()]}
+
+    @classmethod
+    def pending_users(cls):
+        """需要重建的用户：索引已 stale，或窗口右端剩余不足 HORIZON_MIN_FUTURE。"""
+        return User.objects.filter(
+            Q(planner_occurrence_index_state__status=PlannerOccurrenceIndexState.STATUS_STALE)
+            | Q(planner_occurrence_index_state__horizon_end__lt=timezone.now() + cls.HORIZON_MIN_FUTURE)
+        )
+
+    @staticmethod
+    def invalidate(user: User) -> None:
+        """标记索引待重建；读取立即回退实时展开，由 rebuild --stale 在请求之外重建。"""
+        PlannerOccurrenceIndexState.objects.filter(user=user).update(
+            status=PlannerOccurrenceIndexState.STATUS_STALE, updated_at=timezone.now()
+        )
+
+    @classmethod
+    def verify(cls, user: User, *, range_start: datetime, range_end: datetime) -> dict[str, Any]:
+        """比较索引行与实时展开的 occurrence 集，供 parity 命令只读使用。"""
+        differences = []
+        for entity_type in cls.ENTITY_TYPES:
+            indexed = set(
+                PlannerOccurrenceIndexEntry.objects.filter(
+                    user=user, entity_type=entity_type, start_at__lt=range_end, end_at__gt=range_start,
+                ).values_list('entity_id', 'recurrence_id', 'source_version')
+            )
+            live = {
+                (item.ref.entity_id, item.ref.recurrence_id, item.ref.source_version)
+                for item in cls._live_occurrences(user, entity_type, None, range_start, range_end)
+            }
+            differences.extend(
+                {'entity_type': entity_type, 'entity_id': entity_id, 'recurrence_id': recurrence_id,
+                 'source_version': source_version, 'side': 'index_only'}
+                for entity_id, recurrence_id, source_version in sorted(indexed - live)
+            )
+            differences.extend(
+                {'entity_type': entity_type, 'entity_id': entity_id, 'recurrence_id': recurrence_id,
+                 'source_version': source_version, 'side': 'live_only'}
+                for entity_id, recurrence_id, source_version in sorted(live - indexed)
+            )
+        return {'user_id': user.pk, 'difference_count': len(differences), 'differences': differences}
+
+    @classmethod
+    def _refresh_entities(
+        cls, user: User, entity_type: str, entity_ids: set[str], horizon_start: datetime, horizon_end: datetime,
+    ) -> None:
+        if not entity_ids:
+            return
+        PlannerOccurrenceIndexEntry.objects.filter(
+            user=user, entity_type=entity_type, entity_id__in=entity_ids
+        ).delete()
+        cls._insert_entries(user, entity_type, entity_ids, horizon_start, horizon_end)
+
+    @classmethod
+    def _insert_entries(
+        cls, user: User, entity_type: str, entity_ids: set[str] | None, horizon_start: datetime, horizon_end: datetime,
+    ) -> int:
+        occurrences = cls._live_occurrences(user, entity_type, entity_ids, horizon_start, horizon_end)
+        entries = []
+        for item in occurrences:
+            start_at, end_at = cls._utc_range(item)
+            entries.append(PlannerOccurrenceIndexEntry(
+                user=user, entity_type=entity_type, entity_id=item.ref.entity_id,
+                series_id=item.ref.series_id, recurrence_id=item.ref.recurrence_id,
+                start_at=start_at, end_at=end_at, source_version=item.ref.source_version,
+            ))
+        PlannerOccurrenceIndexEntry.objects.bulk_create(entries, batch_size=500)
+        return len(entries)
+
+    @staticmethod
+    def _live_occurrences(
+        user: User, entity_type: str, entity_ids: set[str] | None, range_start: datetime, range_end: datetime,
+    ) -> Iterable[Occurrence]:
+        if entity_type == 'event':
+            from core.planner.repository import PlannerRepository
+
+            return PlannerRepository.list_event_occurrences(
+                user, range_start=range_start, range_end=range_end, event_ids=entity_ids
+            )
+        from core.planner.entities import PlannerEntityQueryService
+
+        return PlannerEntityQueryService.list_reminder_occurrences(
+            user, range_start=range_start, range_end=range_end, reminder_ids=entity_ids
+        )
+
+    @staticmethod
+    def _utc_range(occurrence: Occurrence) -> tuple[datetime, datetime]:
+        """DATE occurrence 的时区在不同读取路径中不完全一致，两侧各放宽一天保证候选集只多不少。"""
+        values = []
+        for value, padding in ((occurrence.start, -timedelta(days=1)), (occurrence.end, timedelta(days=1))):
+            if isinstance(value, datetime):
+                values.append(PlannerTimeCodec.to_utc(value))
+            elif isinstance(value, date):
+                midnight = datetime.combine(value, time.min, tzinfo=PlannerTimeCodec.get_timezone())
+                values.append(PlannerTimeCodec.to_utc(midnight + padding))
+            else:
+                raise TypeError(f'occurrence 边界必须是 date 或 datetime: {value!r}')
+        return values[0], values[1]
+
+    @staticmethod
+    def _affected_entities(change_sets: list[dict[str, Any]]) -> dict[str, set[str]] | None:
+        affected: dict[str, set[str]] = {'event': set(), 'reminder': set()}
+        for change_set in change_sets:
+            command_type = change_set['command_type']
+            if command_type.startswith(('agent.', 'todo.')):
+                # agent.* 是 Recorder 对同一命令的回滚元数据；todo 转 event 另有 event.create 记录。
+                continue
+            if command_type in {'event.split_this_and_future', 'reminder.split_this_and_future'}:
+                # 拆分会截断父 series 并生成新 entity，payload 只记录其中一侧，无法增量归因。
+                return None
+            if command_type.startswith('event.'):
+                for payload in (change_set['before_payload'], change_set['after_payload']):
+                    event_id = (payload or {}).get('event', {}).get('event_id')
+                    if event_id:
+                        affected['event'].add(event_id)
+                continue
+            if command_type.startswith('reminder.'):
+                reminder_id = (change_set['after_payload'] or {}).get('reminder', {}).get('id')
+                if not reminder_id:
+                    return None
+                affected['reminder'].add(reminder_id)
+                continue
+            return None
+        return affected
+
+    @staticmethod
+    def _collection_version_sum(user: User) -> int:
+        return CalendarCollectionVersion.objects.filter(user=user).aggregate(value=Sum('version'))['value'] or 0
@@ -50,7 +50,7 @@ def serialize_occurrence(occurrence: Occurrence) -> dict[str, Any]:
     """输出 occurrence 与复合身份，禁止把虚拟 occurrence 当作实体行。"""
     ref = occurrence.ref
     return {
-        'id': _occurrence_client_id(ref.entity_type, ref.entity_id, ref.series_id, ref.recurrence_id),
+        'id': occurrence_client_id(occurrence),
         'entity_type': ref.entity_type,
         'title': occurrence.payload.get('title', ''),
         'start': _serialize_temporal(occurrence.start),
@@ -75,6 +75,12 @@ def serialize_occurrence(occurrence: Occurrence) -> dict[str, Any]:
     }
 
 
+def occurrence_client_id(occurrence: Occurrence) -> str:
+    """serialize_occurrence 的 id 字段；只需要 id 时（如冲突簇）不必序列化整个 occurrence。"""
+    ref = occurrence.ref
+    return _occurrence_client_id(ref.entity_type, ref.entity_id, ref.series_id, ref.recurrence_id)
+
+
 def _event_range(event):
     if event.is_all_day:
         return event.start_date, event.end_date
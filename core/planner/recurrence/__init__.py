@@ -8,6 +8,7 @@ from .expander import (
     RecurrenceDefinition,
     RecurrenceExpander,
 )
+from .slots import RecurrenceSlotCounter
 
 __all__ = [
     'InvalidRRuleError',
@@ -18,4 +19,5 @@ __all__ = [
     'PlannerTimeError',
     'RecurrenceDefinition',
     'RecurrenceExpander',
+    'RecurrenceSlotCounter',
 ]
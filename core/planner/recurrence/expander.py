@@ -2,9 +2,11 @@
 
 from __future__ import annotations
 
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass, field
 from datetime import date, datetime, timedelta
-from typing import Any, Iterable, Mapping
+from typing import Any, Callable, Hashable, Iterable, Mapping
 
 from dateutil.rrule import rruleset, rrulestr
 
@@ -63,9 +65,49 @@ class Occurrence:
     is_override: bool
 
 
+class CompiledRuleCache:
+    """已编译 rruleset 的有界 LRU；key 含 source_version，系列修改后旧条目自然失效。"""
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[Hashable, rruleset]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compile(self, key: Hashable, signature: Hashable, compile_rule: Callable[[], rruleset]) -> rruleset:
+        """命中时校验定义签名，防止版本号未递增的旁路写入读到旧规则。"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        compiled = compile_rule()
+        with self._lock:
+            self._entries[key] = (signature, compiled)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return compiled
+
+    def info(self) -> dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries), 'maxsize': self.maxsize}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
 class RecurrenceExpander:
     """使用 python-dateutil 的纯函数 recurrence 展开器。"""
 
+    compiled_rules = CompiledRuleCache()
+
     @classmethod
     def expand(
         cls,
@@ -85,26 +127,19 @@ class RecurrenceExpander:
             raise PlannerTimeError('range_start 必须早于 range_end')
 
         is_all_day = isinstance(definition.dtstart, date) and not isinstance(definition.dtstart, datetime)
-        cls._validate_value_types(definition, overrides, is_all_day=is_all_day)
-        canonical = canonicalize_rrule(definition.rrule, dtstart=definition.dtstart, tzid=definition.tzid)
-        rule_start, query_start, query_end = cls._rule_window(
+        overrides = tuple(overrides)
+        recurrence_set = cls.compiled_rules.get_or_compile(
+            (definition.series_id, definition.source_version, definition.tzid),
+            (definition.rrule, definition.dtstart, definition.rdates, definition.exdates),
+            lambda: cls._compile_rule_set(definition, is_all_day=is_all_day),
+        )
+        cls._validate_override_types(definition, overrides, is_all_day=is_all_day)
+        _, query_start, query_end = cls._rule_window(
             definition,
             local_range_start,
             local_range_end,
             is_all_day=is_all_day,
         )
-        recurrence_set = rruleset()
-        recurrence_set.rrule(rrulestr(canonical, dtstart=rule_start))
-        for rdate in definition.rdates:
-            recurrence_set.rdate(cls._to_rule_datetime(rdate, definition.tzid, is_all_day=is_all_day))
-        for recurrence_id in definition.exdates:
-            recurrence_set.exdate(
-                cls._to_rule_datetime(
-                    PlannerTimeCodec.parse_recurrence_id(recurrence_id, tzid=definition.tzid),
-                    definition.tzid,
-                    is_all_day=is_all_day,
-                )
-            )
 
         override_by_id = {override.recurrence_id: override for override in overrides}
         seen_ids: set[str] = set()
@@ -129,6 +164,83 @@ class RecurrenceExpander:
 
         return sorted(occurrences, key=lambda occurrence: cls._sort_key(occurrence.start, definition.tzid))
 
+    @classmethod
+    def _compile_rule_set(cls, definition: RecurrenceDefinition, *, is_all_day: bool) -> rruleset:
+        """与查询窗口无关的部分：校验、canonicalize RRULE 并合并 RDATE/EXDATE。"""
+        cls._validate_definition_types(definition, is_all_day=is_all_day)
+        canonical = canonicalize_rrule(definition.rrule, dtstart=definition.dtstart, tzid=definition.tzid)
+        if is_all_day:
+            rule_start = datetime.combine(definition.dtstart, datetime.min.time())
+        else:
+            rule_start = PlannerTimeCodec.to_local(definition.dtstart, tzid=definition.tzid)
+        recurrence_set = rruleset()
+        recurrence_set.rrule(rrulestr(canonical, dtstart=rule_start))
+        for rdate in definition.rdates:
+            recurrence_set.rdate(cls._to_rule_datetime(rdate, definition.tzid, is_all_day=is_all_day))
+        for recurrence_id in definition.exdates:
+            recurrence_set.exdate(
+                cls._to_rule_datetime(
+                    PlannerTimeCodec.parse_recurrence_id(recurrence_id, tzid=definition.tzid),
+                    definition.tzid,
+                    is_all_day=is_all_day,
+                )
+            )
+        return recurrence_set
+
+    @classmethod
+    def occurrence_bounds(
+        cls,
+        definition: RecurrenceDefinition,
+        *,
+        overrides: Iterable[OccurrenceOverride] = (),
+    ) -> tuple[datetime, datetime | None]:
+        """返回系列全部可能 occurrence 的 UTC [最早开始, 最晚结束)；无终止规则的结束为 None。
+
+        结果只用于数据库窗口裁剪，必须宁宽勿窄：EXDATE 和取消的 override 不收窄边界，
+        全天系列额外向两侧放宽一天以覆盖不同 TZID 的日期换算。
+        """
+        if definition.duration <= timedelta(0):
+            raise PlannerTimeError('重复日程的 duration 必须大于 0')
+        is_all_day = isinstance(definition.dtstart, date) and not isinstance(definition.dtstart, datetime)
+        canonical = canonicalize_rrule(definition.rrule, dtstart=definition.dtstart, tzid=definition.tzid)
+        if is_all_day:
+            rule_start = datetime.combine(definition.dtstart, datetime.min.time())
+        else:
+            rule_start = PlannerTimeCodec.to_local(definition.dtstart, tzid=definition.tzid)
+        starts: list[date | datetime] = [definition.dtstart, *definition.rdates]
+        ends: list[date | datetime] = [
+            cls._add_duration(value, definition.duration, tzid=definition.tzid, is_all_day=is_all_day)
+            for value in definition.rdates
+        ]
+        bounded = any(component.startswith(('COUNT=', 'UNTIL=')) for component in canonical.split(';'))
+        if bounded:
+            last_slot = None
+            for last_slot in rrulestr(canonical, dtstart=rule_start):
+                pass
+            base = cls._from_rule_datetime(last_slot, definition.tzid, is_all_day=is_all_day) if last_slot else definition.dtstart
+            ends.append(cls._add_duration(base, definition.duration, tzid=definition.tzid, is_all_day=is_all_day))
+        for override in overrides:
+            if override.kind == 'cancelled':
+                continue
+            base_start = PlannerTimeCodec.parse_recurrence_id(override.recurrence_id, tzid=definition.tzid)
+            effective_start = override.effective_start if override.effective_start is not None else base_start
+            starts.append(effective_start)
+            ends.append(
+                override.effective_end
+                if override.effective_end is not None
+                else cls._add_duration(base_start, definition.duration, tzid=definition.tzid, is_all_day=is_all_day)
+            )
+
+        padding = timedelta(days=1) if is_all_day else timedelta(0)
+        earliest = min(cls._sort_key(value, definition.tzid) for value in starts) - padding
+        latest = None
+        if bounded:
+            latest = max(cls._sort_key(value, definition.tzid) for value in ends) + padding
+        return (
+            PlannerTimeCodec.to_utc(earliest),
+            PlannerTimeCodec.to_utc(latest) if latest is not None else None,
+        )
+
     @classmethod
     def _rule_window(
         cls,
@@ -234,30 +346,34 @@ class RecurrenceExpander:
     def _sort_key(cls, value: date | datetime, tzid: str) -> datetime:
         return PlannerTimeCodec.recurrence_datetime(value, tzid=tzid)
 
+    @staticmethod
+    def _is_date_value(value: date | datetime) -> bool:
+        return isinstance(value, date) and not isinstance(value, datetime)
+
     @classmethod
-    def _validate_value_types(
+    def _validate_definition_types(cls, definition: RecurrenceDefinition, *, is_all_day: bool) -> None:
+        """RFC 5545 要求 RDATE/EXDATE 与 DTSTART 类型一致。"""
+        for value in definition.rdates:
+            if cls._is_date_value(value) != is_all_day:
+                raise PlannerTimeError('RDATE 类型必须与 DTSTART 一致')
+        for recurrence_id in definition.exdates:
+            value = PlannerTimeCodec.parse_recurrence_id(recurrence_id, tzid=definition.tzid)
+            if cls._is_date_value(value) != is_all_day:
+                raise PlannerTimeError('EXDATE 类型必须与 DTSTART 一致')
+
+    @classmethod
+    def _validate_override_types(
         cls,
         definition: RecurrenceDefinition,
         overrides: Iterable[OccurrenceOverride],
         *,
         is_all_day: bool,
     ) -> None:
-        """RFC 5545 要求 RDATE/EXDATE/RECURRENCE-ID 与 DTSTART 类型一致。"""
-
-        def is_date_value(value: date | datetime) -> bool:
-            return isinstance(value, date) and not isinstance(value, datetime)
-
-        for value in definition.rdates:
-            if is_date_value(value) != is_all_day:
-                raise PlannerTimeError('RDATE 类型必须与 DTSTART 一致')
-        for recurrence_id in definition.exdates:
-            value = PlannerTimeCodec.parse_recurrence_id(recurrence_id, tzid=definition.tzid)
-            if is_date_value(value) != is_all_day:
-                raise PlannerTimeError('EXDATE 类型必须与 DTSTART 一致')
+        """override 随请求变化不进入编译缓存，RECURRENCE-ID 类型每次校验。"""
         for override in overrides:
             value = PlannerTimeCodec.parse_recurrence_id(override.recurrence_id, tzid=definition.tzid)
-            if is_date_value(value) != is_all_day:
+            if cls._is_date_value(value) != is_all_day:
                 raise PlannerTimeError('RECURRENCE-ID 类型必须与 DTSTART 一致')
             for effective in (override.effective_start, override.effective_end):
-                if effective is not None and is_date_value(effective) != is_all_day:
+                if effective is not None and cls._is_date_value(effective) != is_all_day:
                     raise PlannerTimeError('override 时间类型必须与 DTSTART 一致')
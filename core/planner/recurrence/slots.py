@@ -0,0 +1,158 @@
+"""RRULE 槽位计数与成员判断，不为单个槽位枚举整条规则。"""
+
+from __future__ import annotations
+
+import calendar
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Final
+
+from dateutil.rrule import rrulestr
+
+
+_STEP_SECONDS: Final[dict[str, int]] = {'DAILY': 86400, 'HOURLY': 3600, 'MINUTELY': 60, 'SECONDLY': 1}
+_WEEKDAYS: Final[tuple[str, ...]] = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+_CLOSED_FORM_KEYS: Final[frozenset[str]] = frozenset({'FREQ', 'INTERVAL', 'COUNT', 'UNTIL', 'WKST', 'BYDAY'})
+_UNTIL_RE: Final[re.Pattern[str]] = re.compile(r'^(\d{8})(?:T(\d{6})(Z)?)?$')
+_TICK: Final[timedelta] = timedelta(microseconds=1)
+
+
+@dataclass(frozen=True)
+class _ClosedFormRule:
+    """第 n 个实例 = origin + (n + skipped) // len(offsets) 个 period + 对应 offset（墙上时间算术，与 dateutil 一致）。"""
+
+    origin: datetime
+    period: timedelta
+    offsets: tuple[timedelta, ...]
+    skipped: int
+    count: int | None
+    until: datetime | None
+
+    def nth(self, index: int) -> datetime | None:
+        period_index, slot = divmod(index + self.skipped, len(self.offsets))
+        try:
+            return self.origin + self.period * period_index + self.offsets[slot]
+        except OverflowError:
+            return None
+
+    def count_before(self, limit: datetime) -> int:
+        """小于 limit 的实例数：按墙上时间估算下标，再用与 dateutil 相同的比较修正边界。"""
+        total = self._raw_count_before(limit)
+        if self.until is not None:
+            total = min(total, self._raw_count_before(self.until + _TICK))
+        if self.count is not None:
+            total = min(total, self.count)
+        return total
+
+    def _raw_count_before(self, limit: datetime) -> int:
+        wall_limit = limit
+        if limit.tzinfo is not None and self.origin.tzinfo is not None and limit.tzinfo is not self.origin.tzinfo:
+            wall_limit = limit.astimezone(self.origin.tzinfo)
+        elapsed = wall_limit.replace(tzinfo=None) - self.origin.replace(tzinfo=None)
+        periods = elapsed // self.period
+        remainder = elapsed - self.period * periods
+        estimate = periods * len(self.offsets) + sum(1 for offset in self.offsets if offset < remainder)
+        index = max(estimate - self.skipped, 0)
+        while index > 0 and not self._is_before(index - 1, limit):
+            index -= 1
+        while self._is_before(index, limit):
+            index += 1
+        return index
+
+    def _is_before(self, index: int, limit: datetime) -> bool:
+        value = self.nth(index)
+        return value is not None and value < limit
+
+
+class RecurrenceSlotCounter:
+    """split/truncate 使用的槽位计数：简单 FREQ/INTERVAL/BYDAY 规则走闭式计算，其余规则流式迭代 dateutil。"""
+
+    @classmethod
+    def count_before(cls, rule: str, *, dtstart: datetime, anchor: datetime) -> int:
+        """返回严格早于 anchor 的 RRULE 实例数（不含 RDATE/EXDATE）。"""
+        closed_form = cls._closed_form(rule, dtstart)
+        if closed_form is not None:
+            return closed_form.count_before(anchor)
+        total = 0
+        for item in rrulestr(rule, dtstart=dtstart):
+            if item >= anchor:
+                break
+            total += 1
+        return total
+
+    @classmethod
+    def contains(cls, rule: str, *, dtstart: datetime, value: datetime) -> bool:
+        """value 是否恰为 RRULE 的一个实例。"""
+        closed_form = cls._closed_form(rule, dtstart)
+        if closed_form is not None:
+            return closed_form.count_before(value + _TICK) > closed_form.count_before(value)
+        for item in rrulestr(rule, dtstart=dtstart):
+            if item >= value:
+                return item == value
+        return False
+
+    @classmethod
+    def _closed_form(cls, rule: str, dtstart: datetime) -> _ClosedFormRule | None:
+        """规则可用闭式计算时返回参数；含其他 BY* 规则、多行或无法确认与 dateutil 等价的写法时返回 None。"""
+        raw = rule.strip()
+        if raw.upper().startswith('RRULE:'):
+            raw = raw[6:]
+        if not raw or '\n' in raw or ':' in raw:
+            return None
+        parts: dict[str, str] = {}
+        for component in raw.rstrip(';').split(';'):
+            key, separator, value = component.partition('=')
+            key = key.strip().upper()
+            if not separator or key not in _CLOSED_FORM_KEYS or key in parts:
+                return None
+            parts[key] = value.strip().upper()
+        frequency = parts.get('FREQ')
+        if frequency != 'WEEKLY' and (frequency not in _STEP_SECONDS or 'BYDAY' in parts):
+            return None
+        try:
+            interval = int(parts.get('INTERVAL', '1'))
+            count = int(parts['COUNT']) if 'COUNT' in parts else None
+        except ValueError:
+            return None
+        if interval < 1 or (count is not None and count < 1):
+            return None
+        until = None
+        if 'UNTIL' in parts:
+            until = cls._parse_until(parts['UNTIL'], aware=dtstart.tzinfo is not None)
+            if until is None:
+                return None
+
+        dtstart = dtstart.replace(microsecond=0)
+        if frequency != 'WEEKLY':
+            return _ClosedFormRule(
+                origin=dtstart, period=timedelta(seconds=_STEP_SECONDS[frequency] * interval),
+                offsets=(timedelta(0),), skipped=0, count=count, until=until,
+            )
+
+        wkst = parts.get('WKST', _WEEKDAYS[calendar.firstweekday()])
+        weekdays = parts['BYDAY'].split(',') if 'BYDAY' in parts else [_WEEKDAYS[dtstart.weekday()]]
+        if wkst not in _WEEKDAYS or not all(day in _WEEKDAYS for day in weekdays):
+            return None
+        week_start = _WEEKDAYS.index(wkst)
+        origin = dtstart - timedelta(days=(dtstart.weekday() - week_start) % 7)
+        offsets = tuple(sorted({timedelta(days=(_WEEKDAYS.index(day) - week_start) % 7) for day in weekdays}))
+        return _ClosedFormRule(
+            origin=origin, period=timedelta(weeks=interval), offsets=offsets,
+            skipped=sum(1 for offset in offsets if origin + offset < dtstart), count=count, until=until,
+        )
+
+    @staticmethod
+    def _parse_until(value: str, *, aware: bool) -> datetime | None:
+        """只接受 dateutil 在同类 DTSTART 下会原样接受的 UNTIL；其余交给 dateutil 处理或报错。"""
+        match = _UNTIL_RE.fullmatch(value)
+        if match is None:
+            return None
+        day, clock, utc = match.groups()
+        try:
+            parsed = datetime.strptime(day + (clock or '000000'), '%Y%m%d%H%M%S')
+        except ValueError:
+            return None
+        if utc:
+            return parsed.replace(tzinfo=timezone.utc) if aware else None
+        return None if aware else parsed
@@ -73,7 +73,7 @@ class PlannerRepository:
         range_end: datetime,
         event_ids: set[str] | None = None,
     ) -> list[EventDefinitionProjection]:
-        """返回与窗口相关的单次 event 和全部可展开 recurrence master。"""
+        """返回与窗口相关的单次 event 和 occurrence 窗口与查询区间相交的 recurrence master。"""
         cls._validate_range(range_start, range_end)
         singles_queryset = CalendarEvent.objects.filter(user=user, deleted_at__isnull=True, recurrence_series__isnull=True)
         if event_ids is not None:
@@ -89,6 +89,7 @@ class PlannerRepository:
 
         series_queryset = (
             EventRecurrenceSeries.objects.filter(user=user, deleted_at__isnull=True, master_event__deleted_at__isnull=True)
+            .filter(cls._series_window_filter(range_start, range_end))
             .select_related('master_event', 'master_event__group')
             .prefetch_related(
                 'master_event__share_links__share_group',
@@ -118,9 +119,53 @@ class PlannerRepository:
     @classmethod
     def list_all_event_definitions(cls, user: User) -> list[EventDefinitionProjection]:
         """返回用户全部 active Event 定义，供 Feed/CalDAV collection 使用。"""
+        return cls._event_definitions(user, single_filter=Q(), series_filter=Q())
+
+    @classmethod
+    def find_event_definitions_by_resource(cls, user: User, names: Iterable[str]) -> list[EventDefinitionProjection]:
+        """按 CalDAV resource 名或 UID 走唯一索引只投影命中的 event/series，顺序与全量列表一致。"""
+        names = set(names)
+        return cls._event_definitions(
+            user,
+            single_filter=Q(caldav_resource_name__in=names) | Q(ical_uid__in=names),
+            series_filter=Q(caldav_resource_name__in=names) | Q(ical_uid__in=names),
+        )
+
+    @classmethod
+    def list_event_definitions_with_occurrences(
+        cls,
+        user: User,
+        *,
+        range_start: datetime,
+        range_end: datetime,
+        single_filter: Q = Q(),
+        series_filter: Q = Q(),
+    ) -> list[EventDefinitionProjection]:
+        """只投影在窗口内确有 occurrence 的定义；时间窗与调用方条件一起下推到 SQL，只展开候选 series。"""
+        cls._validate_range(range_start, range_end)
+        projections = cls._event_definitions(
+            user,
+            single_filter=single_filter & cls._event_overlap_filter(range_start, range_end),
+            series_filter=series_filter & cls._series_window_filter(range_start, range_end),
+        )
+        return [
+            projection for projection in projections
+            if (
+                cls._occurrence_overlaps(cls._single_occurrence(projection.event), range_start, range_end)
+                if projection.recurrence is None
+                else RecurrenceExpander.expand(
+                    projection.recurrence, range_start=range_start, range_end=range_end,
+                    overrides=projection.overrides,
+                )
+            )
+        ]
+
+    @classmethod
+    def _event_definitions(cls, user: User, *, single_filter: Q, series_filter: Q) -> list[EventDefinitionProjection]:
         singles = list(
             CalendarEvent.objects.filter(user=user, deleted_at__isnull=True)
             .filter(Q(recurrence_series__isnull=True) | Q(recurrence_series__deleted_at__isnull=False))
+            .filter(single_filter)
             .select_related('group')
             .prefetch_related('share_links__share_group')
             .order_by('start_at', 'start_date', 'id')
@@ -128,6 +173,7 @@ class PlannerRepository:
         projections = [EventDefinitionProjection(event=event, recurrence=None, overrides=()) for event in singles]
         series_queryset = (
             EventRecurrenceSeries.objects.filter(user=user, deleted_at__isnull=True, master_event__deleted_at__isnull=True)
+            .filter(series_filter)
             .select_related('master_event', 'master_event__group')
             .prefetch_related(
                 'master_event__share_links__share_group',
@@ -178,6 +224,15 @@ class PlannerRepository:
             )
         return sorted(occurrences, key=lambda item: cls._occurrence_start(item))
 
+    @classmethod
+    def series_occurrence_window(cls, series: EventRecurrenceSeries) -> tuple[datetime, datetime | None]:
+        """计算 series 可能产生 occurrence 的 UTC 窗口，供命令写入后回填反规范化字段。"""
+        overrides = series.overrides.filter(deleted_at__isnull=True)
+        return RecurrenceExpander.occurrence_bounds(
+            cls._to_recurrence_definition(series),
+            overrides=tuple(cls._to_override(item) for item in overrides),
+        )
+
     @staticmethod
     def search_event_candidate_ids(user: User, query: str) -> set[str]:
         """先在数据库筛 master/override 文本，再仅展开候选 series。"""
@@ -295,6 +350,14 @@ class PlannerRepository:
             | Q(is_all_day=True, start_date__lt=range_end.date(), end_date__gt=range_start.date())
         )
 
+    @staticmethod
+    def _series_window_filter(range_start: datetime, range_end: datetime) -> Q:
+        # 尚未回填窗口的 series（迁移导入等旁路写入）保守地全部参与展开。
+        return Q(occurrence_window_start__isnull=True) | (
+            Q(occurrence_window_start__lt=range_end)
+            & (Q(occurrence_window_end__isnull=True) | Q(occurrence_window_end__gt=range_start))
+        )
+
     @classmethod
     def _occurrence_overlaps(cls, occurrence: Occurrence, range_start: datetime, range_end: datetime) -> bool:
         start = cls._occurrence_start(occurrence)
@@ -2,7 +2,11 @@
 
 from __future__ import annotations
 
+from contextlib import contextmanager
+from contextvars import ContextVar
 from dataclasses import dataclass
+from itertools import count
+from typing import Any, Iterator
 
 from django.conf import settings
 from django.contrib.auth.models import User
@@ -10,6 +14,20 @@ from django.contrib.auth.models import User
 from core.models import PlannerCohortAssignment, PlannerMigrationIssue, PlannerMigrationState
 
 
+# 请求内准入记忆：(user_id, admission_version) -> {'assignment', 'verified_clean'}；作用域外为 None，不做任何缓存。
+_ACCESS_SCOPE: ContextVar[dict[tuple[int, int], dict[str, Any]] | None] = ContextVar(
+    'planner_access_scope', default=None
+)
+# 本进程内 cohort/迁移状态写入的单调版本；跨进程变更由“仅在单个请求内记忆”兜底。
+_ADMISSION_VERSIONS: dict[int, int] = {}
+_VERSION_SEQUENCE = count(1)
+
+
+def bump_admission_version(sender, instance, **kwargs) -> None:
+    """PlannerCohortAssignment/MigrationState/MigrationIssue 的 post_save/post_delete 接收器。"""
+    _ADMISSION_VERSIONS[instance.user_id] = next(_VERSION_SEQUENCE)
+
+
 @dataclass(frozen=True)
 class PlannerStorageDecision:
     """一次入口判定的无副作用结果。"""
@@ -63,10 +81,24 @@ class PlannerRolloutPolicy:
         ENTRYPOINT_COURSE_IMPORT,
     )
 
+    @staticmethod
+    @contextmanager
+    def request_scope() -> Iterator[None]:
+        """在一次请求内记忆准入判定；嵌套进入时复用外层作用域。"""
+        if _ACCESS_SCOPE.get() is not None:
+            yield
+            return
+        token = _ACCESS_SCOPE.set({})
+        try:
+            yield
+        finally:
+            _ACCESS_SCOPE.reset(token)
+
     @classmethod
     def browser_entrypoint_payload(cls, user: User) -> dict[str, dict[str, object]]:
         """Return the single source of truth used by both HTML and bootstrap API."""
-        decisions = {name: cls.decide(user, name) for name in cls.BROWSER_ENTRYPOINTS}
+        with cls.request_scope():
+            decisions = {name: cls.decide(user, name) for name in cls.BROWSER_ENTRYPOINTS}
         return {
             name: {
                 'mode': decision.effective_mode,
@@ -95,7 +127,8 @@ class PlannerRolloutPolicy:
         if global_mode == 'legacy':
             return PlannerStorageDecision(global_mode, 'legacy', 'global_legacy')
 
-        assignment = PlannerCohortAssignment.objects.filter(user=user, deleted_at__isnull=True).first()
+        admission = cls._admission(user)
+        assignment = admission['assignment']
         if assignment is None:
             return PlannerStorageDecision(global_mode, 'blocked', 'user_not_assigned')
         if str((assignment.metadata or {}).get('p6_disposition', '')).startswith('retired-test-data'):
@@ -104,16 +137,39 @@ class PlannerRolloutPolicy:
             return PlannerStorageDecision(global_mode, 'blocked', 'entrypoint_not_assigned')
         if assignment.storage_mode == 'legacy':
             return PlannerStorageDecision(global_mode, 'blocked', 'assignment_legacy')
-        if not cls.is_verified_clean(user):
+        if not cls._admission_verified_clean(user, admission):
             return PlannerStorageDecision(global_mode, 'blocked', 'migration_not_verified_clean')
         if global_mode == 'shadow' or assignment.storage_mode == 'shadow':
             return PlannerStorageDecision(global_mode, 'shadow', 'verified_shadow_assignment')
         return PlannerStorageDecision(global_mode, 'normalized', 'verified_normalized_assignment')
 
-    @staticmethod
-    def is_verified_clean(user: User) -> bool:
+    @classmethod
+    def is_verified_clean(cls, user: User) -> bool:
         """Runtime admission uses sealed cohort state and never reads legacy JSON."""
-        assignment = PlannerCohortAssignment.objects.filter(user=user, deleted_at__isnull=True).first()
+        return cls._admission_verified_clean(user, cls._admission(user))
+
+    @classmethod
+    def _admission_verified_clean(cls, user: User, admission: dict[str, Any]) -> bool:
+        if admission['verified_clean'] is None:
+            admission['verified_clean'] = cls._is_verified_clean(user, admission['assignment'])
+        return admission['verified_clean']
+
+    @staticmethod
+    def _admission(user: User) -> dict[str, Any]:
+        scope = _ACCESS_SCOPE.get()
+        key = (user.pk, _ADMISSION_VERSIONS.get(user.pk, 0))
+        if scope is not None and key in scope:
+            return scope[key]
+        admission = {
+            'assignment': PlannerCohortAssignment.objects.filter(user=user, deleted_at__isnull=True).first(),
+            'verified_clean': None,
+        }
+        if scope is not None:
+            scope[key] = admission
+        return admission
+
+    @staticmethod
+    def _is_verified_clean(user: User, assignment: PlannerCohortAssignment | None) -> bool:
         manifest = (assignment.metadata or {}).get('p6_cutover_manifest') if assignment else None
         if manifest:
             if manifest.get('schema') != 1 or not isinstance(manifest.get('sources'), list):
@@ -12,11 +12,13 @@ from uuid import UUID, uuid4
 
 from django.apps import apps
 from django.db import models, transaction
+from django.db.models import Max
 from django.utils import timezone
 
 from agent_service.models import AgentRollbackWindow, AgentTransaction
 from core.models import CalendarCollectionVersion, PlannerChangeSet, PlannerRollbackSnapshot
 from core.planner.context import PlannerExecutionContext
+from core.planner.occurrence_index import PlannerOccurrenceIndex
 
 
 MODEL_LABELS = (
@@ -121,10 +123,24 @@ def _user_querysets(user):
     return {label: _model(label)._base_manager.filter(**filters[label]) for label in MODEL_LABELS}
 
 
-def _all_keys(user) -> set[str]:
+def _high_water_marks() -> dict[str, int]:
+    """各模型当前最大主键；走主键索引，与账号数据量无关。"""
+    return {
+        label: _model(label)._base_manager.aggregate(value=Max('pk'))['value'] or 0
+        for label in MODEL_LABELS
+    }
+
+
+def _created_keys(user, marks: dict[str, int]) -> set[str]:
+    """自增主键只增不减，操作后主键高于水位且属于该用户的行就是本次新建行。
+
+    先只按主键范围取新行再校验归属；直接带用户条件时 SQLite 会从用户索引出发扫描整个账号。
+    """
     result = set()
     for label, queryset in _user_querysets(user).items():
-        result.update(f'{label}:{pk}' for pk in queryset.values_list('pk', flat=True))
+        candidates = list(_model(label)._base_manager.filter(pk__gt=marks[label]).values_list('pk', flat=True))
+        if candidates:
+            result.update(f'{label}:{pk}' for pk in queryset.filter(pk__in=candidates).values_list('pk', flat=True))
     return result
 
 
@@ -236,13 +252,12 @@ class PlannerSnapshotRecorder:
         ).exists():
             raise PlannerSnapshotError('tool_call_id 已记录，拒绝重复执行')
 
-        before_keys = _all_keys(context.user)
+        marks = _high_water_marks()
         aggregate_before_keys = _aggregate_keys(context.user, resource_type, resource_id)
         before_rows = _rows_for_keys(context.user, aggregate_before_keys)
         result = operation()
         final_resource_id = result_resource_id(result) or resource_id
-        after_all_keys = _all_keys(context.user)
-        created_keys = after_all_keys - before_keys
+        created_keys = _created_keys(context.user, marks)
         tracked_keys = aggregate_before_keys | created_keys | _aggregate_keys(context.user, resource_type, final_resource_id)
         after_rows = _rows_for_keys(context.user, tracked_keys)
         payload_object = {
@@ -364,7 +379,9 @@ class PlannerRollbackCoordinator:
         for collection in CalendarCollectionVersion.objects.select_for_update().filter(user=context.user):
             collection.version += 1
             collection.sync_token = str(uuid4())
-            collection.save(update_fields={'version', 'sync_token', 'updated_at'})
+            # 回滚直接恢复行而不写 CalendarChange，旧 sync-token 无法增量描述，只能全量重同步。
+            collection.pruned_through = collection.version
+            collection.save(update_fields={'version', 'sync_token', 'pruned_through', 'updated_at'})
         change_set.rollback_status = 'reverted'
         change_set.is_reverted = True
         change_set.reverted_at = timezone.now()
@@ -373,4 +390,6 @@ class PlannerRollbackCoordinator:
         agent_transaction.is_rolled_back = True
         agent_transaction.save(update_fields={'state', 'is_rolled_back'})
         snapshot.delete()
+        # 回滚直接恢复行且不产生新的 changeset，occurrence 索引无法增量归因，只能标记重建。
+        PlannerOccurrenceIndex.invalidate(context.user)
         return change_set
@@ -0,0 +1,87 @@
+"""待办依赖图：一次查询载入用户的依赖边，可达性、拓扑序与关键路径都在内存中计算。"""
+
+from __future__ import annotations
+
+import heapq
+from typing import Iterable, Mapping
+
+from django.contrib.auth.models import User
+
+from core.models import TodoDependency
+
+
+class TodoDependencyGraph:
+    """以 Todo 主键为节点的邻接表；边 todo → depends_on 表示 todo 需在 depends_on 之后完成。"""
+
+    def __init__(self, edges: Iterable[tuple[int, int]], nodes: Iterable[int] = ()):
+        self.prerequisites: dict[int, set[int]] = {node: set() for node in nodes}
+        self.dependents: dict[int, set[int]] = {node: set() for node in self.prerequisites}
+        for todo_pk, depends_on_pk in edges:
+            self.prerequisites.setdefault(todo_pk, set()).add(depends_on_pk)
+            self.prerequisites.setdefault(depends_on_pk, set())
+            self.dependents.setdefault(depends_on_pk, set()).add(todo_pk)
+            self.dependents.setdefault(todo_pk, set())
+
+    @classmethod
+    def load(cls, user: User, *, active_only: bool = False, nodes: Iterable[int] = ()) -> 'TodoDependencyGraph':
+        """一次查询载入该用户全部依赖边；环检测需包含已软删除 todo 上残留的边，展示用途传 active_only。"""
+        edges = TodoDependency.objects.filter(todo__user=user)
+        if active_only:
+            edges = edges.filter(todo__deleted_at__isnull=True, depends_on__deleted_at__isnull=True)
+        return cls(edges.values_list('todo_id', 'depends_on_id'), nodes)
+
+    def reaches(self, start: int, target: int) -> bool:
+        """沿 depends_on 方向能否从 start 走到 target。"""
+        return start == target or target in self._walk(start, self.prerequisites)
+
+    def ancestors(self, node: int) -> set[int]:
+        """node 直接或间接依赖的全部 todo。"""
+        return self._walk(node, self.prerequisites)
+
+    def descendants(self, node: int) -> set[int]:
+        """直接或间接依赖 node 的全部 todo。"""
+        return self._walk(node, self.dependents)
+
+    def topological_order(self) -> tuple[list[int], set[int]]:
+        """Kahn 拓扑序（被依赖者在前，同层按主键稳定排序）；另返回位于环上或环下游、无法排序的节点。"""
+        remaining = {node: len(prerequisites) for node, prerequisites in self.prerequisites.items()}
+        ready = [node for node, count in remaining.items() if count == 0]
+        heapq.heapify(ready)
+        order: list[int] = []
+        while ready:
+            node = heapq.heappop(ready)
+            order.append(node)
+            for dependent in self.dependents.get(node, ()):
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    heapq.heappush(ready, dependent)
+        return order, set(self.prerequisites) - set(order)
+
+    def critical_path(self, order: list[int], durations: Mapping[int, int]) -> tuple[dict[int, int], list[int]]:
+        """按拓扑序计算每个节点的最早完成时间（秒）与耗时最长的依赖链，链从最早的前置开始。"""
+        finish: dict[int, int] = {}
+        previous: dict[int, int | None] = {}
+        for node in order:
+            before = max(self.prerequisites[node], key=lambda item: (finish[item], -item), default=None)
+            finish[node] = durations.get(node, 0) + (finish[before] if before is not None else 0)
+            previous[node] = before
+        if not finish:
+            return finish, []
+        node: int | None = max(finish, key=lambda item: (finish[item], -item))
+        path: list[int] = []
+        while node is not None:
+            path.append(node)
+            node = previous[node]
+        return finish, path[::-1]
+
+    @staticmethod
+    def _walk(start: int, adjacency: Mapping[int, set[int]]) -> set[int]:
+        seen: set[int] = set()
+        pending = list(adjacency.get(start, ()))
+        while pending:
+            current = pending.pop()
+            if current in seen:
+                continue
+            seen.add(current)
+            pending.extend(adjacency.get(current, ()))
+        return seen
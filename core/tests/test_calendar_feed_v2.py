@@ -1,8 +1,12 @@
+import gzip
 import hashlib
 from datetime import datetime, timedelta
+from unittest import mock
 
 from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from icalendar import Calendar
 from rest_framework.authtoken.models import Token
@@ -14,9 +18,13 @@ from core.models import (
     PlannerCohortAssignment,
     PlannerMigrationState,
     Reminder,
+    ReminderOccurrenceState,
     Todo,
     UserData,
 )
+from core.planner.application import PlannerApplicationService
+from core.planner.calendar_projection import NormalizedCalendarProjectionService
+from core.planner.feed_cache import CalendarFeedCache
 from core.planner.commands import PlannerCommandService
 from core.planner.entities import PlannerEntityCommandService
 
@@ -24,6 +32,7 @@ from core.planner.entities import PlannerEntityCommandService
 @override_settings(PLANNER_STORAGE_MODE="normalized")
 class CalendarFeedV2Tests(TestCase):
     def setUp(self):
+        PlannerApplicationService.feed_cache.clear()
         self.user = User.objects.create_user(username="feed-v2", password="secret")
         self.token = Token.objects.create(user=self.user)
         source = UserData.objects.create(
@@ -72,10 +81,11 @@ class CalendarFeedV2Tests(TestCase):
             "recurrence": {"rrule": "FREQ=DAILY;COUNT=2"},
         })
 
-    def _feed(self, feed_type="all"):
+    def _feed(self, feed_type="all", **headers):
         return self.client.get(
             "/api/calendar/feed/",
             {"token": self.token.key, "type": feed_type},
+            **headers,
         )
 
     @staticmethod
@@ -131,6 +141,90 @@ class CalendarFeedV2Tests(TestCase):
         )
         self.assertEqual(UserData.objects.get(user=self.user, key="events").value, source_before)
 
+    def test_feed_etag_conditional_get_and_encoded_cache(self):
+        first = self._feed()
+        self.assertEqual(first.status_code, 200)
+        etag = first["ETag"]
+        self.assertTrue(etag.startswith('"feed-'))
+        self.assertIn("Accept-Encoding", first["Vary"])
+
+        with mock.patch.object(
+            PlannerApplicationService, "build_calendar_feed", side_effect=AssertionError("rebuilt")
+        ):
+            not_modified = self._feed(HTTP_IF_NONE_MATCH=etag)
+            cached = self._feed()
+            compressed = self._feed(HTTP_ACCEPT_ENCODING="gzip, deflate")
+            gzip_not_modified = self._feed(
+                HTTP_IF_NONE_MATCH=compressed["ETag"], HTTP_ACCEPT_ENCODING="gzip"
+            )
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b"")
+        self.assertEqual(not_modified["ETag"], etag)
+        self.assertEqual((cached.content, cached["ETag"]), (first.content, etag))
+        self.assertEqual(compressed["Content-Encoding"], "gzip")
+        self.assertNotEqual(compressed["ETag"], etag)
+        self.assertEqual(gzip.decompress(compressed.content), first.content)
+        self.assertEqual(gzip_not_modified.status_code, 304)
+        self.assertNotEqual(self._feed("events")["ETag"], etag)
+
+        PlannerCommandService.create_event(self.user, {
+            "title": "新增课程", "start": "2026-07-20T10:00:00+08:00", "end": "2026-07-20T11:00:00+08:00",
+        })
+        changed = self._feed(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], etag)
+        self.assertIn("新增课程", changed.content.decode())
+
+    def test_feed_gzip_negotiation_honours_qvalues_and_304_etag_matches_representation(self):
+        identity = self._feed()
+        refused = self._feed(HTTP_ACCEPT_ENCODING="gzip;q=0, identity")
+        wildcard = self._feed(HTTP_ACCEPT_ENCODING="br;q=1.0, *;q=0.5")
+        self.assertFalse(refused.has_header("Content-Encoding"))
+        self.assertEqual((refused.content, refused["ETag"]), (identity.content, identity["ETag"]))
+        self.assertEqual(wildcard["Content-Encoding"], "gzip")
+
+        # 重启或淘汰后缓存为空：gzip 客户端的 304 只查版本，不构建 Feed，且返回 gzip 表示的 ETag
+        PlannerApplicationService.feed_cache.clear()
+        with mock.patch.object(
+            PlannerApplicationService, "build_calendar_feed", side_effect=AssertionError("rebuilt")
+        ):
+            revalidated = self._feed(HTTP_IF_NONE_MATCH=wildcard["ETag"], HTTP_ACCEPT_ENCODING="gzip")
+            identity_revalidated = self._feed(HTTP_IF_NONE_MATCH=identity["ETag"])
+        self.assertEqual((revalidated.status_code, revalidated["ETag"]), (304, wildcard["ETag"]))
+        self.assertEqual((identity_revalidated.status_code, identity_revalidated["ETag"]), (304, identity["ETag"]))
+
+    def test_feed_cache_evicts_least_recently_used_entries_by_size(self):
+        cache = CalendarFeedCache(max_bytes=1200)
+        payloads = {
+            key: CalendarFeedCache.compress(f'"feed-{key}"', bytes(range(256)))
+            for key in ("a", "b", "c")
+        }
+        cache.put("a", payloads["a"])
+        cache.put("b", payloads["b"])
+        self.assertIsNotNone(cache.get("a", '"feed-a"'))
+        cache.put("c", payloads["c"])
+        self.assertIsNone(cache.get("b", '"feed-b"'))
+        self.assertIsNotNone(cache.get("a", '"feed-a"'))
+        self.assertIsNone(cache.get("a", '"feed-stale"'))
+        self.assertLessEqual(cache.info()["bytes"], 1200)
+
+    def test_reminder_projection_query_count_is_independent_of_reminder_count(self):
+        with CaptureQueriesContext(connection) as baseline:
+            NormalizedCalendarProjectionService.reminder_resources(self.user)
+        for index in range(5):
+            reminder = PlannerEntityCommandService.create_reminder(self.user, {
+                "title": f"批量提醒{index}",
+                "trigger": "2026-07-17T08:00:00+08:00",
+                "recurrence": {"rrule": "FREQ=DAILY;COUNT=3"},
+            })
+            ReminderOccurrenceState.objects.create(
+                series=reminder.recurrence_series, recurrence_id="20260718T080000", status="dismissed"
+            )
+        with self.assertNumQueries(len(baseline.captured_queries)):
+            resources = NormalizedCalendarProjectionService.reminder_resources(self.user)
+        self.assertEqual(len(resources), 6)
+        self.assertEqual(sum(len(item.overrides) for item in resources), 5)
+
     def test_auth_parameters_and_unassigned_user_cannot_fallback(self):
         self.assertEqual(self.client.get("/api/calendar/feed/").status_code, 400)
         self.assertEqual(self.client.get("/api/calendar/feed/", {"token": "bad"}).status_code, 403)
@@ -1,8 +1,10 @@
 import hashlib
 from datetime import datetime, timedelta
+from io import StringIO
 from unittest.mock import patch
 
 from django.contrib.auth.models import User
+from django.core.management import call_command
 from django.test import TestCase, override_settings
 from django.utils import timezone
 from rest_framework.test import APIClient
@@ -10,6 +12,7 @@ from rest_framework.test import APIClient
 from core.models import CalendarEvent, PlannerChangeSet, PlannerCohortAssignment, PlannerMigrationState, UserData
 from core.planner.application import PlannerApplicationAccessError, PlannerApplicationService
 from core.planner.context import PlannerExecutionContext
+from core.planner.occurrence_index import PlannerOccurrenceIndex
 from core.planner.repository import PlannerNotFoundError
 from core.planner.rollout import PlannerRolloutPolicy
 
@@ -127,3 +130,63 @@ class PlannerApplicationServiceTests(TestCase):
         self.assertEqual(response.json(), expected)
         delegated.assert_called_once()
 
+
+    @override_settings(PLANNER_OCCURRENCE_INDEX="true")
+    def test_occurrence_index_narrows_window_reads_and_follows_writes(self):
+        user = self._verified_user("occurrence-index-user")
+        context = self._context(user)
+        base = timezone.now().replace(microsecond=0) + timedelta(days=10)
+        wide_start, wide_end = base - timedelta(days=30), base + timedelta(days=30)
+        near = PlannerApplicationService.create_event(
+            context,
+            {"title": "近期", "start": base.isoformat(), "end": (base + timedelta(hours=1)).isoformat()},
+            range_start=wide_start, range_end=wide_end,
+        )["event"]
+        far = PlannerApplicationService.create_event(
+            context,
+            {
+                "title": "远期",
+                "start": (base + timedelta(days=20)).isoformat(),
+                "end": (base + timedelta(days=20, hours=1)).isoformat(),
+            },
+            range_start=wide_start, range_end=wide_end,
+        )["event"]
+        window = {"range_start": base - timedelta(days=1), "range_end": base + timedelta(days=1)}
+
+        # 写请求不做全量构建：首次写入只登记待建，读取回退实时展开，由 --stale 命令在请求之外构建
+        self.assertIsNone(PlannerOccurrenceIndex.candidate_ids(user, "event", **window))
+        self.assertEqual(list(PlannerOccurrenceIndex.pending_users()), [user])
+        with patch.object(PlannerOccurrenceIndex, "rebuild", wraps=PlannerOccurrenceIndex.rebuild) as rebuild:
+            PlannerApplicationService.list_event_occurrences(context, **window)
+        rebuild.assert_not_called()
+        call_command("rebuild_planner_occurrence_index", "--stale", stdout=StringIO())
+        self.assertEqual(list(PlannerOccurrenceIndex.pending_users()), [])
+
+        self.assertEqual(
+            PlannerOccurrenceIndex.candidate_ids(user, "event", **window), {near["event_id"]}
+        )
+        self.assertEqual(
+            [item["occurrence_ref"]["entity_id"] for item in PlannerApplicationService.list_event_occurrences(context, **window)["occurrences"]],
+            [near["event_id"]],
+        )
+
+        PlannerApplicationService.patch_event(
+            context, far["event_id"],
+            {"start": (base + timedelta(hours=3)).isoformat(), "end": (base + timedelta(hours=4)).isoformat()},
+            scope="all", occurrence_ref=None, expected_version=far["version"],
+        )
+        self.assertEqual(
+            PlannerOccurrenceIndex.candidate_ids(user, "event", **window), {near["event_id"], far["event_id"]}
+        )
+        self.assertEqual(PlannerOccurrenceIndex.verify(user, **window)["difference_count"], 0)
+
+        # 无法归因的变更只标记 stale，不在写请求中重建
+        with patch.object(PlannerOccurrenceIndex, "_affected_entities", return_value=None), \
+                patch.object(PlannerOccurrenceIndex, "rebuild") as rebuild:
+            PlannerApplicationService.patch_event(
+                context, near["event_id"], {"title": "近期（改）"},
+                scope="all", occurrence_ref=None, expected_version=near["version"],
+            )
+        rebuild.assert_not_called()
+        self.assertIsNone(PlannerOccurrenceIndex.candidate_ids(user, "event", **window))
+        self.assertEqual(PlannerApplicationService.list_event_occurrences(context, **window)["count"], 2)
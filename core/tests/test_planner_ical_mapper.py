@@ -11,6 +11,7 @@ from core.planner.ical import (
     decode_event_resource,
     encode_event_resource,
     encode_feed_calendar,
+    encoded_components,
 )
 
 
@@ -28,6 +29,7 @@ class PlannerICalendarMapperTests(SimpleTestCase):
             "end": datetime(2026, 7, 13, 11, tzinfo=ZoneInfo("Asia/Shanghai")),
             "updated_at": datetime(2026, 7, 13, 1, tzinfo=timezone.utc),
             "version": 3,
+            "owner_id": 1,
         }
         values.update(overrides)
         return IcalEventResource(**values)
@@ -113,6 +115,57 @@ END:VCALENDAR\r
         self.assertIn("BEGIN:VTIMEZONE", text)
         self.assertIn("BEGIN:VALARM", text)
 
+    def test_feed_reuses_encoded_components_and_matches_whole_calendar_bytes(self):
+        from core.planner.ical import _calendar, build_event_components
+
+        encoded_components.clear()
+        events = (
+            self.resource(revision_token="e3"),
+            self.resource(
+                entity_id="event-2", ical_uid="evt-event-2@unischeduler", resource_name="event-2",
+                revision_token="e1-s1-o", rrule="FREQ=WEEKLY;COUNT=3",
+            ),
+        )
+        expected = _calendar(name="UniScheduler - test", method="PUBLISH")
+        expected.add("X-PUBLISHED-TTL", "PT1H")
+        expected.add("REFRESH-INTERVAL;VALUE=DURATION", "PT1H")
+        for resource in events:
+            for component in build_event_components(resource):
+                expected.add_component(component)
+
+        first = encode_feed_calendar(name="UniScheduler - test", events=events)
+        second = encode_feed_calendar(name="UniScheduler - test", events=events)
+
+        self.assertEqual(first, expected.to_ical())
+        self.assertEqual(second, first)
+        self.assertEqual(encoded_components.info()["misses"], 2)
+        self.assertEqual(encoded_components.info()["hits"], 2)
+        self.assertEqual(decode_event_resource(encode_event_resource(events[0])).uid, events[0].ical_uid)
+        self.assertEqual(encoded_components.info()["hits"], 3)
+
+        # 新 revision 或 Feed 标题前缀都是新的 key，旧字节不会被复用。
+        renamed = encode_feed_calendar(name="UniScheduler - test", events=(self.resource(revision_token="e3", title="[课程] 数学"),))
+        self.assertIn("SUMMARY:[课程] 数学", renamed.decode())
+        self.assertEqual(encoded_components.info()["misses"], 3)
+
+    def test_encoded_components_are_not_shared_between_owners_with_same_identity(self):
+        encoded_components.clear()
+        # 两个用户各自导入同一邀请：entity_id、UID、标题、revision 全部相同，只有 owner 与地点不同。
+        first = self.resource(revision_token="e3", owner_id=1, location="用户一的会议室")
+        second = self.resource(revision_token="e3", owner_id=2, location="用户二的会议室")
+
+        first_text = encode_feed_calendar(name="UniScheduler - a", events=(first,)).decode()
+        second_text = encode_feed_calendar(name="UniScheduler - b", events=(second,)).decode()
+
+        self.assertIn("LOCATION:用户一的会议室", first_text)
+        self.assertIn("LOCATION:用户二的会议室", second_text)
+        self.assertNotIn("用户一", second_text)
+        self.assertEqual(encoded_components.info()["misses"], 2)
+
+        # 没有 owner 的 DTO 不进入跨用户共享的缓存
+        encode_feed_calendar(name="UniScheduler - c", events=(self.resource(revision_token="e3", owner_id=None),))
+        self.assertEqual(encoded_components.info()["size"], 2)
+
     def test_mapper_has_no_orm_dependency(self):
         with patch("django.db.backends.utils.CursorWrapper._execute", side_effect=AssertionError("unexpected DB access")):
             encode_event_resource(self.resource())
@@ -0,0 +1,91 @@
+"""槽位计数闭式路径与 dateutil 逐项枚举的等价性测试。"""
+
+import random
+import unittest
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from dateutil.rrule import rrulestr
+
+from core.planner.recurrence.slots import RecurrenceSlotCounter
+
+
+WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+STEP_SECONDS = {'SECONDLY': 1, 'MINUTELY': 60, 'HOURLY': 3600, 'DAILY': 86400, 'WEEKLY': 7 * 86400}
+# 含有 DST 的时区用于确认闭式路径沿用 dateutil 的墙上时间算术与比较语义。
+ZONES = (None, ZoneInfo('Asia/Shanghai'), ZoneInfo('America/New_York'), timezone.utc)
+
+
+def random_case(rng: random.Random) -> tuple[str, datetime, int]:
+    """随机生成一条 RRULE、DTSTART 与一个周期长度（秒）。"""
+    tz = rng.choice(ZONES)
+    frequency = rng.choice(tuple(STEP_SECONDS))
+    dtstart = datetime(
+        2026, rng.randint(1, 12), rng.randint(1, 28), rng.randint(0, 23), rng.choice((0, 15, 30)),
+        rng.choice((0, 0, 30)), tzinfo=tz,
+    )
+    parts = [f'FREQ={frequency}']
+    if rng.random() < 0.6:
+        parts.append(f'INTERVAL={rng.randint(1, 5)}')
+    if frequency == 'WEEKLY' and rng.random() < 0.7:
+        parts.append('BYDAY=' + ','.join(rng.sample(WEEKDAYS, rng.randint(1, 4))))
+    if frequency == 'WEEKLY' and rng.random() < 0.4:
+        parts.append('WKST=' + rng.choice(WEEKDAYS))
+    step = STEP_SECONDS[frequency]
+    bound = rng.random()
+    if bound < 0.35:
+        parts.append(f'COUNT={rng.randint(1, 60)}')
+    elif bound < 0.7:
+        until = dtstart + timedelta(seconds=step * rng.randint(-2, 80) + rng.choice((0, 1, -1, 37)))
+        if tz is None:
+            parts.append('UNTIL=' + until.strftime('%Y%m%dT%H%M%S'))
+        else:
+            parts.append('UNTIL=' + until.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ'))
+    return ';'.join(parts), dtstart, step
+
+
+class RecurrenceSlotCounterPropertyTests(unittest.TestCase):
+    """固定种子的随机规则：计数与成员判断必须与 dateutil 完全一致。"""
+
+    def test_count_and_membership_match_dateutil_for_random_rules(self):
+        rng = random.Random(20260315)
+        for _ in range(400):
+            rule, dtstart, step = random_case(rng)
+            reference = rrulestr(rule, dtstart=dtstart)
+            instances = list(reference[:120])
+            for _ in range(5):
+                anchor = dtstart + timedelta(seconds=step * rng.randint(-2, 90) + rng.choice((0, 0, 1, -1, 3601)))
+                if instances and rng.random() < 0.5:
+                    anchor = rng.choice(instances)
+                if dtstart.tzinfo is not None and rng.random() < 0.2:
+                    anchor = anchor.astimezone(timezone.utc)
+                with self.subTest(rule=rule, dtstart=dtstart, anchor=anchor):
+                    expected = len([item for item in reference.between(dtstart, anchor, inc=True) if item < anchor])
+                    self.assertEqual(
+                        RecurrenceSlotCounter.count_before(rule, dtstart=dtstart, anchor=anchor), expected,
+                    )
+                    self.assertEqual(
+                        RecurrenceSlotCounter.contains(rule, dtstart=dtstart, value=anchor),
+                        bool(reference.between(anchor, anchor, inc=True)),
+                    )
+
+    def test_rules_outside_closed_form_fall_back_to_streaming_dateutil(self):
+        dtstart = datetime(2026, 3, 2, 9, tzinfo=ZoneInfo('Asia/Shanghai'))
+        rule = 'FREQ=MONTHLY;BYDAY=MO;BYSETPOS=1;COUNT=12'
+        reference = list(rrulestr(rule, dtstart=dtstart))
+
+        self.assertIsNone(RecurrenceSlotCounter._closed_form(rule, dtstart))
+        self.assertEqual(RecurrenceSlotCounter.count_before(rule, dtstart=dtstart, anchor=reference[7]), 7)
+        self.assertTrue(RecurrenceSlotCounter.contains(rule, dtstart=dtstart, value=reference[7]))
+        self.assertFalse(RecurrenceSlotCounter.contains(rule, dtstart=dtstart, value=reference[7] + timedelta(days=1)))
+
+    def test_minutely_series_is_counted_without_enumerating_years_of_slots(self):
+        dtstart = datetime(2020, 1, 1, tzinfo=ZoneInfo('Asia/Shanghai'))
+        anchor = datetime(2030, 1, 1, 0, 5, tzinfo=ZoneInfo('Asia/Shanghai'))
+
+        self.assertIsNotNone(RecurrenceSlotCounter._closed_form('FREQ=MINUTELY;INTERVAL=5', dtstart))
+        self.assertEqual(
+            RecurrenceSlotCounter.count_before('FREQ=MINUTELY;INTERVAL=5', dtstart=dtstart, anchor=anchor),
+            (anchor - dtstart) // timedelta(minutes=5),
+        )
+        self.assertTrue(RecurrenceSlotCounter.contains('FREQ=MINUTELY;INTERVAL=5', dtstart=dtstart, value=anchor))
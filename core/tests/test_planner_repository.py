@@ -15,6 +15,7 @@ from core.models import (
     EventRecurrenceExDate,
     EventRecurrenceSeries,
 )
+from core.planner.commands import PlannerCommandService
 from core.planner.repository import PlannerRepository, PlannerVersionConflictError
 
 
@@ -85,6 +86,32 @@ class PlannerRepositoryTests(TestCase):
         self.assertEqual(counts_before['overrides'], EventOccurrenceOverride.objects.count())
         self.assertEqual(single.event_id, occurrences[0].ref.entity_id)
 
+    def test_finished_series_is_pruned_by_persisted_occurrence_window(self):
+        finished = PlannerCommandService.create_event(self.user, {
+            'title': '已结课程',
+            'start': self.start.isoformat(),
+            'end': self.end.isoformat(),
+            'recurrence': {'rrule': 'FREQ=WEEKLY;COUNT=3'},
+        })
+        ongoing = PlannerCommandService.create_event(self.user, {
+            'title': '长期周会',
+            'start': self.start.isoformat(),
+            'end': self.end.isoformat(),
+            'recurrence': {'rrule': 'FREQ=WEEKLY'},
+        })
+        finished_series = EventRecurrenceSeries.objects.get(master_event=finished)
+        ongoing_series = EventRecurrenceSeries.objects.get(master_event=ongoing)
+
+        definitions = PlannerRepository.list_event_definitions(
+            self.user,
+            range_start=self.start + timedelta(days=60),
+            range_end=self.start + timedelta(days=67),
+        )
+
+        self.assertEqual(finished_series.occurrence_window_end, self.end + timedelta(days=14))
+        self.assertIsNone(ongoing_series.occurrence_window_end)
+        self.assertEqual([item.event.event_id for item in definitions], [ongoing.event_id])
+
     def test_version_gate_and_soft_delete_use_the_model_version(self):
         event = CalendarEvent.objects.create(
             user=self.user,
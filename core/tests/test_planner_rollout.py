@@ -63,3 +63,54 @@ class PlannerRolloutPolicyTests(TestCase):
         decision = PlannerRolloutPolicy.decide(self.user, 'web_calendar')
         self.assertEqual(decision.effective_mode, 'normalized')
         self.assertEqual(decision.reason, 'verified_normalized_assignment')
+
+
+@override_settings(PLANNER_STORAGE_MODE='normalized')
+class PlannerAccessScopeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='planner-scope-user', password='test-password')
+        self.assignment = PlannerCohortAssignment.objects.create(
+            user=self.user,
+            storage_mode=PlannerCohortAssignment.MODE_NORMALIZED,
+            entrypoints={name: {'mode': 'normalized'} for name in PlannerRolloutPolicy.ALL_ENTRYPOINTS},
+        )
+
+    def test_request_scope_memoizes_admission_until_state_changes(self):
+        with PlannerRolloutPolicy.request_scope():
+            self.assertEqual(PlannerRolloutPolicy.decide(self.user, 'api_v2').effective_mode, 'normalized')
+            with self.assertNumQueries(0):
+                payload = PlannerRolloutPolicy.browser_entrypoint_payload(self.user)
+                PlannerRolloutPolicy.decide(self.user, 'caldav_read')
+            self.assertTrue(all(item['can_write_normalized'] for item in payload.values()))
+
+            issue = PlannerMigrationIssue.objects.create(user=self.user, source_key='events', code='unresolved')
+            decision = PlannerRolloutPolicy.decide(self.user, 'api_v2')
+            self.assertEqual((decision.effective_mode, decision.reason), ('blocked', 'migration_not_verified_clean'))
+            issue.delete()
+            self.assertEqual(PlannerRolloutPolicy.decide(self.user, 'api_v2').effective_mode, 'normalized')
+
+            self.assignment.metadata = {'p6_disposition': 'retired-test-data-scope'}
+            self.assignment.save(update_fields=['metadata'])
+            decision = PlannerRolloutPolicy.decide(self.user, 'api_v2')
+            self.assertEqual((decision.effective_mode, decision.reason), ('quarantined', 'retired_quarantine'))
+
+    def test_decisions_outside_scope_are_not_memoized(self):
+        PlannerRolloutPolicy.decide(self.user, 'api_v2')
+        with self.assertNumQueries(3):
+            PlannerRolloutPolicy.decide(self.user, 'api_v2')
+
+    def test_blocked_and_quarantined_users_keep_stable_http_denials(self):
+        self.client.force_login(self.user)
+        path = '/api/v2/events/occurrences/?from=2026-01-01&to=2026-02-01'
+        self.assertEqual(self.client.get(path).status_code, 200)
+
+        PlannerMigrationIssue.objects.create(user=self.user, source_key='events', code='unresolved')
+        blocked = self.client.get(path)
+        self.assertEqual(blocked.status_code, 409)
+        self.assertEqual(blocked.json()['reason'], 'migration_not_verified_clean')
+
+        self.assignment.metadata = {'p6_disposition': 'retired-test-data-scope'}
+        self.assignment.save(update_fields=['metadata'])
+        quarantined = self.client.get(path)
+        self.assertEqual(quarantined.status_code, 423)
+        self.assertEqual(quarantined.json()['code'], 'planner_retired_quarantine')
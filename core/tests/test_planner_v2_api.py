@@ -2,6 +2,7 @@
 
 import hashlib
 from datetime import datetime, timedelta
+from unittest import mock
 
 from django.contrib.auth.models import User
 from django.test import TestCase, override_settings
@@ -195,6 +196,47 @@ class PlannerV2ApiTests(TestCase):
         ids = {item['occurrence_ref']['entity_id'] for item in response.json()['conflicts'][0]['items']}
         self.assertEqual(ids, {'first', 'overlap'})
 
+    def test_conflict_detector_groups_clusters_and_pages_pairs(self):
+        self._mark_verified()
+        for index, event_id in enumerate(('a', 'b', 'c')):
+            CalendarEvent.objects.create(
+                user=self.user, event_id=event_id, title=event_id,
+                start_at=self.start + timedelta(minutes=10 * index), end_at=self.end,
+            )
+        for event_id in ('later-1', 'later-2'):
+            CalendarEvent.objects.create(
+                user=self.user, event_id=event_id, title=event_id,
+                start_at=self.start + timedelta(hours=5), end_at=self.end + timedelta(hours=5),
+            )
+
+        first = self.client.get('/api/v2/events/conflicts/?from=2026-03-01&to=2026-03-02&limit=3')
+        second = self.client.get('/api/v2/events/conflicts/?from=2026-03-01&to=2026-03-02&limit=3&cursor=3')
+        invalid = self.client.get('/api/v2/events/conflicts/?from=2026-03-01&to=2026-03-02&limit=0')
+
+        self.assertEqual(first.status_code, 200, first.content)
+        self.assertEqual(first.json()['count'], 4)
+        self.assertEqual(first.json()['next_cursor'], 3)
+        self.assertEqual(
+            [sorted(item['occurrence_ref']['entity_id'] for item in pair['items']) for pair in first.json()['conflicts']],
+            [['a', 'b'], ['a', 'c'], ['b', 'c']],
+        )
+        self.assertEqual(
+            [(len(item['occurrence_ids']), item['pair_count']) for item in first.json()['clusters']], [(3, 3), (2, 1)]
+        )
+        self.assertEqual(len(second.json()['conflicts']), 1)
+        self.assertIsNone(second.json()['next_cursor'])
+        self.assertEqual(invalid.status_code, 400)
+
+        # 簇内 id 不依赖完整序列化；只有当前页冲突对中的 occurrence 被序列化
+        from core.planner import conflicts
+        with mock.patch.object(conflicts, 'serialize_occurrence', wraps=conflicts.serialize_occurrence) as serialized:
+            single = self.client.get('/api/v2/events/conflicts/?from=2026-03-01&to=2026-03-02&limit=1')
+        self.assertEqual(serialized.call_count, 2)
+        self.assertEqual(single.json()['clusters'], first.json()['clusters'])
+        self.assertEqual(
+            first.json()['clusters'][1]['occurrence_ids'], ['event:later-1', 'event:later-2'],
+        )
+
     def test_create_and_patch_single_event_use_versioned_normalized_command(self):
         self._mark_verified()
         create = self.client.post(
@@ -15,6 +15,7 @@ from core.models import (
     TodoDependency,
     UserData,
 )
+from core.planner.todo_graph import TodoDependencyGraph
 
 
 @override_settings(PLANNER_STORAGE_MODE='normalized')
@@ -80,6 +81,37 @@ class PlannerV2EntityApiTests(TestCase):
         self.assertEqual(CalendarEvent.objects.filter(user=self.user).count(), 1)
         self.assertEqual(Todo.objects.get(todo_id=first_id).status, 'completed')
 
+    def test_dependency_cycle_check_loads_the_graph_once_and_graph_view_reports_critical_path(self):
+        chain = [
+            Todo.objects.create(user=self.user, todo_id=f'chain-{index:02d}', title=f'步骤 {index}', estimated_duration_seconds=600)
+            for index in range(40)
+        ]
+        side = Todo.objects.create(user=self.user, todo_id='side', title='旁支', estimated_duration_seconds=60)
+        TodoDependency.objects.bulk_create(
+            [TodoDependency(todo=later, depends_on=earlier) for earlier, later in zip(chain, chain[1:])]
+            + [TodoDependency(todo=side, depends_on=chain[0])]
+        )
+
+        with self.assertNumQueries(1):
+            self.assertTrue(TodoDependencyGraph.load(self.user).reaches(chain[-1].pk, chain[0].pk))
+        cycle = self.client.patch(
+            f'/api/v2/todos/{chain[0].todo_id}/',
+            {'expected_version': chain[0].version, 'dependencies': [chain[-1].todo_id]},
+            format='json',
+        )
+        graph = self.client.get('/api/v2/todos/dependency-graph/', {'todo_id': chain[1].todo_id})
+
+        self.assertEqual(cycle.status_code, 422, cycle.content)
+        self.assertEqual(cycle.json()['code'], 'todo_dependency_cycle')
+        self.assertEqual(graph.status_code, 200, graph.content)
+        body = graph.json()
+        self.assertEqual(body['order'][:2], ['chain-00', 'chain-01'])
+        self.assertEqual(body['cyclic'], [])
+        self.assertEqual(body['critical_path'], [todo.todo_id for todo in chain])
+        self.assertEqual(body['ancestors'], ['chain-00'])
+        self.assertEqual(body['descendants'], [todo.todo_id for todo in chain[2:]])
+        self.assertEqual(len(body['edges']), 40)
+
     def test_recurring_reminder_reads_do_not_materialize_states_and_action_is_sparse(self):
         create = self.client.post(
             '/api/v2/reminders/',
@@ -1,6 +1,7 @@
 """纯 recurrence 展开器的表驱动契约测试。"""
 
 import unittest
+from dataclasses import replace
 from datetime import date, datetime, timedelta
 from zoneinfo import ZoneInfo
 
@@ -210,3 +211,38 @@ class RecurrenceExpanderTests(unittest.TestCase):
         )
 
         self.assertEqual([item.start for item in occurrences], [date(2027, 5, 1), date(2027, 5, 2), date(2027, 5, 3)])
+
+    def test_occurrence_bounds_cover_terminated_rules_and_moved_overrides(self):
+        moved = OccurrenceOverride(
+            recurrence_id='20260302T090000',
+            kind='modified',
+            effective_start=at(20, 14),
+            effective_end=at(20, 15),
+        )
+
+        start, end = RecurrenceExpander.occurrence_bounds(self.definition, overrides=(moved,))
+        unbounded_start, unbounded_end = RecurrenceExpander.occurrence_bounds(
+            RecurrenceDefinition(
+                entity_type='event', entity_id='open', series_id='open',
+                dtstart=at(1), duration=timedelta(hours=1), rrule='FREQ=WEEKLY',
+            )
+        )
+
+        self.assertEqual(start, at(1).astimezone(ZoneInfo('UTC')))
+        self.assertEqual(end, at(20, 15).astimezone(ZoneInfo('UTC')))
+        self.assertEqual(unbounded_start, at(1).astimezone(ZoneInfo('UTC')))
+        self.assertIsNone(unbounded_end)
+
+    def test_compiled_rule_cache_hits_until_source_version_changes(self):
+        RecurrenceExpander.compiled_rules.clear()
+
+        RecurrenceExpander.expand(self.definition, range_start=at(1), range_end=at(2))
+        RecurrenceExpander.expand(self.definition, range_start=at(2), range_end=at(4))
+        bumped = replace(self.definition, rrule='FREQ=DAILY;COUNT=2', source_version=4)
+        occurrences = RecurrenceExpander.expand(bumped, range_start=at(1), range_end=at(6))
+
+        self.assertEqual(len(occurrences), 2)
+        self.assertEqual(
+            {key: RecurrenceExpander.compiled_rules.info()[key] for key in ('hits', 'misses')},
+            {'hits': 1, 'misses': 2},
+        )
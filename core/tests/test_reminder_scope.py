@@ -2,14 +2,18 @@ import hashlib
 from datetime import datetime, timedelta
 
 from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 from core.models import (
-    PlannerCohortAssignment, PlannerMigrationState, ReminderRecurrenceSeries, UserData,
+    PlannerCohortAssignment, PlannerMigrationState, Reminder, ReminderOccurrenceState,
+    ReminderRecurrenceSeries, UserData,
 )
 from core.planner.application import PlannerApplicationService
 from core.planner.context import PlannerExecutionContext
+from core.planner.entities import PlannerEntityCommandService, PlannerEntityQueryService
 from core.planner.rollout import PlannerRolloutPolicy
 
 
@@ -203,3 +207,60 @@ class ReminderScopeTests(TestCase):
             {'from': self.start.isoformat(), 'to': (self.start + timedelta(days=5)).isoformat()},
         ).json()['occurrences']
         self.assertEqual([item['title'] for item in after], ['API提醒', 'API单次修改', 'API提醒'])
+
+
+class ReminderOccurrenceQueryTests(TestCase):
+    """reminder occurrence 查询数不随 series 数增长，且已结束 series 按窗口裁剪。"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='reminder-occurrence-queries')
+        self.start = timezone.make_aware(datetime(2026, 7, 13, 10))
+
+    def _bulk_series(self, count: int, *, offset: int = 0) -> None:
+        reminders = Reminder.objects.bulk_create([
+            Reminder(user=self.user, title=f'提醒{offset + index}', trigger_at=self.start)
+            for index in range(count)
+        ])
+        series_rows = ReminderRecurrenceSeries.objects.bulk_create([
+            ReminderRecurrenceSeries(
+                user=self.user, series_id=f'bulk-{offset + index}', master_reminder=reminder,
+                rrule='FREQ=DAILY;COUNT=3', rrule_canonical='COUNT=3;FREQ=DAILY',
+                dtstart_at=self.start, tzid='Asia/Shanghai',
+            )
+            for index, reminder in enumerate(reminders)
+        ])
+        ReminderOccurrenceState.objects.bulk_create([
+            ReminderOccurrenceState(series=series, recurrence_id='20260714T100000', status='dismissed')
+            for series in series_rows
+        ])
+
+    def _list(self):
+        return PlannerEntityQueryService.list_reminder_occurrences(
+            self.user, range_start=self.start - timedelta(days=1), range_end=self.start + timedelta(days=5)
+        )
+
+    def test_query_count_is_constant_for_1_100_and_1000_series(self):
+        self._bulk_series(1)
+        with CaptureQueriesContext(connection) as baseline:
+            self.assertEqual(len(self._list()), 2)
+        created = 1
+        for total in (100, 1000):
+            self._bulk_series(total - created, offset=created)
+            created = total
+            with self.subTest(series=total), self.assertNumQueries(len(baseline.captured_queries)):
+                self.assertEqual(len(self._list()), total * 2)
+
+    def test_finished_series_is_pruned_by_persisted_window(self):
+        reminder = PlannerEntityCommandService.create_reminder(self.user, {
+            'title': '已结束', 'trigger': self.start.isoformat(), 'recurrence': {'rrule': 'FREQ=DAILY;COUNT=2'},
+        })
+        series = ReminderRecurrenceSeries.objects.get(master_reminder=reminder)
+        self.assertEqual(series.occurrence_window_start, self.start)
+        self.assertEqual(series.occurrence_window_end, self.start + timedelta(days=1, seconds=1))
+
+        later = PlannerEntityQueryService.list_reminder_occurrences(
+            self.user, range_start=self.start + timedelta(days=3), range_end=self.start + timedelta(days=10)
+        )
+        self.assertEqual(later, [])
+        ReminderRecurrenceSeries.objects.filter(pk=series.pk).update(occurrence_window_start=None)
+        self.assertEqual(len(self._list()), 2)
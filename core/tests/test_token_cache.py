@@ -0,0 +1,68 @@
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+
+from core.token_cache import TokenUserCache, token_users
+
+
+class TokenUserCacheTests(TestCase):
+    def setUp(self):
+        token_users.clear()
+        self.user = User.objects.create_user(username='token-cache-user', password='password')
+        self.token = Token.objects.create(user=self.user)
+
+    def test_hit_path_does_not_query_and_invalid_tokens_are_not_cached(self):
+        self.assertEqual(token_users.resolve(self.token.key), self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(token_users.resolve(self.token.key), self.user)
+        self.assertIsNone(token_users.resolve('not-a-token'))
+        self.assertIsNone(token_users.resolve(''))
+        info = token_users.info()
+        self.assertEqual((info['hits'], info['misses'], info['size']), (1, 2, 1))
+
+    def test_each_resolve_returns_an_independent_user(self):
+        first = token_users.resolve(self.token.key)
+        first.first_name = '请求内修改'
+        with self.assertNumQueries(0):
+            second = token_users.resolve(self.token.key)
+            third = token_users.resolve(self.token.key)
+        self.assertIsNot(second, first)
+        self.assertIsNot(third, second)
+        self.assertEqual(second.first_name, '')
+        self.assertFalse(second._state.adding)
+        self.assertEqual((second.pk, second.username), (self.user.pk, self.user.username))
+
+    def test_token_deletion_rotation_and_user_changes_invalidate_immediately(self):
+        token_users.resolve(self.token.key)
+        old_key = self.token.key
+        self.token.delete()
+        rotated = Token.objects.create(user=self.user)
+        self.assertIsNone(token_users.resolve(old_key))
+        self.assertEqual(token_users.resolve(rotated.key), self.user)
+
+        self.user.username = 'token-cache-renamed'
+        self.user.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(token_users.resolve(rotated.key).username, 'token-cache-renamed')
+
+    def test_entries_expire_after_ttl_and_size_is_bounded(self):
+        cache = TokenUserCache(maxsize=2, ttl_seconds=60)
+        with patch('core.token_cache.time.monotonic', return_value=1000.0):
+            cache.resolve(self.token.key)
+        with patch('core.token_cache.time.monotonic', return_value=1061.0), self.assertNumQueries(1):
+            cache.resolve(self.token.key)
+
+        others = [
+            Token.objects.create(user=User.objects.create_user(username=f'token-cache-{index}')) for index in range(3)
+        ]
+        for token in others:
+            cache.resolve(token.key)
+        self.assertEqual(cache.info()['size'], 2)
+
+    def test_caldav_rejects_deleted_token_without_waiting_for_ttl(self):
+        headers = {'HTTP_AUTHORIZATION': f'Token {self.token.key}', 'HTTP_DEPTH': '0'}
+        self.assertNotEqual(self.client.generic('PROPFIND', '/caldav/', **headers).status_code, 401)
+        self.token.delete()
+        self.assertEqual(self.client.generic('PROPFIND', '/caldav/', **headers).status_code, 401)
@@ -0,0 +1,107 @@
+"""
+API Token → User 认证缓存
+
+MCP HTTP、日历订阅 Feed 与 CalDAV 的 Token 认证共用同一个进程内缓存：
+- 有界 LRU + TTL，不缓存无效 Token，内存不随攻击者尝试的随机 Token 增长；
+- Token 删除/轮换、User 修改/删除通过 signal 立即失效本进程条目；
+- 其他进程（如独立运行的 mcp_server.py）收不到本进程的 signal，依靠 TTL 收敛，因此 TTL 应保持较短；
+- 缓存的是 User 行的字段值快照，每次命中都构建新的 User 实例，请求修改或保存 request.user 不会影响其他请求。
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from rest_framework.authtoken.models import Token
+
+
+class TokenUserCache:
+    """按 Token key 缓存已认证 User 行快照的有界 LRU；条目过期后回源数据库重新校验。"""
+
+    def __init__(self, maxsize: int = 10000, ttl_seconds: float = 60):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        # key -> (过期时间, user_id, 数据库别名, 字段值元组)
+        self._entries: OrderedDict[str, tuple[float, int, str, tuple]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._field_names = [field.attname for field in User._meta.concrete_fields]
+
+    @classmethod
+    def from_settings(cls) -> 'TokenUserCache':
+        return cls(
+            maxsize=int(getattr(settings, 'AUTH_TOKEN_CACHE_MAX_ENTRIES', 10000)),
+            ttl_seconds=float(getattr(settings, 'AUTH_TOKEN_CACHE_TTL_SECONDS', 60)),
+        )
+
+    def resolve(self, key: str) -> User | None:
+        """命中且未过期时只做一次字典查找；否则查询 Token 表，仅缓存有效 Token。"""
+        if not key:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                _expires, _user_id, db, values = entry
+                return User.from_db(db, self._field_names, values)
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+        token = Token.objects.select_related('user').filter(key=key).first()
+        if token is None:
+            return None
+        user = token.user
+        values = tuple(getattr(user, name) for name in self._field_names)
+        with self._lock:
+            self._entries[key] = (now + self.ttl_seconds, user.pk, user._state.db, values)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return user
+
+    def invalidate_key(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry[1] == user_id]:
+                del self._entries[key]
+
+    def info(self) -> dict[str, int | float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits, 'misses': self.misses, 'size': len(self._entries), 'maxsize': self.maxsize,
+                'ttl_seconds': self.ttl_seconds, 'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+token_users = TokenUserCache.from_settings()
+
+
+def resolve_token_user(key: str) -> User | None:
+    return token_users.resolve(key)
+
+
+def invalidate_token(sender, instance, **kwargs) -> None:
+    """Token post_save/post_delete：轮换会删除旧 key，新建 key 本来就不在缓存中。"""
+    token_users.invalidate_key(instance.key)
+
+
+def invalidate_token_user(sender, instance, **kwargs) -> None:
+    """User 修改（改名、停用、改密码）或删除后，该用户的缓存 User 对象不再可信。"""
+    token_users.invalidate_user(instance.pk)
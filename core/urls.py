@@ -77,6 +77,7 @@ urlpatterns = [
     path('api/v2/groups/', views_planner_v2.groups_v2, name='v2_planner_groups'),
     path('api/v2/groups/<str:group_id>/', views_planner_v2.group_command_v2, name='v2_planner_group_command'),
     path('api/v2/todos/', views_planner_v2.todos_v2, name='v2_planner_todos'),
+    path('api/v2/todos/dependency-graph/', views_planner_v2.todo_dependency_graph_v2, name='v2_planner_todo_dependency_graph'),
     path('api/v2/todos/<str:todo_id>/', views_planner_v2.todo_command_v2, name='v2_planner_todo_command'),
     path('api/v2/todos/<str:todo_id>/convert/', views_planner_v2.convert_todo_v2, name='v2_planner_todo_convert'),
     path('api/v2/reminders/', views_planner_v2.reminders_v2, name='v2_planner_reminders'),
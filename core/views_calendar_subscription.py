@@ -28,14 +28,15 @@ from django.conf import settings
 from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_GET
-from rest_framework.authtoken.models import Token
 
 from icalendar import Calendar, Event, Todo, Timezone, TimezoneStandard, Alarm
 
 from core.planner.legacy import LegacyPlannerRepository
 from core.planner.application import PlannerApplicationService
 from core.planner.context import PlannerExecutionContext
+from core.planner.feed_cache import gzip_etag
 from core.planner.rollout import PlannerRolloutPolicy
+from core.token_cache import resolve_token_user
 from logger import logger
 
 
@@ -63,11 +64,7 @@ def _authenticate_by_token(token_key: str):
     Returns:
         User 对象，或 None（token 无效）
     """
-    try:
-        token_obj = Token.objects.select_related("user").get(key=token_key)
-        return token_obj.user
-    except Token.DoesNotExist:
-        return None
+    return resolve_token_user(token_key)
 
 
 def _build_vtimezone() -> Timezone:
@@ -506,6 +503,38 @@ def _build_vevent_from_reminder(reminder: dict) -> Optional[Event]:
     return ve
 
 
+def _accepts_gzip(accept_encoding: str) -> bool:
+    """按 RFC 9110 解析 Accept-Encoding：gzip（或 x-gzip）的 q 值大于 0 才接受，未列出时看 * 的 q 值。"""
+    qvalues: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value.strip())
+                except ValueError:
+                    q = 0.0
+        qvalues[coding.lower()] = q
+    for coding in ("gzip", "x-gzip"):
+        if coding in qvalues:
+            return qvalues[coding] > 0
+    return qvalues.get("*", 0.0) > 0
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match 按弱比较匹配，同一版本的原始与 gzip 表示都视为命中。"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {item.strip().removeprefix("W/") for item in if_none_match.split(",")}
+    return etag in candidates or f'{etag[:-1]}-gzip"' in candidates
+
+
 # =====================================================
 # 主视图函数
 # =====================================================
@@ -548,14 +577,30 @@ def calendar_feed(request):
             source="calendar_feed",
             entrypoint=PlannerRolloutPolicy.ENTRYPOINT_CALENDAR_FEED,
         )
+        accepts_gzip = _accepts_gzip(request.META.get("HTTP_ACCEPT_ENCODING", ""))
         try:
-            payload = PlannerApplicationService.build_calendar_feed(context, feed_type=feed_type)
+            etag = PlannerApplicationService.calendar_feed_etag(context, feed_type=feed_type)
+            # 订阅客户端大多带 If-None-Match 轮询；版本未变时只做这一次版本查询，不投影、不编码。
+            not_modified = _etag_matches(request.META.get("HTTP_IF_NONE_MATCH", ""), etag)
+            payload = None
+            if not not_modified:
+                payload = PlannerApplicationService.get_calendar_feed(context, feed_type=feed_type, etag=etag)
         except Exception as exc:
             logger.error(f"Calendar feed V2 failed for user {user.username}: {exc}")
             return HttpResponse("Calendar feed generation failed.", status=500)
-        response = HttpResponse(payload, content_type="text/calendar; charset=utf-8")
+        if not_modified:
+            response = HttpResponse(status=304)
+            response["ETag"] = gzip_etag(etag) if accepts_gzip else etag
+            response["Cache-Control"] = "private, max-age=300"
+            response["Vary"] = "Accept-Encoding"
+            return response
+        response = HttpResponse(payload.gzip_body if accepts_gzip else payload.body, content_type="text/calendar; charset=utf-8")
+        if accepts_gzip:
+            response["Content-Encoding"] = "gzip"
+        response["ETag"] = payload.gzip_etag if accepts_gzip else payload.etag
         response["Content-Disposition"] = 'inline; filename="unischeduler.ics"'
         response["Cache-Control"] = "private, max-age=300"
+        response["Vary"] = "Accept-Encoding"
         return response
 
     # P6：全局 normalized 时任何准入失败都必须显式失败，禁止继续执行
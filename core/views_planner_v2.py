@@ -107,11 +107,14 @@ def list_event_occurrences_v2(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def list_event_conflicts_v2(request):
-    """复用 occurrence query 检测半开区间重叠；不物化虚拟实例。"""
+    """复用 occurrence query 检测半开区间重叠；不物化虚拟实例，可用 cursor/limit 分页冲突对。"""
     try:
         range_start, range_end = _parse_range(request)
+        limit = request.query_params.get('limit')
         return Response(PlannerApplicationService.list_conflicts(
-            _web_context(request), range_start=range_start, range_end=range_end
+            _web_context(request), range_start=range_start, range_end=range_end,
+            cursor=int(request.query_params.get('cursor', '0')),
+            limit=int(limit) if limit is not None else None,
         ))
     except (PlannerTimeError, ValueError) as exc:
         return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
@@ -302,6 +305,18 @@ def todos_v2(request):
         return _command_error_response(exc)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def todo_dependency_graph_v2(request):
+    """依赖图视图：拓扑序、关键路径；传 todo_id 时附带其上下游。"""
+    try:
+        return Response(PlannerApplicationService.todo_dependency_graph(
+            _web_context(request), todo_id=request.query_params.get('todo_id', ''),
+        ))
+    except Exception as exc:
+        return _command_error_response(exc)
+
+
 @api_view(['PATCH', 'DELETE'])
 @permission_classes([IsAuthenticated])
 def todo_command_v2(request, todo_id: str):
@@ -49,9 +49,10 @@ from agent_service.tools.unified_planner_tools import (
     check_schedule_conflicts as _check_schedule_conflicts,
 )
 
-from rest_framework.authtoken.models import Token
 from django.contrib.auth.models import User
 
+from agent_service.mcp_executor import McpToolExecutor
+from core.token_cache import resolve_token_user
 from logger import logger
 
 # ============================================================
@@ -72,20 +73,9 @@ _current_request_id_var: contextvars.ContextVar[str] = contextvars.ContextVar(
     'mcp_current_request_id', default=''
 )
 
-# Token -> User 缓存（避免每次 tool 调用都查数据库）
-_token_user_cache: dict[str, User] = {}
-
-
 def _resolve_user_from_token(token_str: str) -> Optional[User]:
-    """从 Token 字符串解析 Django User 对象"""
-    if token_str in _token_user_cache:
-        return _token_user_cache[token_str]
-    try:
-        token_obj = Token.objects.select_related('user').get(key=token_str)
-        _token_user_cache[token_str] = token_obj.user
-        return token_obj.user
-    except Token.DoesNotExist:
-        return None
+    """从 Token 字符串解析 Django User 对象（共享的 TTL 缓存，Token 吊销后最多 TTL 秒内失效）"""
+    return resolve_token_user(token_str)
 
 
 def _get_current_user() -> User:
@@ -138,6 +128,17 @@ mcp = FastMCP(
 )
 
 
+# 同步工具在有界 worker 池中按用户公平执行，不再全部串行在 thread_sensitive 单线程上。
+tool_executor = McpToolExecutor.from_settings()
+
+
+@mcp.custom_route("/metrics/tools", methods=["GET"])
+async def tool_metrics(request):
+    """执行池排队深度与吞吐，只含聚合计数。"""
+    from starlette.responses import JSONResponse
+    return JSONResponse(tool_executor.info())
+
+
 # ============================================================
 # MCP 工具定义 — 薄包装层，调用现有 unified_planner_tools
 # ============================================================
@@ -167,8 +168,7 @@ async def search_items(
         share_groups_only: 是否仅搜索分享组内容
         limit: 返回数量上限，默认20
     """
-    from asgiref.sync import sync_to_async
-    user = await sync_to_async(_get_current_user)()
+    user = _get_current_user()
     config = _build_config(user)
     input_args = {
         "item_type": item_type,
@@ -180,7 +180,7 @@ async def search_items(
         "share_groups_only": share_groups_only,
         "limit": limit,
     }
-    return await sync_to_async(_search_items.invoke)(input=input_args, config=config)
+    return await tool_executor.run(user.pk, _search_items.invoke, input=input_args, config=config)
 
 
 @mcp.tool()
@@ -225,8 +225,7 @@ async def create_item(
         content: 提醒内容
         repeat: 重复规则 - 简化格式("每天","每周","每月","每周一三五","工作日","周末") 或标准 RRULE
     """
-    from asgiref.sync import sync_to_async
-    user = await sync_to_async(_get_current_user)()
+    user = _get_current_user()
     config = _build_config(user)
     input_args = {
         "item_type": item_type,
@@ -245,7 +244,7 @@ async def create_item(
         "content": content,
         "repeat": repeat,
     }
-    return await sync_to_async(_create_item.invoke)(input=input_args, config=config)
+    return await tool_executor.run(user.pk, _create_item.invoke, input=input_args, config=config)
 
 
 @mcp.tool()
@@ -296,8 +295,7 @@ async def update_item(
         repeat: 新的重复规则
         clear_repeat: 为True时清除重复规则
     """
-    from asgiref.sync import sync_to_async
-    user = await sync_to_async(_get_current_user)()
+    user = _get_current_user()
     config = _build_config(user)
     input_args = {
         "identifier": identifier,
@@ -321,7 +319,7 @@ async def update_item(
         "repeat": repeat,
         "clear_repeat": clear_repeat,
     }
-    return await sync_to_async(_update_item.invoke)(input=input_args, config=config)
+    return await tool_executor.run(user.pk, _update_item.invoke, input=input_args, config=config)
 
 
 @mcp.tool()
@@ -338,15 +336,14 @@ async def delete_item(
         item_type: 可选类型指定 - "event", "todo", "reminder"
         delete_scope: 删除范围（重复项目）- "single"(仅当前), "all"(整个系列), "future"(此及之后)
     """
-    from asgiref.sync import sync_to_async
-    user = await sync_to_async(_get_current_user)()
+    user = _get_current_user()
     config = _build_config(user)
     input_args = {
         "identifier": identifier,
         "item_type": item_type,
         "delete_scope": delete_scope,
     }
-    return await sync_to_async(_delete_item.invoke)(input=input_args, config=config)
+    return await tool_executor.run(user.pk, _delete_item.invoke, input=input_args, config=config)
 
 
 @mcp.tool()
@@ -357,28 +354,25 @@ async def complete_todo(identifier: str) -> str:
     Args:
         identifier: 待办标识 - "#1"(搜索结果序号), UUID, 或标题
     """
-    from asgiref.sync import sync_to_async
-    user = await sync_to_async(_get_current_user)()
+    user = _get_current_user()
     config = _build_config(user)
-    return await sync_to_async(_complete_todo.invoke)(input={"identifier": identifier}, config=config)
+    return await tool_executor.run(user.pk, _complete_todo.invoke, input={"identifier": identifier}, config=config)
 
 
 @mcp.tool()
 async def get_event_groups() -> str:
     """获取用户的所有事件组列表，用于在创建/更新日程时选择事件组"""
-    from asgiref.sync import sync_to_async
-    user = await sync_to_async(_get_current_user)()
+    user = _get_current_user()
     config = _build_config(user)
-    return await sync_to_async(_get_event_groups.invoke)(input={}, config=config)
+    return await tool_executor.run(user.pk, _get_event_groups.invoke, input={}, config=config)
 
 
 @mcp.tool()
 async def get_share_groups() -> str:
     """获取用户所在的所有分享组列表，用于查看可用的分享组以便在搜索或创建日程时使用"""
-    from asgiref.sync import sync_to_async
-    user = await sync_to_async(_get_current_user)()
+    user = _get_current_user()
     config = _build_config(user)
-    return await sync_to_async(_get_share_groups.invoke)(input={}, config=config)
+    return await tool_executor.run(user.pk, _get_share_groups.invoke, input={}, config=config)
 
 
 @mcp.tool()
@@ -395,15 +389,14 @@ async def check_schedule_conflicts(
         include_share_groups: 是否包含分享组日程
         analysis_focus: 分析侧重 - ["conflicts"(冲突), "density"(密度), "reasonability"(合理性)]
     """
-    from asgiref.sync import sync_to_async
-    user = await sync_to_async(_get_current_user)()
+    user = _get_current_user()
     config = _build_config(user)
     input_args = {
         "time_range": time_range,
         "include_share_groups": include_share_groups,
         "analysis_focus": analysis_focus,
     }
-    return await sync_to_async(_check_schedule_conflicts.invoke)(input=input_args, config=config)
+    return await tool_executor.run(user.pk, _check_schedule_conflicts.invoke, input=input_args, config=config)
 
 
 # ============================================================